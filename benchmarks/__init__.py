@@ -0,0 +1 @@
+"""Benchmarks del evaluador (se ejecutan con 'python -m benchmarks.<nombre>' desde la raíz)."""
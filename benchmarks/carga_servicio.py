@@ -0,0 +1,122 @@
+"""Generador de carga local para el servicio HTTP: latencia (p50/p90/p99) y rendimiento.
+
+    python -m benchmarks.carga_servicio                          # servicio en este proceso
+    python -m benchmarks.carga_servicio --clientes 32 --sin-lotes  # compara con lotes de 1 dominio
+    python -m benchmarks.carga_servicio --url http://127.0.0.1:8765  # servicio ya arrancado
+
+Cada cliente es un hilo con una conexión persistente que envía peticiones de
+--dominios-por-peticion dominios (filas sintéticas con los nombres de columna de la
+exportación) una detrás de otra.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from pbn_evaluator import servicio
+
+from .datos_sinteticos import generar_export
+
+def _cliente(host, puerto, cuerpos, ruta, latencias, errores):
+    conexion = http.client.HTTPConnection(host, puerto, timeout=60)
+    try:
+        for cuerpo in cuerpos:
+            inicio = time.perf_counter()
+            conexion.request('POST', ruta, body=cuerpo, headers={'Content-Type': 'application/json'})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status != 200:
+                errores.append(respuesta.status)
+    finally:
+        conexion.close()
+
+def _metricas(host, puerto):
+    conexion = http.client.HTTPConnection(host, puerto, timeout=10)
+    try:
+        conexion.request('GET', '/metricas')
+        return json.loads(conexion.getresponse().read())
+    finally:
+        conexion.close()
+
+def medir(host, puerto, dominios, clientes, peticiones, por_peticion, textos):
+    """{'peticiones_s', 'dominios_s', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'errores'} de una ronda de carga."""
+    ruta = '/evaluar' if textos else '/evaluar?textos=0'
+    cuerpos = []
+    for i in range(peticiones):
+        lote = [dominios[(i * por_peticion + j) % len(dominios)] for j in range(por_peticion)]
+        cuerpos.append(json.dumps(lote[0] if por_peticion == 1 else lote))
+    latencias, errores = [], []
+    hilos = [
+        threading.Thread(target=_cliente, args=(host, puerto, cuerpos[c::clientes], ruta, latencias, errores))
+        for c in range(clientes)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        'peticiones_s': len(latencias) / segundos, 'dominios_s': len(latencias) * por_peticion / segundos,
+        'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': ms.max(), 'errores': len(errores),
+    }
+
+def _imprimir(nombre, medida, metricas):
+    print(
+        f"{nombre:<18} {medida['peticiones_s']:>9.0f} {medida['dominios_s']:>10.0f} {medida['p50_ms']:>8.1f} "
+        f"{medida['p90_ms']:>8.1f} {medida['p99_ms']:>8.1f} {medida['max_ms']:>8.1f} "
+        f"{metricas.get('dominios_por_lote') or 0:>7.1f} {medida['errores']:>7}"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Servicio ya arrancado (por defecto se arranca uno en este proceso)')
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--dominios-por-peticion', type=int, default=1)
+    parser.add_argument('--sin-textos', action='store_true', help='Pide solo Score y PBN (?textos=0)')
+    parser.add_argument('--ventana-ms', type=float, default=None, help='Ventana de agrupación del servicio en este proceso')
+    parser.add_argument('--max-lote', type=int, default=None)
+    parser.add_argument('--sin-lotes', action='store_true', help='Repite la carga con lotes de un dominio para comparar')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generar_export(1000, args.seed)
+    dominios = df.astype(object).where(df.notna(), None).to_dict('records')
+    configuraciones = [('micro-lotes', args.ventana_ms, args.max_lote)]
+    if args.sin_lotes and not args.url:
+        configuraciones.append(('sin lotes', 0, 1))
+
+    print(f"{args.clientes} clientes, {args.peticiones} peticiones de {args.dominios_por_peticion} dominio(s)")
+    print(f"{'servicio':<18} {'pet/s':>9} {'dominios/s':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'lote':>7} {'errores':>7}")
+    for nombre, ventana_ms, max_lote in configuraciones:
+        servidor = None
+        if args.url:
+            partes = urlsplit(args.url)
+            host, puerto = partes.hostname, partes.port or 80
+        else:
+            servidor = servicio.crear_servidor(puerto=0, ventana_ms=ventana_ms, max_lote=max_lote)
+            host, puerto = servidor.server_address[:2]
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        try:
+            medida = medir(
+                host, puerto, dominios, args.clientes, args.peticiones,
+                args.dominios_por_peticion, not args.sin_textos
+            )
+            _imprimir(nombre, medida, _metricas(host, puerto))
+        finally:
+            if servidor is not None:
+                servidor.shutdown()
+                servidor.server_close()
+                servidor.evaluador.cerrar()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Generador reproducible de exportaciones sintéticas con el formato de Ahrefs.
+
+    python -m benchmarks.datos_sinteticos 100000 -o export_100k.csv
+"""
+import numpy as np
+import pandas as pd
+
+_TARGETS = [
+    'https://www.{}.com/blog/post', '{}.com', 'best{}news.net', 'blog.{}.org',
+    'http://{}-review.info', 'www.{}.io/a/b/c', '{}.hubspot.com', 'top{}hub.xyz'
+]
+
+def _con_separadores(valores, rng):
+    """Números como texto con separador de miles y algunos 'N/A' o vacíos."""
+    texto = pd.Series(valores).map('{:,}'.format)
+    texto[rng.random(len(texto)) < 0.03] = 'N/A'
+    texto[rng.random(len(texto)) < 0.02] = ''
+    return texto
+
+def generar_export(filas, seed=0):
+    """DataFrame con 'filas' dominios y las columnas de una exportación de Ahrefs."""
+    rng = np.random.default_rng(seed)
+    nombres = pd.Series(rng.integers(0, filas * 2 + 10, filas)).map('dom{}'.format)
+    plantillas = pd.Series(rng.choice(_TARGETS, filas))
+    targets = [p.format(n) for p, n in zip(plantillas, nombres)]
+
+    # Fechas en varios formatos (y algunas inválidas)
+    años = rng.integers(1995, 2026, filas).astype(str)
+    formatos = rng.integers(0, 5, filas)
+    fechas = np.select(
+        [formatos == 0, formatos == 1, formatos == 2, formatos == 3],
+        [np.char.add(años, '-03-15'), np.char.add('15/03/', años), np.char.add(años, '.03.15'), años],
+        default='n/d'
+    )
+
+    refdomains = rng.integers(0, 20000, filas)
+    backlinks = refdomains * rng.integers(1, 40, filas)
+    ips = rng.integers(0, 5000, filas)
+    return pd.DataFrame({
+        'Target': targets,
+        'Domain Rating': rng.integers(0, 101, filas),
+        'Organic / Traffic': _con_separadores(np.round(10 ** rng.uniform(0, 7, filas)).astype(int), rng),
+        'Ref. domains / All': _con_separadores(refdomains, rng),
+        'Ref. domains / Followed': (refdomains * rng.uniform(0.5, 1, filas)).astype(int),
+        'Backlinks / All': _con_separadores(backlinks, rng),
+        'Backlinks / Not followed': (backlinks * rng.uniform(0, 0.5, filas)).astype(int),
+        'Ref. IPs / IPs': ips,
+        'Ref. IPs / Subnets': (ips * rng.uniform(0.2, 1, filas)).astype(int),
+        'Creation Date': fechas,
+        'Brand Anchors': rng.integers(0, 101, filas),
+        'URL Rating': rng.integers(0, 100, filas),
+        'Organic / Total Keywords': _con_separadores(rng.integers(0, 50000, filas), rng),
+    })
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Escribe una exportación sintética en CSV o XLSX.')
+    parser.add_argument('filas', type=int)
+    parser.add_argument('-o', '--output', required=True, help='Archivo de salida (.csv o .xlsx)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generar_export(args.filas, args.seed)
+    if args.output.lower().endswith('.xlsx'):
+        df.to_excel(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
+
+if __name__ == '__main__':
+    main()
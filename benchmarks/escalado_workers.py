@@ -0,0 +1,40 @@
+"""Curva de escalado de run_analysis con 1..N procesos.
+
+    python -m benchmarks.escalado_workers --filas 500000 --max-workers 8
+"""
+import argparse
+import os
+import time
+
+from pbn_evaluator import core
+
+from .datos_sinteticos import generar_export
+
+def medir(df, workers, repeticiones):
+    """Mejor tiempo (s) de run_analysis con 'workers' procesos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        core.run_analysis(df, workers=workers)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generar_export(args.filas, args.seed)
+    print(f"{args.filas} filas, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'tiempo (s)':>10} {'filas/s':>10} {'speedup':>8}")
+    base = None
+    for workers in range(1, args.max_workers + 1):
+        tiempo = medir(df, workers, args.repeticiones)
+        base = base or tiempo
+        print(f"{workers:>7} {tiempo:>10.2f} {args.filas / tiempo:>10.0f} {base / tiempo:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Tiempo y pico de memoria por etapa (lectura, preparación, score, PBN, whitelist, exportación).
+
+    python -m benchmarks.suite                          # compara con benchmarks/linea_base.json
+    python -m benchmarks.suite --filas 1000 100000      # solo algunos tamaños
+    python -m benchmarks.suite --guardar                # actualiza la línea base
+
+Sale con código 1 si alguna etapa es más lenta (o usa más memoria) que la línea base
+en más de --umbral. Los tiempos son el mínimo de --repeticiones ejecuciones sin medir
+memoria; el pico de memoria (tracemalloc, mucho más lento) sale de una ejecución aparte,
+solo hasta MAX_FILAS_MEMORIA filas.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from pbn_evaluator import core, export
+from pbn_evaluator.perfilado import Perfil
+
+from .datos_sinteticos import generar_export
+
+TAMAÑOS = [1_000, 100_000, 1_000_000]
+RUTA_LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linea_base.json')
+# La exportación a Excel solo se mide hasta este tamaño (openpyxl es muy lento)
+MAX_FILAS_XLSX = 100_000
+# Con tracemalloc la ejecución es ~10 veces más lenta: la memoria solo se mide hasta aquí
+MAX_FILAS_MEMORIA = 100_000
+# Diferencias por debajo de estos mínimos se consideran ruido
+MIN_SEGUNDOS = 0.05
+MIN_MB = 5.0
+
+def ejecutar(ruta_csv, filas, perfil):
+    """Lectura -> run_analysis -> exportaciones, midiendo cada etapa con 'perfil'."""
+    formatos = ['csv', 'parquet'] + (['xlsx'] if filas <= MAX_FILAS_XLSX else [])
+    with perfil:
+        df = core.leer_archivo(ruta_csv)
+        resultado = core.run_analysis(df, workers=1)
+        for formato in formatos:
+            os.remove(export.exportar_a_temporal(resultado, formato))
+    return perfil
+
+def _por_etapa(perfil):
+    return perfil.resumen().groupby('etapa', sort=False).agg(
+        segundos=('segundos', 'sum'), filas=('filas', 'sum'), pico_mb=('pico_mb', 'max')
+    )
+
+def medir(ruta_csv, filas, repeticiones, memoria=True):
+    """{etapa: {'segundos', 'filas_s', 'pico_mb'}} para un archivo de 'filas' dominios."""
+    tiempos = pd.concat(
+        [_por_etapa(ejecutar(ruta_csv, filas, Perfil())) for _ in range(repeticiones)]
+    ).groupby('etapa', sort=False).agg(segundos=('segundos', 'min'), filas=('filas', 'max'))
+    picos = _por_etapa(ejecutar(ruta_csv, filas, Perfil(memoria=True)))['pico_mb'] if memoria else None
+
+    resultado = {}
+    for nombre, fila in tiempos.iterrows():
+        resultado[nombre] = {
+            'segundos': round(float(fila['segundos']), 4),
+            'filas_s': round(float(fila['filas'] / fila['segundos'])) if fila['filas'] > 0 else None,
+            'pico_mb': None if picos is None or pd.isna(picos.get(nombre)) else round(float(picos[nombre]), 1),
+        }
+    return resultado
+
+def comparar(actual, base, umbral):
+    """Lista de (etapa, métrica, actual, base) que empeoran más de 'umbral' (fracción) sobre la línea base."""
+    regresiones = []
+    for nombre, medida in actual.items():
+        referencia = base.get(nombre)
+        if referencia is None:
+            continue
+        for metrica, minimo in (('segundos', MIN_SEGUNDOS), ('pico_mb', MIN_MB)):
+            valor, previo = medida.get(metrica), referencia.get(metrica)
+            if valor is None or previo is None:
+                continue
+            if valor > previo * (1 + umbral) and valor - previo > minimo:
+                regresiones.append((nombre, metrica, valor, previo))
+    return regresiones
+
+def _imprimir(filas, actual, base):
+    print(f"\n{filas:,} filas")
+    print(f"{'etapa':<20} {'segundos':>9} {'base':>9} {'filas/s':>11} {'pico MB':>8} {'base MB':>8}")
+    for nombre, medida in actual.items():
+        referencia = base.get(nombre, {})
+        valores = [
+            f"{medida['segundos']:.3f}",
+            '' if referencia.get('segundos') is None else f"{referencia['segundos']:.3f}",
+            '' if medida['filas_s'] is None else f"{medida['filas_s']:,}",
+            '' if medida['pico_mb'] is None else f"{medida['pico_mb']:.1f}",
+            '' if referencia.get('pico_mb') is None else f"{referencia['pico_mb']:.1f}",
+        ]
+        print(f"{nombre:<20} {valores[0]:>9} {valores[1]:>9} {valores[2]:>11} {valores[3]:>8} {valores[4]:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=TAMAÑOS)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--umbral', type=float, default=0.25, help='Empeoramiento tolerado (0.25 = 25%%)')
+    parser.add_argument('--linea-base', default=RUTA_LINEA_BASE)
+    parser.add_argument('--guardar', action='store_true', help='Guarda las mediciones como línea base')
+    parser.add_argument('--sin-memoria', action='store_true', help='No mide el pico de memoria (más rápido)')
+    args = parser.parse_args(argv)
+
+    linea_base = {'entorno': {}, 'resultados': {}}
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding='utf-8') as f:
+            linea_base = json.load(f)
+
+    regresiones = []
+    with tempfile.TemporaryDirectory(prefix='pbn_bench_') as directorio:
+        for filas in args.filas:
+            ruta_csv = os.path.join(directorio, f'export_{filas}.csv')
+            generar_export(filas, args.seed).to_csv(ruta_csv, index=False)
+            memoria = not args.sin_memoria and filas <= MAX_FILAS_MEMORIA
+            actual = medir(ruta_csv, filas, args.repeticiones, memoria=memoria)
+            base = linea_base['resultados'].get(str(filas), {})
+            _imprimir(filas, actual, base)
+            regresiones += [(filas, *r) for r in comparar(actual, base, args.umbral)]
+            if args.guardar:
+                linea_base['resultados'][str(filas)] = actual
+
+    if args.guardar:
+        linea_base['entorno'] = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__,
+            'cpus': os.cpu_count(), 'plataforma': platform.platform(),
+        }
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump(linea_base, f, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.linea_base}")
+        return 0
+
+    for filas, nombre, metrica, valor, previo in regresiones:
+        print(f"❌ {filas:,} filas, {nombre}: {metrica} {valor:.3f} (línea base {previo:.3f})", file=sys.stderr)
+    return 1 if regresiones else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
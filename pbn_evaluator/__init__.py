@@ -0,0 +1,45 @@
+"""Evaluador de dominios (Trust Score + detección PBN) sin dependencia de Streamlit.
+
+Los nombres públicos se importan al usarlos por primera vez (__getattr__ de módulo):
+'import pbn_evaluator' y 'python -m pbn_evaluator --help' no cargan pandas, pyarrow,
+sqlite ni el servidor HTTP. La función de barrido está en pbn_evaluator.barrido (el
+nombre del módulo es el mismo).
+"""
+import importlib
+
+# Submódulo -> nombres que se reexportan desde el paquete
+_EXPORTACIONES = {
+    'core': [
+        'BATCH_LIMIT', 'WHITELIST_DOMAINS', 'EXCEPT_DOMAINS', 'find_col', 'resolver_mapeo',
+        'calcular_edad_dominio', 'calcular_edades', 'normalizar_host', 'normalizar_hosts',
+        'IndiceDominios', 'MatcherPatrones', 'cargar_lista_dominios', 'configurar_listas',
+        'prepare_df_tolerant', 'simulate_score', 'simulate_score_batch', 'es_marca_whitelist',
+        'es_marca_whitelist_batch', 'detectar_pbn', 'detectar_pbn_batch', 'construir_textos_pbn',
+        'construir_reason', 'ajustar_por_whitelist', 'expandir_resultados', 'run_analysis',
+        'run_analysis_stream', 'reevaluar', 'clave_duplicados', 'quitar_duplicados',
+        'run_analysis_to_file', 'escribir_resultados', 'leer_cabecera', 'leer_archivo',
+        'leer_archivo_en_chunks',
+    ],
+    'cache': ['CacheResultados'],
+    'perfilado': ['Perfil'],
+    'perfiles': ['cargar_perfil', 'configurar_perfil', 'usar_perfil'],
+    'explorador': ['ExploradorResultados'],
+    'barrido': ['rejilla', 'muestra_aleatoria'],
+    'servicio': ['evaluar_dominios'],
+    'incremental': ['run_analysis_incremental', 'guardar_snapshot', 'cargar_snapshot'],
+    'export': ['convert_df_to_excel', 'convert_df_to_csv'],
+}
+_MODULO_DE = {nombre: modulo for modulo, nombres in _EXPORTACIONES.items() for nombre in nombres}
+
+__all__ = list(_MODULO_DE)
+
+def __getattr__(nombre):
+    modulo = _MODULO_DE.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f'.{modulo}', __name__), nombre)
+    globals()[nombre] = valor  # Las siguientes consultas no pasan por aquí
+    return valor
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,245 @@
+"""Barrido what-if: muchas configuraciones de pesos y umbrales evaluadas sobre un mismo archivo.
+
+Cada configuración es el perfil de reglas base con algunos valores cambiados, con
+claves separadas por puntos ({'score.pesos.dr_quality': 0.4, 'pbn.niveles_riesgo.alto': 7}).
+Lo que no depende del perfil se calcula una sola vez y se combina con matrices de
+parámetros (una fila por configuración):
+
+- los componentes del Score (core.componentes_score), con la matriz de pesos;
+- las reglas PBN disparadas (core.reglas_pbn_batch), con la matriz de puntos; solo se
+  recalculan para cada combinación distinta de tramos de diversidad de IPs y de
+  densidad de backlinks;
+- la whitelist.
+
+    configuraciones = rejilla({'score.pesos.dr_quality': [0.25, 0.35, 0.45], 'score.umbral_excelente': [70, 75, 80]})
+    resumen = barrido(prepare_df_tolerant(df), configuraciones)
+
+La fila 0 del resumen es el perfil base; 'cambios_label' y 'cambios_riesgo' cuentan
+los dominios cuya categoría cambia respecto a ella.
+"""
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from . import core
+from .perfilado import etapa
+from .perfiles import compilar_perfil, derivar_perfil, perfil_reglas, usar_perfil
+
+# Celdas (filas x configuraciones) que se evalúan a la vez; acota la memoria del barrido
+MAX_CELDAS_BLOQUE = 2_000_000
+
+# Columnas del resumen con el número de dominios de cada categoría (en el orden de sus códigos)
+CATEGORIAS_LABEL = ['excelente', 'aceptable', 'riesgoso', 'dr_no_aceptable']
+CATEGORIAS_RIESGO = ['pbn_alto', 'pbn_moderado', 'pbn_bajo', 'pbn_natural', 'pbn_dr_no_aceptable', 'pbn_whitelist']
+
+# Reducciones de puntos, en el orden en que se aplican (ver core.puntos_pbn)
+_REDUCCIONES = ['senales_multiples', 'senales_algunas', 'dominio_consolidado']
+
+# --- Generación de configuraciones ---
+def rejilla(ejes):
+    """Todas las combinaciones de {clave: [valores]}, como lista de configuraciones."""
+    claves = list(ejes)
+    return [dict(zip(claves, valores)) for valores in itertools.product(*ejes.values())]
+
+def muestra_aleatoria(rangos, n, semilla=0):
+    """'n' configuraciones al azar: {clave: (mín, máx)} uniforme (entero si ambos límites lo son) o {clave: [valores]}."""
+    rng = np.random.default_rng(semilla)
+    columnas = {}
+    for clave, rango in rangos.items():
+        if isinstance(rango, list):
+            columnas[clave] = [rango[i] for i in rng.integers(0, len(rango), n)]
+        elif all(isinstance(v, int) for v in rango):
+            columnas[clave] = rng.integers(rango[0], rango[1] + 1, n).tolist()
+        else:
+            columnas[clave] = rng.uniform(rango[0], rango[1], n).tolist()
+    return [{clave: valores[i] for clave, valores in columnas.items()} for i in range(n)]
+
+def cargar_barrido(ruta):
+    """Configuraciones de un archivo JSON con 'rejilla', 'aleatorio' ({'rangos', 'muestras', 'semilla'}) y/o 'configuraciones'."""
+    with open(ruta, encoding='utf-8') as f:
+        try:
+            datos = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"El barrido no es JSON válido: {e}") from e
+    desconocidas = set(datos) - {'rejilla', 'aleatorio', 'configuraciones'}
+    if desconocidas:
+        raise ValueError(f"Claves desconocidas en el barrido: {', '.join(sorted(desconocidas))}.")
+    configuraciones = list(datos.get('configuraciones', []))
+    if 'rejilla' in datos:
+        configuraciones += rejilla(datos['rejilla'])
+    if 'aleatorio' in datos:
+        aleatorio = datos['aleatorio']
+        configuraciones += muestra_aleatoria(aleatorio['rangos'], aleatorio['muestras'], aleatorio.get('semilla', 0))
+    return configuraciones
+
+def _anidar(cambios):
+    """{'a.b': v} -> {'a': {'b': v}} (formato de los perfiles)."""
+    anidado = {}
+    for clave, valor in cambios.items():
+        *padres, hoja = clave.split('.')
+        nivel = anidado
+        for padre in padres:
+            nivel = nivel.setdefault(padre, {})
+        nivel[hoja] = valor
+    return anidado
+
+def _completar_pesos(base, cambios):
+    """Hace que los pesos sumen 1: los no cambiados se reescalan en proporción (si se cambian todos, se normalizan)."""
+    pesos = {clave.rsplit('.', 1)[1]: valor for clave, valor in cambios.items() if clave.startswith('score.pesos.')}
+    if not pesos:
+        return cambios
+    resto = {c: p for c, p in base.pesos.items() if c not in pesos}
+    if resto and sum(resto.values()) > 0:
+        escala = (1 - sum(pesos.values())) / sum(resto.values())
+        pesos.update({c: p * escala for c, p in resto.items()})
+    elif not resto and sum(pesos.values()) > 0:
+        total = sum(pesos.values())
+        pesos = {c: p / total for c, p in pesos.items()}
+    cambios = {clave: valor for clave, valor in cambios.items() if not clave.startswith('score.pesos.')}
+    cambios['score.pesos'] = pesos
+    return cambios
+
+def _valor(datos, clave):
+    for parte in clave.split('.'):
+        datos = datos[parte]
+    return datos
+
+# --- Evaluación del barrido ---
+class _Componentes:
+    """Partes de la evaluación que no dependen del perfil, calculadas una vez por barrido."""
+
+    def __init__(self, df, base):
+        # Un resultado de run_analysis no guarda los ratios de la evaluación
+        df = self.df = core.completar_ratios(df)
+        self.dr, self.score = core.componentes_score(df)
+        hosts = core.normalizar_hosts(df['target'])
+        self.whitelist = core.es_marca_whitelist_batch(df, hosts=hosts).to_numpy(dtype=bool)[:, None]
+        with usar_perfil(base):
+            reglas, _ = core.reglas_pbn_batch(df, hosts=hosts)
+        # Sin las reglas que dependen de los tramos, que se recalculan para cada perfil
+        self.reglas_fijas = reglas & ~sum(core.PBN_BIT[c] for c in core.REGLAS_TRAMOS_PBN)
+
+    def reglas(self, perfil, codigos):
+        """(matriz filas x 'codigos' con las reglas de puntos disparadas, reducciones aplicables) con los tramos de 'perfil'."""
+        reglas = self.reglas_fijas | core.reglas_tramos_pbn(self.df, perfil)
+        disparadas = np.column_stack([(reglas & core.PBN_BIT[c]) != 0 for c in codigos]).astype(np.float32)
+        reducciones = [((reglas & core.PBN_BIT[c]) != 0)[:, None] for c in _REDUCCIONES]
+        return disparadas, reducciones
+
+class _Parametros:
+    """Parámetros de todas las configuraciones como arrays (una posición por configuración)."""
+
+    def __init__(self, perfiles, codigos):
+        self.pesos = np.array([[p.pesos[c] for c in core.COMPONENTES_SCORE] for p in perfiles])
+        self.dr_minimo = np.array([p.dr_minimo for p in perfiles], dtype=float)
+        self.umbral_excelente = np.array([p.umbral_excelente for p in perfiles], dtype=float)
+        self.umbral_aceptable = np.array([p.umbral_aceptable for p in perfiles], dtype=float)
+        self.puntos = np.array([[p.puntos[c] for c in codigos] for p in perfiles], dtype=np.float32)
+        self.reducciones = np.array([[p.reducciones[c] for c in _REDUCCIONES] for p in perfiles], dtype=np.int64)
+        self.umbrales_riesgo = np.array([p.umbrales_riesgo[:3] for p in perfiles], dtype=np.int64)
+        self.puntos_dr_no_aceptable = np.array([p.puntos_dr_no_aceptable for p in perfiles], dtype=np.int64)
+
+def _evaluar_bloque(comp, param, indices, disparadas, reducciones):
+    """Score, categoría de Label y categoría de riesgo PBN (filas x configuraciones 'indices')."""
+    # Score: misma suma y redondeo que core.simulate_score_batch
+    raw_score = 0
+    for i in range(len(core.COMPONENTES_SCORE)):
+        raw_score = raw_score + comp.score[:, i, None] * param.pesos[indices, i]
+    rechazado = comp.dr[:, None] <= param.dr_minimo[indices]
+    score = np.where(rechazado, 0, np.clip(np.round(raw_score), 1, 100)).astype(np.int64)
+    label = np.select(
+        [rechazado, score >= param.umbral_excelente[indices], score >= param.umbral_aceptable[indices]],
+        [3, 0, 1], default=2
+    )
+    # Ajuste por whitelist (core.ajustar_por_whitelist)
+    score = np.where(comp.whitelist, np.maximum(score, 75), score)
+    label = np.where(comp.whitelist, 0, label)
+
+    # Puntos PBN: reglas disparadas x matriz de puntos, y reducciones (core.puntos_pbn)
+    puntos = np.rint(disparadas @ param.puntos[indices].T).astype(np.int64)
+    for j, aplica in enumerate(reducciones):
+        puntos = np.where(aplica, np.maximum(0, puntos - param.reducciones[indices, j]), puntos)
+    puntos = np.maximum(0, puntos)
+    umbrales = param.umbrales_riesgo[indices]
+    riesgo = np.select([puntos >= umbrales[:, 0], puntos >= umbrales[:, 1], puntos >= umbrales[:, 2]], [0, 1, 2], default=3)
+    riesgo = np.where(rechazado, 4, riesgo)
+    riesgo = np.where(comp.whitelist, 5, riesgo)
+    return score, label, riesgo
+
+def barrido(df_prepared, configuraciones, base=None, omitir_invalidas=True):
+    """Resumen por configuración: dominios por Label y por nivel de riesgo PBN, Score medio y cambios respecto al base.
+
+    'df_prepared' son filas ya preparadas (prepare_df_tolerant) o un resultado de
+    run_analysis, que conserva sus entradas. 'base' es el perfil de partida (por
+    defecto el vigente); cada configuración es un dict de cambios sobre él. Los pesos
+    cambiados se completan para sumar 1 reescalando el resto. Las configuraciones no
+    válidas se omiten (su número queda en resumen.attrs['omitidas']) o, con
+    omitir_invalidas=False, lanzan ValueError; una clave que no existe en el perfil
+    siempre lanza ValueError.
+    """
+    base = compilar_perfil(base) if base is not None else perfil_reglas()
+    claves = list(dict.fromkeys(clave for cambios in configuraciones for clave in cambios))
+    for clave in claves:
+        # Una clave mal escrita es un error del barrido, no una configuración no válida
+        try:
+            _valor(base.datos, clave)
+        except (KeyError, TypeError):
+            raise ValueError(f"Clave desconocida en el barrido: '{clave}'.") from None
+
+    perfiles, omitidas = [base], 0
+    for cambios in configuraciones:
+        try:
+            perfiles.append(derivar_perfil(base, _anidar(_completar_pesos(base, cambios))))
+        except ValueError:
+            if not omitir_invalidas:
+                raise
+            omitidas += 1
+
+    n, total = len(df_prepared), len(perfiles)
+    codigos = list(base.puntos)
+    with etapa('barrido_componentes', n):
+        comp = _Componentes(df_prepared, base)
+    param = _Parametros(perfiles, codigos)
+
+    # Configuraciones con los mismos tramos comparten las reglas PBN disparadas
+    grupos = {}
+    for k, perfil in enumerate(perfiles):
+        pbn = perfil.datos['pbn']
+        grupos.setdefault(json.dumps([pbn['diversidad_ips'], pbn['densidad_backlinks']]), []).append(k)
+
+    conteo_label = np.zeros((total, len(CATEGORIAS_LABEL)), dtype=np.int64)
+    conteo_riesgo = np.zeros((total, len(CATEGORIAS_RIESGO)), dtype=np.int64)
+    score_medio = np.zeros(total)
+    cambios_label = np.zeros(total, dtype=np.int64)
+    cambios_riesgo = np.zeros(total, dtype=np.int64)
+    por_bloque = max(1, MAX_CELDAS_BLOQUE // max(n, 1))
+    label_base = riesgo_base = None
+
+    with etapa('barrido', n * total):
+        # El grupo del perfil base (posición 0) va primero: sus categorías son la referencia
+        for indices in grupos.values():
+            disparadas, reducciones = comp.reglas(perfiles[indices[0]], codigos)
+            for inicio in range(0, len(indices), por_bloque):
+                bloque = np.array(indices[inicio:inicio + por_bloque])
+                score, label, riesgo = _evaluar_bloque(comp, param, bloque, disparadas, reducciones)
+                if label_base is None:
+                    label_base, riesgo_base = label[:, :1], riesgo[:, :1]
+                for codigo in range(len(CATEGORIAS_LABEL)):
+                    conteo_label[bloque, codigo] = (label == codigo).sum(axis=0)
+                for codigo in range(len(CATEGORIAS_RIESGO)):
+                    conteo_riesgo[bloque, codigo] = (riesgo == codigo).sum(axis=0)
+                score_medio[bloque] = score.mean(axis=0) if n else 0.0
+                cambios_label[bloque] = (label != label_base).sum(axis=0)
+                cambios_riesgo[bloque] = (riesgo != riesgo_base).sum(axis=0)
+
+    resumen = pd.DataFrame({clave: [_valor(p.datos, clave) for p in perfiles] for clave in claves}, index=pd.RangeIndex(total))
+    resumen[CATEGORIAS_LABEL] = conteo_label
+    resumen['score_medio'] = score_medio.round(2)
+    resumen[CATEGORIAS_RIESGO] = conteo_riesgo
+    resumen['cambios_label'] = cambios_label
+    resumen['cambios_riesgo'] = cambios_riesgo
+    resumen.index.name = 'configuracion'
+    resumen.attrs['omitidas'] = omitidas
+    return resumen
@@ -0,0 +1,248 @@
+"""Cachés persistentes: resultados por dominio (SQLite) y análisis completos (Parquet).
+
+La clave de CacheResultados es la firma de la fila (core.firmar_filas: hash del
+target, las métricas de entrada, la fecha de creación y la versión de las reglas;
+no la edad calculada con la fecha de hoy): un dominio cuyas métricas no han cambiado
+no se vuelve a evaluar, y cualquier cambio de pesos, umbrales o listas invalida sus
+entradas (ver core.version_reglas). Se guardan solo los resultados que no dependen de
+la edad exacta (core.COLUMNAS_REUTILIZABLES): Score y Label se recalculan con la edad
+actual. Se guarda también el host normalizado.
+
+CacheAnalisis guarda el resultado entero de run_analysis por contenido del archivo
+subido, para que volver a subir el mismo archivo no repita el análisis.
+"""
+from contextlib import contextmanager
+from datetime import date
+import glob
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from .core import COLUMNAS_REUTILIZABLES, completar_evaluacion, normalizar_hosts, version_reglas
+
+# Ruta de la caché; se puede cambiar con PBN_CACHE_RESULTADOS ('' la desactiva en la interfaz)
+RUTA_CACHE_RESULTADOS = os.environ.get(
+    'PBN_CACHE_RESULTADOS',
+    os.path.join(os.path.expanduser('~'), '.pbn_evaluator', 'cache_resultados.sqlite')
+)
+TTL_CACHE_RESULTADOS = float(os.environ.get('PBN_CACHE_TTL_DIAS', 30)) * 86400  # segundos
+MAX_FILAS_CACHE = int(os.environ.get('PBN_CACHE_MAX_FILAS', 2_000_000))
+
+# Directorio de la caché de análisis completos (PBN_CACHE_ANALISIS, '' la desactiva) y su tamaño máximo
+DIR_CACHE_ANALISIS = os.environ.get(
+    'PBN_CACHE_ANALISIS',
+    os.path.join(os.path.expanduser('~'), '.pbn_evaluator', 'analisis')
+)
+MAX_MB_CACHE_ANALISIS = float(os.environ.get('PBN_CACHE_ANALISIS_MB', 1024))
+
+# Columnas de la tabla en el mismo orden que COLUMNAS_REUTILIZABLES (las cachés antiguas
+# tienen además 'reason', 'score' y 'label', que ya no se escriben: el texto se genera al
+# mostrar o exportar, y Score y Label dependen de la edad del día)
+_COLUMNAS_SQL = ['puntos', 'nivel', 'reglas', 'patron', 'whitelist']
+class CacheResultados:
+    """Resultados de evaluación por dominio guardados en SQLite, con TTL y tamaño máximo.
+
+    Uso: pasar la instancia como 'cache' a run_analysis / run_analysis_stream.
+    'aciertos' y 'evaluados' cuentan las filas servidas desde la caché y las evaluadas.
+    """
+
+    def __init__(self, ruta=None, ttl=None, max_filas=None):
+        self.ruta = str(ruta or RUTA_CACHE_RESULTADOS)
+        self.ttl = TTL_CACHE_RESULTADOS if ttl is None else ttl
+        self.max_filas = MAX_FILAS_CACHE if max_filas is None else max_filas
+        self.aciertos = 0
+        self.evaluados = 0
+        self._escrituras = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        with self._conexion() as con:
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS resultados ('
+                'clave INTEGER PRIMARY KEY, host TEXT, version TEXT, '
+                'puntos INTEGER, nivel TEXT, '
+                'reglas INTEGER, patron TEXT, whitelist INTEGER, creado REAL NOT NULL)'
+            )
+            con.execute('CREATE INDEX IF NOT EXISTS resultados_creado ON resultados (creado)')
+        self.purgar()
+
+    @contextmanager
+    def _conexion(self):
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            with con:  # una transacción por operación
+                yield con
+        finally:
+            con.close()
+
+    def __len__(self):
+        with self._conexion() as con:
+            return con.execute('SELECT COUNT(*) FROM resultados').fetchone()[0]
+
+    def buscar(self, claves):
+        """Búsqueda en bloque; devuelve un DataFrame con 'pos' (posición de la clave) y las columnas cacheadas."""
+        limite = time.time() - self.ttl
+        with self._conexion() as con:
+            con.execute('CREATE TEMP TABLE claves (pos INTEGER PRIMARY KEY, clave INTEGER)')
+            con.executemany('INSERT INTO claves VALUES (?, ?)', enumerate(claves.tolist()))
+            filas = con.execute(
+                'SELECT c.pos, ' + ', '.join('r.' + c for c in _COLUMNAS_SQL) + ' FROM claves c '
+                'JOIN resultados r ON r.clave = c.clave WHERE r.creado >= ?',
+                (limite,)
+            ).fetchall()
+        return pd.DataFrame(filas, columns=['pos'] + COLUMNAS_REUTILIZABLES)
+
+    def guardar(self, claves, targets, version, evaluacion):
+        """Escribe en una sola transacción los resultados de las filas evaluadas."""
+        valores = [evaluacion[c].tolist() for c in COLUMNAS_REUTILIZABLES]
+        valores[COLUMNAS_REUTILIZABLES.index('Es_Marca_Whitelist')] = [
+            int(v) for v in valores[COLUMNAS_REUTILIZABLES.index('Es_Marca_Whitelist')]
+        ]
+        hosts = normalizar_hosts(targets)
+        ahora = time.time()
+        with self._conexion() as con:
+            con.executemany(
+                'INSERT OR REPLACE INTO resultados (clave, host, version, ' + ', '.join(_COLUMNAS_SQL) + ', creado) '
+                'VALUES (' + ', '.join('?' * (len(_COLUMNAS_SQL) + 4)) + ')',
+                ((k, h, version, *fila, ahora) for k, h, *fila in zip(claves.tolist(), hosts.tolist(), *valores))
+            )
+        self._escrituras += len(claves)
+        if self._escrituras >= max(self.max_filas // 10, 1):
+            self.purgar()
+
+    def purgar(self):
+        """Elimina las entradas caducadas y, si se supera max_filas, las más antiguas."""
+        with self._conexion() as con:
+            con.execute('DELETE FROM resultados WHERE creado < ?', (time.time() - self.ttl,))
+            sobran = con.execute('SELECT COUNT(*) FROM resultados').fetchone()[0] - self.max_filas
+            if sobran > 0:
+                con.execute(
+                    'DELETE FROM resultados WHERE rowid IN '
+                    '(SELECT rowid FROM resultados ORDER BY creado LIMIT ?)',
+                    (sobran,)
+                )
+        self._escrituras = 0
+
+    def vaciar(self):
+        """Borra todas las entradas."""
+        with self._conexion() as con:
+            con.execute('DELETE FROM resultados')
+
+    def evaluar(self, df_prepared, evaluar):
+        """Devuelve COLUMNAS_EVALUACION para df_prepared, evaluando con 'evaluar' solo las filas no cacheadas."""
+        if len(df_prepared) == 0:
+            return evaluar(df_prepared)
+
+        claves = df_prepared['Firma'].to_numpy()
+        encontrados = self.buscar(claves).set_index('pos')
+        resultado, evaluadas = completar_evaluacion(df_prepared, encontrados, evaluar)
+        if len(evaluadas):
+            self.guardar(claves[evaluadas], df_prepared['target'].iloc[evaluadas], version_reglas(), resultado.iloc[evaluadas])
+
+        self.aciertos += len(encontrados)
+        self.evaluados += len(evaluadas)
+        return resultado
+
+def hash_contenido(fuente, bloque=1 << 20):
+    """SHA-256 (hex) del contenido de un archivo o ruta, leído por bloques."""
+    if not hasattr(fuente, 'read'):
+        with open(fuente, 'rb') as f:
+            return hash_contenido(f, bloque)
+    h = hashlib.sha256()
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+    for parte in iter(lambda: fuente.read(bloque), b''):
+        h.update(parte)
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+    return h.hexdigest()
+
+class CacheAnalisis:
+    """Resultados completos de run_analysis en disco (Parquet), por contenido del archivo y versión de reglas.
+
+    Pueden compartirla varias sesiones o procesos: cada entrada se escribe en un
+    archivo temporal y se renombra al terminar. Se conservan como máximo 'max_mb' MB; al
+    superarlos se borran las entradas usadas hace más tiempo (LRU por fecha de acceso).
+    """
+
+    def __init__(self, directorio=None, max_mb=None):
+        self.directorio = str(directorio or DIR_CACHE_ANALISIS)
+        self.max_bytes = (MAX_MB_CACHE_ANALISIS if max_mb is None else max_mb) * 2**20
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def clave(self, fuente, hoy=None):
+        """Clave de un archivo subido: su contenido, la versión de las reglas y el día.
+
+        La edad de los dominios se calcula respecto a la fecha actual, así que un
+        resultado solo se reutiliza el mismo día.
+        """
+        return self.clave_de_hash(hash_contenido(fuente), hoy)
+
+    def clave_de_hash(self, hash_archivo, hoy=None):
+        """Como clave, a partir del hash_contenido ya calculado del archivo."""
+        hoy = hoy or date.today()
+        return hashlib.sha256(f'{hash_archivo}:{version_reglas()}:{hoy.isoformat()}'.encode('ascii')).hexdigest()[:32]
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + '.parquet')
+
+    def __contains__(self, clave):
+        return os.path.exists(self._ruta(clave))
+
+    def obtener(self, clave):
+        """Resultado guardado para 'clave' (o None); marca la entrada como usada."""
+        ruta = self._ruta(clave)
+        try:
+            df = pd.read_parquet(ruta)
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada incompleta o dañada: se descarta
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            return None
+        return df
+
+    def guardar(self, clave, df):
+        """Guarda el resultado de 'clave' y purga las entradas antiguas si se supera el tamaño máximo."""
+        fd, temporal = tempfile.mkstemp(prefix='.' + clave, suffix='.tmp', dir=self.directorio)
+        os.close(fd)
+        try:
+            df.to_parquet(temporal, index=False)
+            os.replace(temporal, self._ruta(clave))
+        except BaseException:
+            os.remove(temporal)
+            raise
+        self.purgar()
+
+    def purgar(self):
+        """Borra las entradas menos usadas hasta quedar por debajo del tamaño máximo."""
+        entradas = []
+        for ruta in glob.glob(os.path.join(self.directorio, '*.parquet')):
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, ruta))
+        total = sum(tamaño for _, tamaño, _ in entradas)
+        for _, tamaño, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            total -= tamaño
+
+    def vaciar(self):
+        """Borra todas las entradas."""
+        for ruta in glob.glob(os.path.join(self.directorio, '*.parquet')):
+            os.remove(ruta)
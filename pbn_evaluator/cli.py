@@ -0,0 +1,200 @@
+"""Línea de comandos para evaluaciones por lotes (p. ej. desde cron).
+
+    python -m pbn_evaluator evaluate entrada.csv -o salida.parquet
+    python -m pbn_evaluator sweep entrada.csv --configuraciones barrido.json -o resumen.csv
+    python -m pbn_evaluator serve --port 8765
+"""
+import argparse
+from contextlib import nullcontext
+import sys
+import time
+
+def _cmd_evaluate(args):
+    """Evalúa un CSV/XLSX por bloques y escribe los resultados en CSV o Parquet."""
+    # Importación diferida: '--help' y los errores de argumentos no cargan pandas
+    from . import core
+
+    # Listas adicionales de dominios (se suman a las por defecto)
+    if args.whitelist:
+        core.configurar_listas(whitelist=core.WHITELIST_DOMAINS + core.cargar_lista_dominios(args.whitelist))
+    if args.except_domains:
+        core.configurar_listas(except_domains=core.EXCEPT_DOMAINS + core.cargar_lista_dominios(args.except_domains))
+    if args.patrones_pbn:
+        core.configurar_listas(patrones_pbn=core.PATRONES_PBN + core.cargar_lista_dominios(args.patrones_pbn))
+    # Perfil de reglas (pesos y umbrales); un perfil no válido detiene la ejecución
+    if args.reglas:
+        from .perfiles import configurar_perfil
+        try:
+            configurar_perfil(args.reglas)
+        except ValueError as e:
+            print(f"Perfil de reglas no válido: {e}", file=sys.stderr)
+            return 2
+
+    cache = None
+    if args.cache:
+        from .cache import CacheResultados
+        cache = CacheResultados(args.cache)
+
+    from .perfilado import RUTA_LOG_PERFILADO, crear_perfil
+    ruta_jsonl = args.perfil_jsonl or RUTA_LOG_PERFILADO
+    perfil = crear_perfil(args.perfil or ('tiempos' if ruta_jsonl else ''))
+
+    inicio = time.perf_counter()
+    totales = {'duplicados': 0, 'quitadas': 0}
+    with perfil or nullcontext():
+        if args.previo or args.snapshot:
+            # Comparar o guardar un snapshot requiere el resultado completo en memoria
+            filas = _evaluar_con_snapshot(core, args, cache, totales)
+        else:
+            bloques = core.run_analysis_stream(args.entrada, args.chunksize, cache=cache, workers=args.workers)
+            filas = core.escribir_resultados(_bloques_salida(core, bloques, args, totales), args.output)
+    print(f"✅ {filas} dominios evaluados -> {args.output} ({time.perf_counter() - inicio:.1f}s)", file=sys.stderr)
+    if totales['duplicados']:
+        print(f"🔁 {totales['duplicados']} filas duplicadas (mismo host y métricas) evaluadas una sola vez", file=sys.stderr)
+    if args.sin_duplicados:
+        print(f"🧹 {totales['quitadas']} filas duplicadas quitadas de la salida", file=sys.stderr)
+    if cache is not None:
+        print(f"♻️ {cache.aciertos} desde la caché, {cache.evaluados} evaluados", file=sys.stderr)
+    if perfil is not None:
+        if args.perfil:
+            print(perfil.tabla(), file=sys.stderr)
+            print(perfil.estadisticas_cprofile(), end='', file=sys.stderr)
+        if ruta_jsonl:
+            perfil.escribir_jsonl(ruta_jsonl, origen='cli', entrada=str(args.entrada))
+    return 0
+
+def _bloques_salida(core, bloques, args, totales):
+    """Suma las filas duplicadas de cada bloque y, con --sin-duplicados, las quita de la salida."""
+    vistas = set()
+    for bloque in bloques:
+        totales['duplicados'] += bloque.attrs.get('duplicados', 0)
+        if args.sin_duplicados:
+            filas = len(bloque)
+            bloque = core.quitar_duplicados(bloque, vistas)
+            totales['quitadas'] += filas - len(bloque)
+        yield bloque
+
+def _evaluar_con_snapshot(core, args, cache, totales):
+    """Evaluación incremental (--previo) y/o guardado del snapshot (--snapshot)."""
+    from . import incremental
+
+    df_input = core.leer_archivo(args.entrada)
+    if args.previo:
+        salida = incremental.run_analysis_incremental(
+            df_input, args.previo, batch_limit=args.chunksize, workers=args.workers
+        )
+        resultado = salida['resultado']
+        resumen = salida['resumen']
+        print(
+            f"🔁 {resumen['reutilizados']} reutilizados, {resumen['evaluados']} evaluados "
+            f"({resumen['nuevo']} nuevos, {resumen['modificado']} modificados, {resumen['eliminado']} eliminados, "
+            f"{resumen['edad']} con otro Score por la edad; "
+            f"{resumen['cambios_riesgo']} cambios de riesgo PBN)",
+            file=sys.stderr
+        )
+        if args.cambios:
+            salida['cambios'].to_csv(args.cambios, index=False)
+    else:
+        resultado = core.run_analysis(df_input, batch_limit=args.chunksize, cache=cache, workers=args.workers)
+
+    if args.snapshot:
+        incremental.guardar_snapshot(resultado, args.snapshot)
+    # El snapshot conserva todas las filas; --sin-duplicados solo afecta a la salida
+    paso = args.chunksize or core.BATCH_LIMIT
+    bloques = (resultado.iloc[i:i + paso] for i in range(0, len(resultado), paso))
+    filas = core.escribir_resultados(_bloques_salida(core, bloques, args, totales), args.output)
+    totales['duplicados'] = resultado.attrs.get('duplicados', 0)
+    return filas
+
+def _cmd_sweep(args):
+    """Evalúa muchas configuraciones de pesos y umbrales sobre un archivo y escribe el resumen por configuración."""
+    from . import core
+    from .barrido import barrido, cargar_barrido
+    from .perfiles import cargar_perfil, perfil_reglas
+
+    try:
+        base = cargar_perfil(args.reglas) if args.reglas else perfil_reglas()
+        configuraciones = cargar_barrido(args.configuraciones)
+    except ValueError as e:
+        print(f"Barrido no válido: {e}", file=sys.stderr)
+        return 2
+
+    inicio = time.perf_counter()
+    df_prepared = core.prepare_df_tolerant(core.leer_archivo(args.entrada))
+    try:
+        resumen = barrido(df_prepared, configuraciones, base=base)
+    except ValueError as e:
+        print(f"Barrido no válido: {e}", file=sys.stderr)
+        return 2
+    if args.output.lower().endswith('.parquet'):
+        resumen.to_parquet(args.output)
+    else:
+        resumen.to_csv(args.output)
+    print(
+        f"✅ {len(resumen) - 1} configuraciones (+ perfil base) sobre {len(df_prepared)} dominios -> {args.output} "
+        f"({time.perf_counter() - inicio:.1f}s)", file=sys.stderr
+    )
+    if resumen.attrs['omitidas']:
+        print(f"⚠️ {resumen.attrs['omitidas']} configuraciones no válidas omitidas", file=sys.stderr)
+    return 0
+
+def _cmd_serve(args):
+    """Servicio HTTP/JSON local que agrupa las peticiones concurrentes en lotes."""
+    from . import servicio
+    from .perfiles import configurar_perfil
+
+    if args.reglas:
+        try:
+            configurar_perfil(args.reglas)
+        except ValueError as e:
+            print(f"Perfil de reglas no válido: {e}", file=sys.stderr)
+            return 2
+    print(f"🌐 Servicio en http://{args.host}:{args.port} (POST /evaluar, GET /salud, GET /metricas)", file=sys.stderr)
+    servicio.servir(args.host, args.port, ventana_ms=args.ventana_ms, max_lote=args.max_lote)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pbn_evaluator', description='Website Evaluation + Detección PBN')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    evaluate = subparsers.add_parser('evaluate', help='Evalúa un archivo de dominios (CSV o XLSX)')
+    evaluate.add_argument('entrada', help='Archivo de entrada (.csv o .xlsx)')
+    evaluate.add_argument('-o', '--output', required=True, help='Archivo de salida (.parquet, .arrow o .csv)')
+    evaluate.add_argument('--chunksize', type=int, default=None, help='Filas por bloque (por defecto BATCH_LIMIT)')
+    evaluate.add_argument('--workers', type=int, default=None, help='Procesos para la evaluación (por defecto PBN_WORKERS o 1)')
+    evaluate.add_argument('--whitelist', help='Archivo con dominios de marca adicionales (uno por línea)')
+    evaluate.add_argument('--except-domains', help='Archivo con dominios EXCEPT adicionales (uno por línea)')
+    evaluate.add_argument('--patrones-pbn', help='Archivo con tokens típicos de PBN adicionales (uno por línea)')
+    evaluate.add_argument('--reglas', help='Perfil de reglas JSON (pesos, umbrales y puntos; ver perfiles/)')
+    evaluate.add_argument('--cache', help='Base SQLite de resultados por dominio (solo se evalúan los dominios nuevos o cambiados)')
+    evaluate.add_argument('--previo', help='Snapshot Parquet de la ejecución anterior: solo se evalúan las filas nuevas o cambiadas')
+    evaluate.add_argument('--snapshot', help='Guarda el resultado como snapshot Parquet para la próxima ejecución incremental')
+    evaluate.add_argument('--cambios', help='Con --previo: CSV con las filas nuevas, modificadas y eliminadas')
+    evaluate.add_argument('--sin-duplicados', action='store_true', help='Escribe solo la primera fila de cada grupo con el mismo host normalizado y métricas')
+    evaluate.add_argument(
+        '--perfil', nargs='?', const='tiempos', choices=['tiempos', 'memoria', 'cprofile'],
+        help="Muestra tiempo y filas/s por etapa ('memoria': también el pico de memoria, más lento; 'cprofile': también cProfile)"
+    )
+    evaluate.add_argument('--perfil-jsonl', help='Añade las mediciones por etapa a este archivo JSON lines (por defecto PBN_PERFILADO_LOG)')
+    evaluate.set_defaults(func=_cmd_evaluate)
+
+    sweep = subparsers.add_parser('sweep', help='Barrido what-if de pesos y umbrales sobre un archivo de dominios')
+    sweep.add_argument('entrada', help='Archivo de entrada (.csv o .xlsx)')
+    sweep.add_argument('--configuraciones', required=True, help="JSON con 'rejilla', 'aleatorio' y/o 'configuraciones' (cambios sobre el perfil base)")
+    sweep.add_argument('-o', '--output', required=True, help='Resumen por configuración (.csv o .parquet); la fila 0 es el perfil base')
+    sweep.add_argument('--reglas', help='Perfil de reglas base (por defecto, el perfil por defecto)')
+    sweep.set_defaults(func=_cmd_sweep)
+
+    serve = subparsers.add_parser('serve', help='Servicio HTTP/JSON local para puntuar dominios sueltos')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--ventana-ms', type=float, default=None, help='Espera para agrupar peticiones en un lote (por defecto PBN_SERVICIO_VENTANA_MS o 5)')
+    serve.add_argument('--max-lote', type=int, default=None, help='Dominios por lote como máximo (por defecto PBN_SERVICIO_MAX_LOTE o 256)')
+    serve.add_argument('--reglas', help='Perfil de reglas JSON (pesos, umbrales y puntos; ver perfiles/)')
+    serve.set_defaults(func=_cmd_serve)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
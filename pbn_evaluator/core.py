@@ -0,0 +1,1886 @@
+"""Núcleo del evaluador de dominios: preparación, Trust Score, detección PBN y whitelist.
+
+No depende de Streamlit; lo usan la interfaz (app2.py) y la línea de comandos.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import os
+from datetime import datetime
+import csv
+import hashlib
+import io
+import json
+import math
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .perfilado import etapa
+from .perfiles import perfil_reglas
+
+# =========================================================
+# CONFIGURACIÓN Y FUNCIONES BASE (DEL CÓDIGO COLAB ORIGINAL)
+# =========================================================
+
+# Límite blando: las entradas con más filas se procesan por bloques de BATCH_LIMIT
+# filas (sin truncar). Configurable con la variable de entorno PBN_BATCH_LIMIT.
+BATCH_LIMIT = int(os.environ.get('PBN_BATCH_LIMIT', 50000))
+
+# Procesos para la evaluación (1 = sin paralelismo). Configurable con PBN_WORKERS.
+WORKERS = int(os.environ.get('PBN_WORKERS', 1))
+
+WHITELIST_DOMAINS = [
+    'kommo.com', 'amocrm.com', 'hubspot.com', 'salesforce.com',
+    'zoho.com', 'microsoft.com', 'google.com', 'facebook.com',
+    'linkedin.com', 'twitter.com', 'instagram.com',
+    'zapier.com', 'notion.so', 'notion.com', 'slack.com', 'asana.com',
+    'trello.com', 'calendly.com', 'airtable.com', 'medium.com',
+    'wix.com', 'wordpress.com', 'spotify.com', 'canva.com',
+    'github.com', 'gitlab.com', 'stripe.com', 'paypal.com',
+    'tableau.com', 'intercom.com'
+]
+
+EXCEPT_DOMAINS = [
+    'zapier.com', 'canva.com', 'notion.so', 'notion.com', 'slack.com',
+    'asana.com', 'trello.com', 'calendly.com', 'airtable.com',
+    'github.com', 'gitlab.com', 'stripe.com', 'paypal.com',
+    'intercom.com', 'medium.com', 'wix.com'
+]
+
+# --- Parámetros del Trust Score ---
+# DR mínimo, pesos y umbrales: ver perfiles.PERFIL_POR_DEFECTO. '{dr_minimo}' se
+# sustituye por el DR mínimo del perfil vigente.
+LABEL_DR_NO_ACEPTABLE = '❌ NO ACEPTABLE - DR menor a {dr_minimo}'
+LABEL_EXCELENTE = '✅ Excelente - Dominio fuerte y confiable'
+LABEL_ACEPTABLE = '⚠️ Aceptable - Dominio decente'
+LABEL_RIESGOSO = '❌ Riesgoso - Poca autoridad o posible spam'
+LABEL_WHITELIST = '✅ Excelente - Marca Legítima / Whitelist'
+
+REASON_DR_NO_ACEPTABLE = "DR ({dr}) no cumple el requisito mínimo de {dr_minimo} para ser considerado."
+
+# --- Parámetros de Detección PBN ---
+# Umbrales y puntos de cada regla: ver perfiles.PERFIL_POR_DEFECTO
+RIESGO_DR_NO_ACEPTABLE = "🔴 NO ACEPTABLE - DR menor a {dr_minimo}"
+RECOMENDACIONES_DR_NO_ACEPTABLE = ("❌ Descartar dominio - No cumple criterio básico de DR",)
+RIESGO_WHITELIST = "✅ BAJO RIESGO - Dominio Whitelist"
+
+PATRONES_PBN = ['review', 'best', 'top', 'buy', 'cheap', 'discount', 'blog', 'news', 'hub', 'center', 'network', 'express']
+
+# (nivel de riesgo, recomendaciones) de mayor a menor; los puntos mínimos de cada
+# nivel son los de 'pbn.niveles_riesgo' del perfil (alto, moderado, bajo y el resto)
+NIVELES_RIESGO_PBN = [
+    ("🔴 ALTO RIESGO - Posible PBN",
+     ("❌ EVITAR este dominio para linkbuilding", "📊 Revisar manualmente el perfil de backlinks", "🔍 Verificar historial del dominio en Wayback Machine", "🌐 Revisar diversidad geográfica de los referring domains")),
+    ("🟡 RIESGO MODERADO - Posibles señales de PBN",
+     ("⚠️ Investigar más a fondo antes de proceder", "📈 Analizar calidad del contenido del dominio", "🔗 Revisar naturalidad del perfil de links", "🌍 Verificar diversidad de IPs y TLDs")),
+    ("🟠 RIESGO BAJO - Algunas señales de alerta",
+     ("🔎 Revisar manualmente antes de decidir", "📊 Analizar tendencia de métricas en el tiempo", "🌐 Verificar relevancia temática")),
+    ("✅ BAJO RIESGO - Perfil natural",
+     ("✅ Perfil de backlinks parece natural",)),
+]
+
+# Tabla de mensajes de alerta PBN: el bit i del bitmask 'PBN_Reglas' corresponde a MENSAJES_PBN[i].
+# El orden es el mismo en que detectar_pbn añade las alertas.
+MENSAJES_PBN = [
+    ('except_domain', "ℹ️ Dominio en EXCEPT_DOMAINS ({ex}): aplicando tolerancia extra"),
+    ('ips_baja_diversidad', "🚩 Baja diversidad de IPs ({div_pct:.1f}%) - Posible hosting concentrado"),
+    ('ips_diversidad_ok', "✅ Diversidad de IPs aceptable ({div_pct:.1f}%)"),
+    ('backlinks_densidad_alta', "🚩 Alta densidad de backlinks ({bl_por_rd:.1f} por dominio) - Patrón artificial"),
+    ('backlinks_densidad_ok', "✅ Densidad de backlinks normal ({bl_por_rd:.1f} por dominio)"),
+    ('refdom_followed_alto', "🟠 Porcentaje de referring domains followed muy alto ({follow_pct:.2f}%) - Revisar"),
+    ('dr_vs_trafico', "🚩 DR alto ({dr}) vs tráfico bajo ({traffic}) - Autoridad posiblemente artificial"),
+    ('dr_vs_refdomains', "🚩 DR muy alto ({dr}) con pocos referring domains ({refdomains})"),
+    ('dr_vs_refdomains_antiguo', "⚠️ DR alto con pocos RD, pero dominio antiguo ({domain_age} años)"),
+    ('dominio_nuevo', "🚩 Dominio muy nuevo ({domain_age} años) - Posible PBN reciente"),
+    ('dominio_antiguo', "✅ Dominio antiguo ({domain_age} años) - Señal positiva de trust"),
+    ('tlds_autoridad_ok', "✅ Buen porcentaje de TLDs de autoridad ({tlds_pct:.1f}%)"),
+    ('tlds_autoridad_ninguno', "⚠️ Ningún link desde TLDs de autoridad (.edu/.gov/.org)"),
+    ('anchors_marca_bajo', "⚠️ Bajo porcentaje de anchor text de marca - Posible sobre-optimización"),
+    ('anchors_marca_ok', "✅ Buen porcentaje de anchor text de marca ({brand_pct:.1f}%) - Señal de marca legítima"),
+    ('dofollow_alto', "🟠 Porcentaje dofollow muy alto ({blf_pct:.2f}%) - Revisar"),
+    ('dofollow_bajo', "⚠️ Porcentaje dofollow muy bajo ({blf_pct:.1f}%) - Perfil anormal"),
+    ('ur_bajo_pagina_interna', "⚠️ DR alto ({dr}) pero URL Rating bajo ({url_rating}) - Posible página interna"),
+    ('ur_bajo', "🚩 DR alto ({dr}) pero URL Rating bajo ({url_rating}) - Autoridad posiblemente artificial"),
+    ('patron_pbn', "🚩 Dominio con patrón típico de PBN"),
+    ('senal_trafico', "✅ Tráfico orgánico alto - Señal positiva"),
+    ('senal_anchors', "✅ Alto porcentaje de anchors de marca - Señal positiva"),
+    ('senal_edad', "✅ Dominio antiguo - Señal positiva"),
+    ('senal_keywords', "✅ Muchas keywords orgánicas - Señal positiva"),
+    ('senales_multiples', "🔍 Múltiples señales de autoridad legítima detectadas - Reduciendo sospecha"),
+    ('senales_algunas', "🔍 Algunas señales de autoridad legítima detectadas"),
+    ('dominio_consolidado', "✅ Dominio altamente consolidado: aplicada reducción adicional de sospecha (-{consolidado})"),
+    ('dr_no_aceptable', "DR ({dr}) no cumple el requisito mínimo de {dr_minimo}"),
+]
+PBN_BIT = {codigo: 1 << i for i, (codigo, _) in enumerate(MENSAJES_PBN)}
+# Tras los bits de alerta se guarda el nivel de riesgo previo al ajuste por whitelist
+# (determina las recomendaciones).
+PBN_BIT_NIVEL = [1 << (len(MENSAJES_PBN) + i) for i in range(len(NIVELES_RIESGO_PBN))]
+
+ALERTA_WHITELIST = "✅ Dominio de Marca Legítima/Whitelist detectado."
+
+def _con_dr_minimo(plantilla, perfil, **valores):
+    """Rellena '{dr_minimo}' (y 'valores') en un texto con el DR mínimo del perfil."""
+    return plantilla.format(dr_minimo=f'{perfil.dr_minimo:g}', **valores)
+
+# --- Lógica de utilidades (find_col, calcular_edad_dominio) ---
+def find_col(cols, candidates):
+    """Busca una columna siendo tolerante a mayúsculas/minúsculas y espacios."""
+    lc = {c.lower().strip(): c for c in cols}
+    for cand in candidates:
+        for k,v in lc.items():
+            if cand.lower() == k:
+                return v
+    for cand in candidates:
+        for k,v in lc.items():
+            if cand.lower() in k:
+                return v
+    return None
+
+# --- Mapeo de columnas (perfiles cacheados por cabecera) ---
+# Candidatos por campo, en orden de preferencia (mapeo del script original)
+CANDIDATOS_COLUMNAS = {
+    'target': ['Target','target','domain','url'],
+    'dr': ['Domain Rating','DR','domain rating','Domain Authority','DA'],
+    'organic_traffic': ['Organic / Traffic','Organic Traffic','Traffic','Organic search'],
+    'refdomains_all': ['Ref. domains / All','Referring domains','ref domains'],
+    'refdomains_followed': ['Ref. domains / Followed','followed'],
+    'refdomains_nofollowed': ['Ref. domains / Not followed', 'Ref Domains Nofollow'],
+    'backlinks_all': ['Backlinks / All','Backlinks','backlinks'],
+    'backlinks_followed': ['Backlinks / Followed'],
+    'backlinks_nofollow': ['Backlinks / Not followed', 'Backlinks / Nofollow', 'Nofollow Backlinks'],
+    'ref_ips': ['Ref. IPs / IPs','Ref IPs'],
+    'ref_subnets': ['Ref. IPs / Subnets','subnets'],
+    'domain_age': ['Domain Age', 'Age', 'Created', 'Creation Date'],
+    'pct_authority_tlds': ['Authority TLDs', 'EduGov Links', 'Educational Links'],
+    'pct_brand_anchors': ['Brand Anchors', 'Branded Anchors', 'Anchor Brand'],
+    'url_rating': ['URL Rating', 'UR', 'url_rating'],
+    'ahrefs_rank': ['Ahrefs Rank', 'ahrefs_rank'],
+    'organic_keywords': ['Organic / Total Keywords', 'Keywords', 'organic_keywords'],
+}
+
+# Archivo donde se guardan los perfiles resueltos ('' desactiva la persistencia)
+RUTA_PERFILES_COLUMNAS = os.environ.get(
+    'PBN_PERFILES_COLUMNAS',
+    os.path.join(os.path.expanduser('~'), '.pbn_evaluator', 'perfiles_columnas.json')
+)
+MAX_PERFILES_COLUMNAS = 200
+
+_PERFILES_COLUMNAS = None  # OrderedDict {firma de cabecera: perfil} (LRU), cargado bajo demanda
+# Las sesiones de Streamlit resuelven cabeceras desde hilos distintos
+_LOCK_PERFILES = threading.Lock()
+
+def firma_cabecera(cols):
+    """Hash de la fila de cabecera (y de los candidatos, para invalidar si cambian)."""
+    datos = json.dumps([[str(c) for c in cols], CANDIDATOS_COLUMNAS], ensure_ascii=False)
+    return hashlib.sha1(datos.encode('utf-8')).hexdigest()
+
+def _cargar_perfiles():
+    """Perfiles guardados (del menos al más usado); se llama con _LOCK_PERFILES adquirido."""
+    global _PERFILES_COLUMNAS
+    if _PERFILES_COLUMNAS is None:
+        _PERFILES_COLUMNAS = OrderedDict()
+        if RUTA_PERFILES_COLUMNAS:
+            try:
+                with open(RUTA_PERFILES_COLUMNAS, encoding='utf-8') as f:
+                    _PERFILES_COLUMNAS = OrderedDict(json.load(f))
+            except (OSError, ValueError, TypeError):
+                pass
+    return _PERFILES_COLUMNAS
+
+def _guardar_perfiles(perfiles):
+    if not RUTA_PERFILES_COLUMNAS:
+        return
+    try:
+        os.makedirs(os.path.dirname(RUTA_PERFILES_COLUMNAS) or '.', exist_ok=True)
+        tmp = RUTA_PERFILES_COLUMNAS + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(perfiles, f, ensure_ascii=False)
+        os.replace(tmp, RUTA_PERFILES_COLUMNAS)
+    except OSError:
+        pass  # sin permisos de escritura: el perfil queda solo en memoria
+
+def _resolver_mapeo_sin_cache(cols):
+    """Resuelve el mapeo campo -> columna con la misma prioridad que find_col."""
+    lc = {str(c).lower().strip(): c for c in cols}
+    columnas, avisos = {}, []
+    for campo, candidatos in CANDIDATOS_COLUMNAS.items():
+        elegida = None
+        for cand in candidatos:
+            if cand.lower() in lc:
+                elegida = lc[cand.lower()]
+                break
+        else:
+            for cand in candidatos:
+                coincidencias = [v for k, v in lc.items() if cand.lower() in k]
+                if coincidencias:
+                    elegida = coincidencias[0]
+                    aviso = f"'{campo}': sin coincidencia exacta, se usa la columna '{elegida}' (contiene '{cand}')"
+                    if len(coincidencias) > 1:
+                        aviso += f"; otras candidatas: {', '.join(repr(str(c)) for c in coincidencias[1:])}"
+                    avisos.append(aviso)
+                    break
+        columnas[campo] = elegida
+
+    usadas = {}
+    for campo, col in columnas.items():
+        if col is not None:
+            usadas.setdefault(col, []).append(campo)
+    for col, campos in usadas.items():
+        if len(campos) > 1:
+            avisos.append(f"La columna '{col}' coincide con varios campos ({', '.join(campos)}); se usa para '{campos[-1]}'")
+
+    return {'columnas': columnas, 'avisos': avisos}
+
+def resolver_mapeo(cols):
+    """Devuelve el perfil de mapeo {'columnas': {campo: columna}, 'avisos': [...]} de una cabecera.
+
+    El perfil se cachea por firma de cabecera en memoria y en RUTA_PERFILES_COLUMNAS,
+    de modo que los archivos con el mismo formato de exportación no se vuelven a resolver.
+    Se conservan los MAX_PERFILES_COLUMNAS perfiles usados más recientemente (LRU).
+    'avisos' indica qué columna se eligió cuando la coincidencia no es exacta o es ambigua.
+    """
+    cols = list(cols)
+    firma = firma_cabecera(cols)
+    with _LOCK_PERFILES:
+        perfiles = _cargar_perfiles()
+        perfil = perfiles.get(firma)
+        if perfil is not None:
+            perfiles.move_to_end(firma)
+            return perfil
+    perfil = _resolver_mapeo_sin_cache(cols)
+    with _LOCK_PERFILES:
+        perfiles[firma] = perfil
+        while len(perfiles) > MAX_PERFILES_COLUMNAS:
+            perfiles.popitem(last=False)
+        # Solo se persisten cabeceras de texto (JSON no conserva otros tipos de columna)
+        if all(isinstance(c, str) for c in cols):
+            _guardar_perfiles(perfiles)
+    return perfil
+
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y.%m.%d', '%Y']
+
+def calcular_edad_dominio(creation_date, ahora=None):
+    """Convierte la fecha de creación a edad en años (lógica del Colab)."""
+    if pd.isna(creation_date) or creation_date == 0:
+        return 0
+
+    ahora = ahora or datetime.now()
+    try:
+        if isinstance(creation_date, str):
+            created = None
+            for fmt in FORMATOS_FECHA:
+                try:
+                    created = datetime.strptime(creation_date, fmt)
+                    break
+                except ValueError:
+                    continue
+            if created is None:
+                return 0
+        elif isinstance(creation_date, (int, float)):
+            if creation_date > 1900 and creation_date <= ahora.year:
+                 return max(0, ahora.year - int(creation_date))
+            return 0
+        elif isinstance(creation_date, datetime):
+            created = creation_date
+        else:
+            return 0
+
+        edad = (ahora - created).days / 365.25
+        return round(edad, 1)
+
+    except Exception:
+        return 0
+
+def calcular_edades(serie, ahora=None):
+    """Versión vectorizada de la edad del dominio para una columna completa.
+
+    Trabaja solo sobre los valores únicos: las fechas reales se usan directamente, los
+    años numéricos se tratan como el texto 'AAAA' y los textos se prueban formato a
+    formato con pd.to_datetime sobre todos los pendientes; lo que quede se resuelve con
+    calcular_edad_dominio. Usa una única referencia 'ahora' para todo el lote.
+    """
+    return _edades_y_fechas(serie, ahora)[0]
+
+def _edades_y_fechas(serie, ahora=None):
+    """(edad en años, fecha de creación en días desde 1970 o 0 si no es una fecha) de cada fila."""
+    ahora = ahora or datetime.now()
+    codigos, unicos = pd.factorize(serie)
+    edades = [0] * len(unicos)
+
+    fechas, textos = {}, {}
+    for i, valor in enumerate(unicos):
+        if isinstance(valor, (datetime, np.datetime64)):
+            fechas[i] = pd.Timestamp(valor).tz_localize(None)
+        elif isinstance(valor, (int, float, np.number)) and not isinstance(valor, (bool, np.bool_)):
+            if float(valor).is_integer():
+                textos[i] = str(int(valor))
+        elif isinstance(valor, str) and valor.strip():
+            textos[i] = valor.strip()
+
+    # Formatos de fecha aplicados a todos los textos pendientes a la vez
+    pendientes = pd.Series(textos, dtype=object)
+    for fmt in FORMATOS_FECHA:
+        if pendientes.empty:
+            break
+        parseadas = pd.to_datetime(pendientes, format=fmt, errors='coerce')
+        ok = parseadas.notna()
+        fechas.update(parseadas[ok].items())
+        pendientes = pendientes[~ok]
+
+    creacion = [0] * len(unicos)
+    if fechas:
+        fechas = pd.Series(fechas)
+        dias = (pd.Timestamp(ahora) - fechas).dt.days
+        for i, d in dias.items():
+            edades[i] = round(d / 365.25, 1)
+        for i, d in (fechas - pd.Timestamp(0)).dt.days.items():
+            creacion[i] = d
+    # Valores que pd.to_datetime no admite (p. ej. años fuera de rango) siguen la lógica original
+    for i, texto in pendientes.items():
+        edades[i] = calcular_edad_dominio(texto, ahora)
+
+    # Los nulos (código -1) toman el 0 añadido al final, también si no hay ningún valor
+    resultado = pd.Series(edades + [0], dtype=object).take(codigos)
+    return (
+        pd.Series(resultado.tolist(), index=serie.index),
+        pd.Series(np.array(creacion + [0], dtype='int32')[codigos], index=serie.index)
+    )
+
+# --- Lógica de preparación (prepare_df_tolerant) ---
+def _limpiar_columna_numerica(serie):
+    """Convierte una columna a numérica (separadores de miles, 'N/A' y vacíos -> 0).
+
+    Las columnas ya numéricas no pasan por texto; las de texto se limpian en una sola pasada.
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.fillna(0)
+
+    txt = serie if isinstance(serie.dtype, pd.StringDtype) else serie.astype(str)
+    txt = txt.str.strip()
+    if txt.str.contains(',', regex=False).any():
+        txt = txt.str.replace(',', '', regex=False)
+    vacios = txt.isin(['', 'N/A'])
+    if vacios.any():
+        txt = txt.mask(vacios, '0')
+    return pd.to_numeric(txt, errors='coerce').fillna(0)
+
+def _dividir(numerador, denominador, defecto=0.0):
+    """División por columnas protegida: devuelve 'defecto' donde el denominador no es > 0."""
+    num = numerador.to_numpy(dtype='float64')
+    den = denominador.to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / den, defecto)
+
+def prepare_df_tolerant(df, ahora=None):
+    """Prepara y limpia el DataFrame, calculando métricas derivadas.
+
+    'ahora' es la fecha de referencia para la edad del dominio (por defecto, el momento actual).
+    """
+    mapping = resolver_mapeo(df.columns)['columnas']
+
+    rename_map = {v:k for k,v in mapping.items() if v is not None}
+    df2 = df.rename(columns=rename_map)
+
+    if 'target' not in df2.columns:
+        df2['target'] = df.index.astype(str)
+    
+    # Conversión y limpieza de datos
+    for k in mapping.keys():
+        if k == 'target': continue
+
+        # 1. Asegurar la columna
+        if k not in df2.columns:
+            df2[k] = 0
+
+        # 2. Aplicar lógica de conversión
+        if k == 'domain_age':
+            # CÁLCULO DE EDAD (vectorizado sobre valores únicos); la fecha de creación
+            # normalizada se conserva para la firma, que no debe depender de 'ahora'
+            df2[k], df2['Fecha_Creacion'] = _edades_y_fechas(df2[k], ahora)
+        else:
+            # LIMPIEZA GENÉRICA Y CONVERSIÓN A NUMÉRICO
+            df2[k] = _limpiar_columna_numerica(df2[k])
+    
+    # Cálculos derivados (divisiones protegidas por columnas). Todas las columnas del
+    # mapeo existen en este punto, por lo que no hacen falta los valores por defecto
+    # del script original para columnas ausentes.
+    backlinks_all = df2['backlinks_all']
+    refdomains_all = df2['refdomains_all']
+
+    df2['RefDom_por_Backlink'] = _dividir(refdomains_all, backlinks_all)
+    df2['Traffico_por_RefDom'] = _dividir(df2['organic_traffic'], refdomains_all)
+    df2['Pct_RefDom_Nofollowed'] = _dividir(df2['refdomains_nofollowed'], refdomains_all)
+    for col, valores in _ratios_evaluacion(df2).items():
+        df2[col] = valores
+
+    df2['pct_authority_tlds'] = df2['pct_authority_tlds'].clip(0, 100) / 100
+    df2['pct_brand_anchors'] = df2['pct_brand_anchors'].clip(0, 100) / 100
+
+    return df2.fillna(0)
+
+def _ratios_evaluacion(df):
+    """Ratios que usa la evaluación, calculados a partir de las métricas limpias."""
+    backlinks_all = df['backlinks_all']
+    pct_backlinks_nofollow = _dividir(df['backlinks_nofollow'], backlinks_all, 0.2)
+    return {
+        'Pct_RefDom_Followed': _dividir(df['refdomains_followed'], df['refdomains_all']),
+        'Pct_Backlinks_Followed': np.where(backlinks_all.to_numpy() > 0, 1 - pct_backlinks_nofollow, 0.8),
+        'Pct_Backlinks_Nofollow': pct_backlinks_nofollow,
+        'RefIP_Diversidad': _dividir(df['ref_subnets'], df['ref_ips']),
+    }
+
+def completar_ratios(df):
+    """Añade a un resultado de run_analysis los ratios de la evaluación, que no se guardan en él.
+
+    Se calculan con las mismas operaciones que prepare_df_tolerant, así que los valores
+    son idénticos. Los DataFrames que ya traen ratios (preparados o snapshots antiguos)
+    se devuelven sin cambios.
+    """
+    if any(col in df.columns for col in COLUMNAS_RATIOS):
+        return df
+    return df.assign(**_ratios_evaluacion(df))
+
+# --- Lógica de Scoring (simulate_score) ---
+def simulate_score(row):
+    """Calcula el Score principal (0-100) basado en la fórmula de pesos."""
+    # Extracción de datos con valores por defecto 0.0
+    dr = float(row.get('dr', 0))
+    traffic = float(row.get('organic_traffic', 0))
+    refdomains = float(row.get('refdomains_all', 0))
+    pct_bl_followed = float(row.get('Pct_Backlinks_Followed', 0))
+    pct_bl_nofollow = float(row.get('Pct_Backlinks_Nofollow', 0))
+    refip_div = float(row.get('RefIP_Diversidad', 0))
+    domain_age = float(row.get('domain_age', 0))
+    pct_authority_tlds = float(row.get('pct_authority_tlds', 0))
+    pct_brand_anchors = float(row.get('pct_brand_anchors', 0))
+    url_rating = float(row.get('url_rating', 0))
+    backlinks = float(row.get('backlinks_all', 0))
+
+    perfil = perfil_reglas()
+    if dr <= perfil.dr_minimo:
+        return 0, _con_dr_minimo(LABEL_DR_NO_ACEPTABLE, perfil), _con_dr_minimo(REASON_DR_NO_ACEPTABLE, perfil, dr=int(dr))
+
+    # Pesos del perfil
+    pesos = perfil.pesos
+    scores = {}
+
+    # 1. CALIDAD POR DR
+    dr_quality = min(100, dr)
+    scores['dr_quality'] = dr_quality * pesos['dr_quality']
+
+    # 2. AUTORIDAD POR TRÁFICO
+    traffic_score = min(100, math.log10(traffic) * 25) if traffic > 0 else 0
+    expected_traffic = dr * 1000
+    traffic_quality_ratio = min(2, traffic / expected_traffic) if expected_traffic > 0 else 1
+    traffic_authority = traffic_score * traffic_quality_ratio
+    scores['traffic_authority'] = min(100, traffic_authority) * pesos['traffic_authority']
+
+    # 3. PERFIL DE LINKS
+    link_profile_score = 0
+    ip_diversity = min(100, refip_div * 100) * 0.3
+    
+    if backlinks > 0:
+        rd_bl_ratio = refdomains / backlinks
+        ratio_score = 100 if 0.05 <= rd_bl_ratio <= 0.5 else max(0, 100 - abs(rd_bl_ratio - 0.2) * 500)
+    else:
+        ratio_score = 0
+    ratio_component = ratio_score * 0.3
+    anchor_score = min(100, pct_brand_anchors * 200) * 0.2
+    follow_score = 100 * 0.2 if 0.7 <= pct_bl_followed <= 0.9 else 50 * 0.2
+
+    link_profile_score = ip_diversity + ratio_component + anchor_score + follow_score
+    scores['link_profile'] = min(100, link_profile_score) * pesos['link_profile']
+
+    # 4. SEÑALES DE TRUST
+    trust_signals_score = 0
+    age_score = min(100, (domain_age / 20) * 100) if domain_age > 0 else 0
+    trust_signals_score += age_score * 0.4
+    tld_score = min(100, pct_authority_tlds * 500)
+    trust_signals_score += tld_score * 0.3
+    ur_score = min(100, url_rating * 2.5)
+    trust_signals_score += ur_score * 0.3
+
+    scores['trust_signals'] = min(100, trust_signals_score) * pesos['trust_signals']
+
+    # CÁLCULO FINAL
+    raw_score = sum(scores.values())
+    score = int(max(1, min(100, round(raw_score))))
+
+    # Construir razón para descarga
+    reason = _construir_reason(perfil, dr, traffic, refdomains, pct_bl_followed, pct_bl_nofollow,
+                               domain_age, pct_authority_tlds, pct_brand_anchors, url_rating)
+
+    # Clasificación
+    if score >= perfil.umbral_excelente:
+        label = LABEL_EXCELENTE
+    elif score >= perfil.umbral_aceptable:
+        label = LABEL_ACEPTABLE
+    else:
+        label = LABEL_RIESGOSO
+
+    return score, label, reason
+
+def _num_col(df, col):
+    """Devuelve la columna como array float64 (o ceros si no existe), igual que row.get(col, 0)."""
+    if col in df.columns:
+        return df[col].to_numpy(dtype='float64', na_value=0.0)
+    return np.zeros(len(df), dtype='float64')
+
+def _construir_reason(perfil, dr, traffic, refdomains, pct_bl_followed, pct_bl_nofollow,
+                      domain_age, pct_authority_tlds, pct_brand_anchors, url_rating):
+    """Texto 'Reason' de simulate_score para un dominio (valores ya como float)."""
+    if dr <= perfil.dr_minimo:
+        return _con_dr_minimo(REASON_DR_NO_ACEPTABLE, perfil, dr=int(dr))
+    reason_parts = [
+        f"DR: {int(dr)}",
+        f"Tráfico: {int(traffic)}",
+        f"RefDom: {int(refdomains)}",
+        f"Dofollow: {pct_bl_followed*100:.1f}%",
+        f"Nofollow: {pct_bl_nofollow*100:.1f}%",
+    ]
+    if domain_age > 0: reason_parts.append(f"Edad: {domain_age} años")
+    if pct_authority_tlds > 0: reason_parts.append(f"TLDs autoridad: {pct_authority_tlds*100:.1f}%")
+    if pct_brand_anchors > 0: reason_parts.append(f"Anchors marca: {pct_brand_anchors*100:.1f}%")
+    if url_rating > 0: reason_parts.append(f"URL Rating: {url_rating}")
+    return ".\n".join(reason_parts)
+
+# Componentes del Score, en el orden en que se suman (claves de 'score.pesos' del perfil)
+COMPONENTES_SCORE = ['dr_quality', 'traffic_authority', 'link_profile', 'trust_signals']
+
+def componentes_score(df):
+    """DR y componentes del Score (0-100, sin ponderar) de cada fila: (dr, matriz filas x COMPONENTES_SCORE).
+
+    No dependen del perfil de reglas: el Score es la suma de cada componente por su peso.
+    """
+    dr = _num_col(df, 'dr')
+    traffic = _num_col(df, 'organic_traffic')
+    refdomains = _num_col(df, 'refdomains_all')
+    pct_bl_followed = _num_col(df, 'Pct_Backlinks_Followed')
+    pct_bl_nofollow = _num_col(df, 'Pct_Backlinks_Nofollow')
+    refip_div = _num_col(df, 'RefIP_Diversidad')
+    domain_age = _num_col(df, 'domain_age')
+    pct_authority_tlds = _num_col(df, 'pct_authority_tlds')
+    pct_brand_anchors = _num_col(df, 'pct_brand_anchors')
+    url_rating = _num_col(df, 'url_rating')
+    backlinks = _num_col(df, 'backlinks_all')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. CALIDAD POR DR
+        dr_quality = np.minimum(100, dr)
+
+        # 2. AUTORIDAD POR TRÁFICO
+        traffic_score = np.where(traffic > 0, np.minimum(100, np.log10(traffic) * 25), 0.0)
+        expected_traffic = dr * 1000
+        traffic_quality_ratio = np.where(expected_traffic > 0, np.minimum(2, traffic / expected_traffic), 1.0)
+        traffic_authority = np.minimum(100, traffic_score * traffic_quality_ratio)
+
+        # 3. PERFIL DE LINKS
+        ip_diversity = np.minimum(100, refip_div * 100) * 0.3
+        rd_bl_ratio = np.where(backlinks > 0, refdomains / backlinks, 0.0)
+        ratio_score = np.where(
+            (rd_bl_ratio >= 0.05) & (rd_bl_ratio <= 0.5),
+            100.0,
+            np.maximum(0, 100 - np.abs(rd_bl_ratio - 0.2) * 500)
+        )
+        ratio_score = np.where(backlinks > 0, ratio_score, 0.0)
+        ratio_component = ratio_score * 0.3
+        anchor_score = np.minimum(100, pct_brand_anchors * 200) * 0.2
+        follow_score = np.where((pct_bl_followed >= 0.7) & (pct_bl_followed <= 0.9), 100 * 0.2, 50 * 0.2)
+        link_profile_score = ip_diversity + ratio_component + anchor_score + follow_score
+        link_profile = np.minimum(100, link_profile_score)
+
+        # 4. SEÑALES DE TRUST
+        age_score = np.where(domain_age > 0, np.minimum(100, (domain_age / 20) * 100), 0.0)
+        tld_score = np.minimum(100, pct_authority_tlds * 500)
+        ur_score = np.minimum(100, url_rating * 2.5)
+        trust_signals_score = 0 + age_score * 0.4 + tld_score * 0.3 + ur_score * 0.3
+        trust_signals = np.minimum(100, trust_signals_score)
+
+    return dr, np.column_stack([dr_quality, traffic_authority, link_profile, trust_signals])
+
+def simulate_score_batch(df):
+    """Versión vectorizada de simulate_score: calcula Score y Label para todo el DataFrame.
+
+    Replica la fórmula fila a fila (mismo orden de sumas y mismo redondeo) para que
+    Score y Label coincidan exactamente con simulate_score. El texto 'Reason' no se
+    genera aquí: construir_reason lo obtiene de las métricas al mostrar o exportar.
+    """
+    dr, componentes = componentes_score(df)
+    perfil = perfil_reglas()
+
+    # CÁLCULO FINAL (mismo orden de suma que sum(scores.values()))
+    raw_score = 0
+    for i, componente in enumerate(COMPONENTES_SCORE):
+        raw_score = raw_score + componentes[:, i] * perfil.pesos[componente]
+    rechazado = dr <= perfil.dr_minimo
+    score = np.clip(np.round(raw_score), 1, 100)
+    score = np.where(rechazado, 0, score).astype('int64')
+
+    # Clasificación
+    label = np.select(
+        [rechazado, score >= perfil.umbral_excelente, score >= perfil.umbral_aceptable],
+        [_con_dr_minimo(LABEL_DR_NO_ACEPTABLE, perfil), LABEL_EXCELENTE, LABEL_ACEPTABLE],
+        default=LABEL_RIESGOSO
+    )
+
+    return pd.DataFrame({'Score': score, 'Label': label}, index=df.index)
+
+# Métricas de las que sale el texto 'Reason' (en el orden de _construir_reason)
+COLUMNAS_REASON = [
+    'dr', 'organic_traffic', 'refdomains_all', 'Pct_Backlinks_Followed', 'Pct_Backlinks_Nofollow',
+    'domain_age', 'pct_authority_tlds', 'pct_brand_anchors', 'url_rating'
+]
+
+def construir_reason(df):
+    """Genera la columna 'Reason' (factores del Trust Score) de las filas recibidas a partir de sus métricas.
+
+    Se llama solo sobre las filas que se muestran o exportan; el texto es el mismo
+    que devuelve simulate_score con el perfil vigente.
+    """
+    perfil = perfil_reglas()
+    df = completar_ratios(df)
+    valores = [_num_col(df, col).tolist() for col in COLUMNAS_REASON]
+    return pd.Series([_construir_reason(perfil, *fila) for fila in zip(*valores)], index=df.index, dtype=object)
+
+# --- Normalización de hosts e índices de dominios ---
+# Esquema opcional, 'www.' opcional y host hasta el primer '/', '?', '#' o ':' (puerto)
+_RE_HOST = re.compile(r'^(?:[a-z][a-z0-9+.\-]*://)?(?:www\.)?([^/?#:\s]*)')
+
+def normalizar_host(target):
+    """Extrae el host de un target (sin esquema, 'www.', puerto ni ruta)."""
+    if not isinstance(target, str) and pd.isna(target):
+        return ''
+    return _RE_HOST.match(str(target).strip().lower()).group(1).rstrip('.')
+
+# _RE_HOST en dos sustituciones RE2 (textos de pyarrow): el \s de Python incluye \v y los espacios Unicode
+_RE2_PREFIJO_HOST = r'^(?:[a-z][a-z0-9+.\-]*://)?(?:www\.)?'
+_RE2_RESTO_HOST = r'(?s)[/?#:\s\x0b\x1c-\x1f\x85\p{Z}].*'
+
+def normalizar_hosts(targets):
+    """Versión vectorizada de normalizar_host para una columna de targets."""
+    texto = targets.astype(str).str.strip().str.lower()
+    if isinstance(texto.array, pd.arrays.ArrowStringArray):
+        # Sustituir en C++ es ~3 veces más rápido que extract, que recorre las filas en Python
+        hosts = texto.str.replace(_RE2_PREFIJO_HOST, '', regex=True).str.replace(_RE2_RESTO_HOST, '', regex=True)
+    else:
+        hosts = texto.str.extract(_RE_HOST, expand=False)
+    return hosts.fillna('').str.rstrip('.')
+
+def _por_valor_unico(funcion, serie):
+    """Aplica 'funcion' una vez por valor único de 'serie' y reparte los resultados por códigos (sin map)."""
+    codigos, unicos = pd.factorize(serie)
+    return pd.Series([funcion(valor) for valor in unicos.tolist()]).take(codigos).set_axis(serie.index)
+
+class IndiceDominios:
+    """Índice de sufijos por etiquetas invertidas ('com' -> 'kommo' -> ...).
+
+    Permite saber si un host es un dominio de la lista o un subdominio suyo con un
+    coste proporcional al número de etiquetas del host, no al tamaño de la lista.
+    """
+    _FIN = None  # clave que marca el final de un dominio de la lista
+
+    def __init__(self, dominios=()):
+        self._raiz = {}
+        self._total = 0
+        for dominio in dominios:
+            self.agregar(dominio)
+
+    def __len__(self):
+        return self._total
+
+    def agregar(self, dominio):
+        dominio = normalizar_host(dominio)
+        if not dominio:
+            return
+        nodo = self._raiz
+        for etiqueta in reversed(dominio.split('.')):
+            nodo = nodo.setdefault(etiqueta, {})
+        if self._FIN not in nodo:
+            self._total += 1
+        nodo[self._FIN] = dominio
+
+    def buscar(self, host):
+        """Devuelve el dominio de la lista que cubre a 'host' (igual o subdominio) o None."""
+        nodo = self._raiz
+        for etiqueta in reversed(host.split('.')):
+            nodo = nodo.get(etiqueta)
+            if nodo is None:
+                return None
+            if self._FIN in nodo:
+                return nodo[self._FIN]
+        return None
+
+    def buscar_serie(self, hosts):
+        """Aplica buscar a una columna de hosts (una búsqueda por host único)."""
+        return _por_valor_unico(self.buscar, hosts)
+
+def _regex_trie(palabras):
+    """Construye una regex con las palabras agrupadas por prefijos comunes (trie)."""
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[None] = True
+
+    def construir(nodo):
+        ramas = [re.escape(c) + construir(nodo[c]) for c in sorted(k for k in nodo if k is not None)]
+        if not ramas:
+            return ''
+        fin = None in nodo
+        patron = '(?:' + '|'.join(ramas) + ')' if len(ramas) > 1 or fin else ramas[0]
+        return patron + '?' if fin else patron
+
+    return construir(trie)
+
+class MatcherPatrones:
+    """Busca muchos tokens a la vez con una única regex compilada (trie de prefijos).
+
+    El coste por texto apenas crece con el número de patrones; devuelve el token
+    encontrado más a la izquierda (y el más largo en esa posición).
+    """
+
+    def __init__(self, patrones=()):
+        self.patrones = sorted({p.strip().lower() for p in patrones if p and p.strip()})
+        self._regex = re.compile(_regex_trie(self.patrones)) if self.patrones else None
+
+    def __len__(self):
+        return len(self.patrones)
+
+    def buscar(self, texto):
+        """Devuelve el token encontrado en 'texto' o None."""
+        if self._regex is None:
+            return None
+        m = self._regex.search(texto)
+        return m.group(0) if m else None
+
+    def buscar_serie(self, textos):
+        """Aplica buscar a una columna de textos (una búsqueda por valor único)."""
+        return _por_valor_unico(self.buscar, textos)
+
+_INDICE_WHITELIST = IndiceDominios(WHITELIST_DOMAINS)
+_INDICE_EXCEPT = IndiceDominios(EXCEPT_DOMAINS)
+_MATCHER_PBN = MatcherPatrones(PATRONES_PBN)
+
+def cargar_lista_dominios(ruta):
+    """Lee un archivo de dominios (uno por línea; se ignoran vacías y comentarios '#')."""
+    with open(ruta, encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.lstrip().startswith('#')]
+
+def configurar_listas(whitelist=None, except_domains=None, patrones_pbn=None):
+    """Sustituye WHITELIST_DOMAINS, EXCEPT_DOMAINS y/o PATRONES_PBN y recompila sus índices."""
+    global _INDICE_WHITELIST, _INDICE_EXCEPT, _MATCHER_PBN
+    if whitelist is not None:
+        WHITELIST_DOMAINS[:] = list(whitelist)
+        _INDICE_WHITELIST = IndiceDominios(WHITELIST_DOMAINS)
+    if except_domains is not None:
+        EXCEPT_DOMAINS[:] = list(except_domains)
+        _INDICE_EXCEPT = IndiceDominios(EXCEPT_DOMAINS)
+    if patrones_pbn is not None:
+        PATRONES_PBN[:] = list(patrones_pbn)
+        _MATCHER_PBN = MatcherPatrones(PATRONES_PBN)
+
+# --- Lógica de Detección PBN (detectar_pbn) ---
+def buscar_except_domain(dom_host):
+    """Devuelve el dominio de EXCEPT_DOMAINS que cubre al host, o None."""
+    return _INDICE_EXCEPT.buscar(dom_host)
+
+def _señal_marca(dr, traffic, pct_brand_anchors, domain_age):
+    """Señal de marca por métricas altas (funciona con escalares o arrays)."""
+    return (dr >= 70) & (traffic >= 50000) & (pct_brand_anchors >= 0.4) & (domain_age >= 3)
+
+def es_marca_whitelist(domain_data):
+    """Verifica si el dominio está en la whitelist o tiene señales de marca legítima."""
+    dominio = normalizar_host(domain_data.get('target', ''))
+    if _INDICE_WHITELIST.buscar(dominio) is not None:
+        return True
+
+    dr = domain_data.get('dr', 0)
+    traffic = domain_data.get('organic_traffic', 0)
+    pct_brand_anchors = domain_data.get('pct_brand_anchors', 0)
+    domain_age = domain_data.get('domain_age', 0)
+
+    # Señal de marca por métricas altas
+    return bool(_señal_marca(dr, traffic, pct_brand_anchors, domain_age))
+
+def es_marca_whitelist_batch(df, hosts=None):
+    """Versión vectorizada de es_marca_whitelist (hosts ya normalizados opcionales)."""
+    if hosts is None:
+        hosts = normalizar_hosts(df['target'])
+    en_whitelist = _INDICE_WHITELIST.buscar_serie(hosts).notna().to_numpy()
+    señal = _señal_marca(
+        _num_col(df, 'dr'), _num_col(df, 'organic_traffic'),
+        _num_col(df, 'pct_brand_anchors'), _num_col(df, 'domain_age')
+    )
+    return pd.Series(en_whitelist | señal, index=df.index)
+
+def detectar_pbn(domain_data):
+    """Detecta posibles redes de blogs privados basado en patrones comunes."""
+    puntos_sospecha = 0
+    alertas = []
+    recomendaciones = []
+
+    dr = domain_data.get('dr', 0)
+    perfil = perfil_reglas()
+    puntos = perfil.puntos
+
+    if dr <= perfil.dr_minimo: # Requisito mínimo
+        return {
+            'puntos_sospecha': perfil.puntos_dr_no_aceptable,
+            'nivel_riesgo': _con_dr_minimo(RIESGO_DR_NO_ACEPTABLE, perfil),
+            'alertas': [_con_dr_minimo(MENSAJES_PBN[-1][1], perfil, dr=dr)],
+            'recomendaciones': list(RECOMENDACIONES_DR_NO_ACEPTABLE)
+        }
+
+    # Extracción de datos (el resto del script utiliza estas variables)
+    dom_host = normalizar_host(domain_data.get('target',''))
+
+    # Aplicar tolerancia por EXCEPT_DOMAINS
+    try:
+        ex = buscar_except_domain(dom_host)
+        if ex is not None:
+            puntos_sospecha = max(0, puntos_sospecha - 1)
+            alertas.append(f"ℹ️ Dominio en EXCEPT_DOMAINS ({ex}): aplicando tolerancia extra")
+    except Exception:
+        pass
+    
+    traffic = domain_data.get('organic_traffic', 0)
+    refdomains = domain_data.get('refdomains_all', 0)
+    backlinks = domain_data.get('backlinks_all', 0)
+    pct_follow = domain_data.get('Pct_RefDom_Followed', 0)
+    ref_ips = domain_data.get('ref_ips', 0)
+    ref_subnets = domain_data.get('ref_subnets', 0)
+    domain_age = domain_data.get('domain_age', 0)
+    pct_authority_tlds = domain_data.get('pct_authority_tlds', 0)
+    pct_brand_anchors = domain_data.get('pct_brand_anchors', 0)
+    pct_bl_followed = domain_data.get('Pct_Backlinks_Followed', 0)
+    url_rating = domain_data.get('url_rating', 0)
+    organic_keywords = domain_data.get('organic_keywords', 0)
+
+    # 1. ANÁLISIS DE DIVERSIDAD DE IPs
+    if ref_ips > 0:
+        diversidad_ips = ref_subnets / ref_ips
+        umbral_diversidad = perfil.umbral_diversidad_ips(traffic)
+
+        if diversidad_ips < umbral_diversidad:
+            puntos_sospecha += puntos['ips_baja_diversidad']
+            alertas.append(f"🚩 Baja diversidad de IPs ({diversidad_ips*100:.1f}%) - Posible hosting concentrado")
+        else:
+            alertas.append(f"✅ Diversidad de IPs aceptable ({diversidad_ips*100:.1f}%)")
+
+    # 2. RELACIÓN BACKLINKS/REFDOMAINS
+    backlinks_per_refdomain = backlinks / max(1, refdomains)
+    umbral_backlinks_ratio = perfil.umbral_densidad_backlinks(refdomains)
+
+    if backlinks_per_refdomain > umbral_backlinks_ratio:
+        puntos_sospecha += puntos['backlinks_densidad_alta']
+        alertas.append(f"🚩 Alta densidad de backlinks ({backlinks_per_refdomain:.1f} por dominio) - Patrón artificial")
+    else:
+        alertas.append(f"✅ Densidad de backlinks normal ({backlinks_per_refdomain:.1f} por dominio)")
+
+    # 3. PORCENTAJE DE FOLLOWED LINKS
+    if pct_follow > 0.995:
+        puntos_sospecha += puntos['refdom_followed_alto']
+        alertas.append(f"🟠 Porcentaje de referring domains followed muy alto ({pct_follow*100:.2f}%) - Revisar")
+
+    # 4. DISCREPANCIA DR vs TRÁFICO
+    if dr > 50 and traffic < 1000:
+        señales_autoridad = 0
+        if pct_brand_anchors > 0.4: señales_autoridad += 1
+        if domain_age >= 5: señales_autoridad += 1
+        if pct_authority_tlds > 0.05: señales_autoridad += 1
+        if señales_autoridad < 2:
+            puntos_sospecha += puntos['dr_vs_trafico']
+            alertas.append(f"🚩 DR alto ({dr}) vs tráfico bajo ({traffic}) - Autoridad posiblemente artificial")
+
+    # 5. DISCREPANCIA DR vs REFDOMAINS
+    if dr > 60 and refdomains < 100:
+        if domain_age < 3:
+            puntos_sospecha += puntos['dr_vs_refdomains']
+            alertas.append(f"🚩 DR muy alto ({dr}) con pocos referring domains ({refdomains})")
+        else:
+            alertas.append(f"⚠️ DR alto con pocos RD, pero dominio antiguo ({domain_age} años)")
+
+    # 6. EDAD DEL DOMINIO
+    if domain_age < 1:
+        puntos_sospecha += puntos['dominio_nuevo']
+        alertas.append(f"🚩 Dominio muy nuevo ({domain_age} años) - Posible PBN reciente")
+    elif domain_age >= 5:
+        puntos_sospecha += puntos['dominio_antiguo']
+        alertas.append(f"✅ Dominio antiguo ({domain_age} años) - Señal positiva de trust")
+
+    # 7. TLDs DE AUTORIDAD
+    if pct_authority_tlds > 0.1:
+        puntos_sospecha += puntos['tlds_autoridad_ok']
+        alertas.append(f"✅ Buen porcentaje de TLDs de autoridad ({pct_authority_tlds*100:.1f}%)")
+    elif pct_authority_tlds == 0 and refdomains > 50:
+        puntos_sospecha += puntos['tlds_autoridad_ninguno']
+        alertas.append("⚠️ Ningún link desde TLDs de autoridad (.edu/.gov/.org)")
+
+    # 8. ANCHOR TEXT DE MARCA
+    if pct_brand_anchors < 0.3 and pct_brand_anchors > 0:
+        puntos_sospecha += puntos['anchors_marca_bajo']
+        alertas.append("⚠️ Bajo porcentaje de anchor text de marca - Posible sobre-optimización")
+    elif pct_brand_anchors >= 0.5:
+        puntos_sospecha += puntos['anchors_marca_ok']
+        alertas.append(f"✅ Buen porcentaje de anchor text de marca ({pct_brand_anchors*100:.1f}%) - Señal de marca legítima")
+
+    # 9. PORCENTAJE DOFOLLOW
+    if pct_bl_followed > 0.995:
+        puntos_sospecha += puntos['dofollow_alto']
+        alertas.append(f"🟠 Porcentaje dofollow muy alto ({pct_bl_followed*100:.2f}%) - Revisar")
+    elif pct_bl_followed < 0.5:
+        puntos_sospecha += puntos['dofollow_bajo']
+        alertas.append(f"⚠️ Porcentaje dofollow muy bajo ({pct_bl_followed*100:.1f}%) - Perfil anormal")
+
+    # 10. URL RATING vs DR
+    if dr > 50 and url_rating < 20:
+        dominio = domain_data.get('target', '')
+        if '/' in dominio and dominio.count('/') > 2:
+            puntos_sospecha += puntos['ur_bajo_pagina_interna']
+            alertas.append(f"⚠️ DR alto ({dr}) pero URL Rating bajo ({url_rating}) - Posible página interna")
+        else:
+            puntos_sospecha += puntos['ur_bajo']
+            alertas.append(f"🚩 DR alto ({dr}) pero URL Rating bajo ({url_rating}) - Autoridad posiblemente artificial")
+
+    # 11. ANÁLISIS DE CONTENIDO (tokens típicos de PBN en el host)
+    if _MATCHER_PBN.buscar(dom_host) is not None:
+        if pct_brand_anchors < 0.3:
+            puntos_sospecha += puntos['patron_pbn']
+            alertas.append("🚩 Dominio con patrón típico de PBN")
+
+    # 12. SEÑALES DE AUTORIDAD LEGÍTIMA (Bonificaciones)
+    señales_autoridad = 0
+    if traffic > 50000:
+        señales_autoridad += 1
+        alertas.append("✅ Tráfico orgánico alto - Señal positiva")
+    if pct_brand_anchors > 0.4:
+        señales_autoridad += 1
+        alertas.append("✅ Alto porcentaje de anchors de marca - Señal positiva")
+    if domain_age >= 5:
+        señales_autoridad += 1
+        alertas.append("✅ Dominio antiguo - Señal positiva")
+    if organic_keywords > 10000:
+        señales_autoridad += 1
+        alertas.append("✅ Muchas keywords orgánicas - Señal positiva")
+
+    reducciones = perfil.reducciones
+    if señales_autoridad >= 3:
+        puntos_sospecha = max(0, puntos_sospecha - reducciones['senales_multiples'])
+        alertas.append("🔍 Múltiples señales de autoridad legítima detectadas - Reduciendo sospecha")
+    elif señales_autoridad >= 2:
+        puntos_sospecha = max(0, puntos_sospecha - reducciones['senales_algunas'])
+        alertas.append("🔍 Algunas señales de autoridad legítima detectadas")
+
+    if domain_age >= 7 or traffic >= 50000 or refdomains >= 2000:
+        puntos_sospecha = max(0, puntos_sospecha - reducciones['dominio_consolidado'])
+        alertas.append(f"✅ Dominio altamente consolidado: aplicada reducción adicional de sospecha (-{reducciones['dominio_consolidado']})")
+
+    puntos_sospecha = max(0, puntos_sospecha)
+
+    # Clasificación final de riesgo
+    for umbral, (riesgo, recomendaciones) in zip(perfil.umbrales_riesgo, NIVELES_RIESGO_PBN):
+        if puntos_sospecha >= umbral:
+            break
+    recomendaciones = list(recomendaciones)
+
+    return {
+        'puntos_sospecha': puntos_sospecha,
+        'nivel_riesgo': riesgo,
+        'alertas': alertas,
+        'recomendaciones': recomendaciones
+    }
+
+# Reglas que dependen de los tramos del perfil (diversidad de IPs y densidad de backlinks)
+REGLAS_TRAMOS_PBN = ['ips_baja_diversidad', 'ips_diversidad_ok', 'backlinks_densidad_alta', 'backlinks_densidad_ok']
+
+def reglas_tramos_pbn(df, perfil):
+    """Bitmask de las reglas de REGLAS_TRAMOS_PBN disparadas con los tramos de 'perfil'."""
+    traffic = _num_col(df, 'organic_traffic')
+    refdomains = _num_col(df, 'refdomains_all')
+    backlinks = _num_col(df, 'backlinks_all')
+    ref_ips = _num_col(df, 'ref_ips')
+    ref_subnets = _num_col(df, 'ref_subnets')
+    reglas = np.zeros(len(df), dtype='int64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. ANÁLISIS DE DIVERSIDAD DE IPs
+        con_ips = ref_ips > 0
+        diversidad_ips = np.where(con_ips, ref_subnets / ref_ips, 0.0)
+        umbral_diversidad = perfil.umbral_diversidad_ips(traffic)
+        baja_diversidad = con_ips & (diversidad_ips < umbral_diversidad)
+        reglas[baja_diversidad] |= PBN_BIT['ips_baja_diversidad']
+        reglas[con_ips & ~baja_diversidad] |= PBN_BIT['ips_diversidad_ok']
+
+        # 2. RELACIÓN BACKLINKS/REFDOMAINS
+        backlinks_per_refdomain = backlinks / np.maximum(1, refdomains)
+        umbral_backlinks_ratio = perfil.umbral_densidad_backlinks(refdomains)
+        densidad_alta = backlinks_per_refdomain > umbral_backlinks_ratio
+        reglas[densidad_alta] |= PBN_BIT['backlinks_densidad_alta']
+        reglas[~densidad_alta] |= PBN_BIT['backlinks_densidad_ok']
+    return reglas
+
+def reglas_pbn_batch(df, hosts=None):
+    """Reglas PBN disparadas en cada fila (bitmask de PBN_BIT) y patrón encontrado en el host.
+
+    Del perfil solo dependen las reglas de reglas_tramos_pbn; los puntos, los niveles y
+    el requisito de DR se aplican después (puntos_pbn y detectar_pbn_batch).
+    """
+    n = len(df)
+    dr = _num_col(df, 'dr')
+    traffic = _num_col(df, 'organic_traffic')
+    refdomains = _num_col(df, 'refdomains_all')
+    pct_follow = _num_col(df, 'Pct_RefDom_Followed')
+    domain_age = _num_col(df, 'domain_age')
+    pct_authority_tlds = _num_col(df, 'pct_authority_tlds')
+    pct_brand_anchors = _num_col(df, 'pct_brand_anchors')
+    pct_bl_followed = _num_col(df, 'Pct_Backlinks_Followed')
+    url_rating = _num_col(df, 'url_rating')
+    organic_keywords = _num_col(df, 'organic_keywords')
+    target = df['target'].astype(str) if 'target' in df.columns else pd.Series('', index=df.index)
+
+    reglas = np.zeros(n, dtype='int64')
+
+    def disparar(mask, codigo):
+        reglas[mask] |= PBN_BIT[codigo]
+
+    # Aplicar tolerancia por EXCEPT_DOMAINS (con 0 puntos previos no cambia la puntuación)
+    if hosts is None:
+        hosts = normalizar_hosts(target)
+    disparar(_INDICE_EXCEPT.buscar_serie(hosts).notna().to_numpy(), 'except_domain')
+
+    # 1-2. DIVERSIDAD DE IPs Y RELACIÓN BACKLINKS/REFDOMAINS
+    reglas |= reglas_tramos_pbn(df, perfil_reglas())
+
+    # 3. PORCENTAJE DE FOLLOWED LINKS
+    disparar(pct_follow > 0.995, 'refdom_followed_alto')
+
+    # 4. DISCREPANCIA DR vs TRÁFICO
+    señales_autoridad = (
+        (pct_brand_anchors > 0.4).astype(int) + (domain_age >= 5) + (pct_authority_tlds > 0.05)
+    )
+    disparar((dr > 50) & (traffic < 1000) & (señales_autoridad < 2), 'dr_vs_trafico')
+
+    # 5. DISCREPANCIA DR vs REFDOMAINS
+    pocos_rd = (dr > 60) & (refdomains < 100)
+    disparar(pocos_rd & (domain_age < 3), 'dr_vs_refdomains')
+    disparar(pocos_rd & ~(domain_age < 3), 'dr_vs_refdomains_antiguo')
+
+    # 6. EDAD DEL DOMINIO
+    disparar(domain_age < 1, 'dominio_nuevo')
+    disparar(~(domain_age < 1) & (domain_age >= 5), 'dominio_antiguo')
+
+    # 7. TLDs DE AUTORIDAD
+    disparar(pct_authority_tlds > 0.1, 'tlds_autoridad_ok')
+    disparar(~(pct_authority_tlds > 0.1) & (pct_authority_tlds == 0) & (refdomains > 50), 'tlds_autoridad_ninguno')
+
+    # 8. ANCHOR TEXT DE MARCA
+    anchors_bajo = (pct_brand_anchors < 0.3) & (pct_brand_anchors > 0)
+    disparar(anchors_bajo, 'anchors_marca_bajo')
+    disparar(~anchors_bajo & (pct_brand_anchors >= 0.5), 'anchors_marca_ok')
+
+    # 9. PORCENTAJE DOFOLLOW
+    disparar(pct_bl_followed > 0.995, 'dofollow_alto')
+    disparar(~(pct_bl_followed > 0.995) & (pct_bl_followed < 0.5), 'dofollow_bajo')
+
+    # 10. URL RATING vs DR
+    ur_bajo = (dr > 50) & (url_rating < 20)
+    pagina_interna = (target.str.count('/') > 2).to_numpy()
+    disparar(ur_bajo & pagina_interna, 'ur_bajo_pagina_interna')
+    disparar(ur_bajo & ~pagina_interna, 'ur_bajo')
+
+    # 11. ANÁLISIS DE CONTENIDO (tokens típicos de PBN en el host)
+    patron = _MATCHER_PBN.buscar_serie(hosts)
+    con_patron = patron.notna().to_numpy()
+    disparar(con_patron & (pct_brand_anchors < 0.3), 'patron_pbn')
+
+    # 12. SEÑALES DE AUTORIDAD LEGÍTIMA (Bonificaciones)
+    señal_trafico = traffic > 50000
+    señal_anchors = pct_brand_anchors > 0.4
+    señal_edad = domain_age >= 5
+    señal_keywords = organic_keywords > 10000
+    disparar(señal_trafico, 'senal_trafico')
+    disparar(señal_anchors, 'senal_anchors')
+    disparar(señal_edad, 'senal_edad')
+    disparar(señal_keywords, 'senal_keywords')
+    señales_autoridad = señal_trafico.astype(int) + señal_anchors + señal_edad + señal_keywords
+
+    multiples = señales_autoridad >= 3
+    algunas = ~multiples & (señales_autoridad >= 2)
+    disparar(multiples, 'senales_multiples')
+    disparar(algunas, 'senales_algunas')
+    disparar((domain_age >= 7) | (traffic >= 50000) | (refdomains >= 2000), 'dominio_consolidado')
+
+    return reglas, patron
+
+def puntos_pbn(reglas, perfil):
+    """Puntos de sospecha a partir del bitmask de reglas: suma de los puntos del perfil y reducciones por señales de autoridad."""
+    puntos = np.zeros(len(reglas), dtype='int64')
+    for codigo, delta in perfil.puntos.items():
+        if delta:
+            puntos[(reglas & PBN_BIT[codigo]) != 0] += delta
+    # Reducciones en el orden de detectar_pbn, sin bajar de 0
+    for codigo in ('senales_multiples', 'senales_algunas', 'dominio_consolidado'):
+        aplica = (reglas & PBN_BIT[codigo]) != 0
+        puntos = np.where(aplica, np.maximum(0, puntos - perfil.reducciones[codigo]), puntos)
+    return np.maximum(0, puntos)
+
+def detectar_pbn_batch(df, hosts=None):
+    """Versión vectorizada de detectar_pbn sobre todo el DataFrame.
+
+    Cada regla es una máscara booleana (reglas_pbn_batch) con su delta de puntos. Devuelve
+    'puntos_sospecha', 'nivel_riesgo', 'reglas' (bitmask con las alertas disparadas y el
+    nivel de riesgo) y 'patron' (token de PATRONES_PBN encontrado en el host); los textos
+    se generan después con construir_textos_pbn solo para las filas necesarias.
+    """
+    dr = _num_col(df, 'dr')
+    perfil = perfil_reglas()
+    reglas, patron = reglas_pbn_batch(df, hosts=hosts)
+    puntos = puntos_pbn(reglas, perfil)
+
+    # Clasificación final de riesgo
+    condiciones = [puntos >= umbral for umbral in perfil.umbrales_riesgo]
+    riesgos = [riesgo for riesgo, _ in NIVELES_RIESGO_PBN]
+    nivel_riesgo = np.select(condiciones, riesgos, default=riesgos[-1]).astype(object)
+    reglas |= np.select(condiciones, PBN_BIT_NIVEL, default=PBN_BIT_NIVEL[-1])
+
+    # Requisito mínimo de DR: sustituye al resto de reglas
+    rechazado = dr <= perfil.dr_minimo
+    puntos[rechazado] = perfil.puntos_dr_no_aceptable
+    nivel_riesgo[rechazado] = _con_dr_minimo(RIESGO_DR_NO_ACEPTABLE, perfil)
+    reglas[rechazado] = PBN_BIT['dr_no_aceptable']
+
+    return pd.DataFrame(
+        {'puntos_sospecha': puntos, 'nivel_riesgo': nivel_riesgo, 'reglas': reglas,
+         'patron': patron.fillna('').to_numpy(dtype=object)},
+        index=df.index
+    )
+
+def construir_textos_pbn(df):
+    """Genera las columnas de texto PBN_Alertas y PBN_Recomendaciones a partir de 'PBN_Reglas'.
+
+    Se llama solo sobre las filas que se muestran o exportan. Las filas de Whitelist
+    muestran la alerta de marca; las recomendaciones siguen el nivel previo al ajuste.
+    """
+    df = completar_ratios(df)
+    plantillas = [plantilla for _, plantilla in MENSAJES_PBN]
+    bit_rechazo = PBN_BIT['dr_no_aceptable']
+    perfil = perfil_reglas()
+    textos_perfil = {
+        'dr_minimo': f'{perfil.dr_minimo:g}', 'consolidado': perfil.reducciones['dominio_consolidado']
+    }
+    es_whitelist = df['Es_Marca_Whitelist'] if 'Es_Marca_Whitelist' in df.columns else pd.Series(False, index=df.index)
+
+    alertas, recomendaciones = [], []
+    filas = zip(
+        df['PBN_Reglas'].tolist(), es_whitelist.tolist(), df['target'].astype(str).tolist(),
+        df['dr'].tolist(), df['organic_traffic'].tolist(), df['refdomains_all'].tolist(),
+        df['backlinks_all'].tolist(), df['domain_age'].tolist(), df['url_rating'].tolist(),
+        df['ref_ips'].tolist(), df['ref_subnets'].tolist(), df['Pct_RefDom_Followed'].tolist(),
+        df['Pct_Backlinks_Followed'].tolist(), df['pct_authority_tlds'].tolist(),
+        df['pct_brand_anchors'].tolist()
+    )
+    for (reglas, whitelist, target, dr, traffic, refdomains, backlinks, domain_age, url_rating,
+         ref_ips, ref_subnets, pct_follow, pct_bl_followed, pct_authority_tlds, pct_brand_anchors) in filas:
+        if reglas & bit_rechazo:
+            recomendaciones.append("\n".join(RECOMENDACIONES_DR_NO_ACEPTABLE))
+        else:
+            nivel = next(i for i, bit in enumerate(PBN_BIT_NIVEL) if reglas & bit)
+            recomendaciones.append("\n".join(NIVELES_RIESGO_PBN[nivel][1]))
+
+        if whitelist:
+            alertas.append(ALERTA_WHITELIST)
+            continue
+        valores = {
+            'ex': buscar_except_domain(normalizar_host(target)) if reglas & PBN_BIT['except_domain'] else None,
+            'div_pct': ref_subnets / ref_ips * 100 if ref_ips > 0 else 0, 'bl_por_rd': backlinks / max(1, refdomains),
+            'follow_pct': pct_follow * 100, 'dr': dr, 'traffic': traffic,
+            'refdomains': refdomains, 'domain_age': domain_age, 'url_rating': url_rating,
+            'tlds_pct': pct_authority_tlds * 100, 'brand_pct': pct_brand_anchors * 100,
+            'blf_pct': pct_bl_followed * 100, **textos_perfil,
+        }
+        alertas.append("\n".join(
+            plantilla.format(**valores) for i, plantilla in enumerate(plantillas) if reglas >> i & 1
+        ))
+
+    return pd.DataFrame({'PBN_Alertas': alertas, 'PBN_Recomendaciones': recomendaciones}, index=df.index)
+
+# --- Lógica de Ajuste por Whitelist ---
+def ajustar_por_whitelist(df):
+    """Aplica el ajuste final de Score y PBN a las filas que son marca de Whitelist."""
+    wl = df['Es_Marca_Whitelist'].to_numpy(dtype=bool)
+    if wl.any():
+        # Ajuste de Score
+        df.loc[wl, 'Score'] = np.maximum(df.loc[wl, 'Score'], 75)
+        df.loc[wl, 'Label'] = LABEL_WHITELIST
+        # Ajuste de PBN (la alerta de Whitelist se genera en construir_textos_pbn)
+        df.loc[wl, 'PBN_Puntos_Sospecha'] = 0
+        df.loc[wl, 'PBN_Nivel_Riesgo'] = RIESGO_WHITELIST
+    return df
+
+# --- FUNCIÓN PRINCIPAL DE ANÁLISIS ---
+# Columnas finales del resultado (display y descarga)
+COLUMNAS_RESULTADO = [
+    'target', 'dr', 'organic_traffic', 'domain_age',
+    'refdomains_all', 'backlinks_all', 'url_rating', 'organic_keywords',
+    'Score', 'Label', 'Reason',
+    'PBN_Puntos_Sospecha', 'PBN_Nivel_Riesgo', 'PBN_Alertas', 'PBN_Recomendaciones',
+    'PBN_Patron', 'Es_Marca_Whitelist'
+]
+# Métricas numéricas del resultado
+COLUMNAS_METRICAS = [
+    'dr', 'organic_traffic', 'domain_age', 'refdomains_all',
+    'backlinks_all', 'url_rating', 'organic_keywords'
+]
+# Ratios de la evaluación: no se guardan en el resultado, se derivan de sus métricas (completar_ratios)
+COLUMNAS_RATIOS = ['Pct_RefDom_Followed', 'Pct_Backlinks_Followed', 'Pct_Backlinks_Nofollow', 'RefIP_Diversidad']
+# Columnas de texto que no se guardan en el resultado (las genera expandir_resultados)
+COLUMNAS_TEXTO_DIFERIDO = ['Reason', 'PBN_Alertas', 'PBN_Recomendaciones']
+
+def expandir_resultados(df):
+    """Añade los textos (Reason y PBN) a las filas recibidas y devuelve las columnas finales del resultado."""
+    with etapa('textos', len(df)):
+        textos = dict(construir_textos_pbn(df).items())
+        # Los snapshots anteriores a los textos diferidos ya traen 'Reason'
+        if 'Reason' not in df.columns:
+            textos['Reason'] = construir_reason(df)
+    return df.assign(**textos).reindex(columns=COLUMNAS_RESULTADO)
+
+# Columnas que produce la evaluación (score -> PBN -> whitelist) y de las que depende
+COLUMNAS_EVALUACION = [
+    'Score', 'Label', 'PBN_Puntos_Sospecha', 'PBN_Nivel_Riesgo',
+    'PBN_Reglas', 'PBN_Patron', 'Es_Marca_Whitelist'
+]
+# Las que no dependen de la parte continua de la edad: son las que se reutilizan por firma
+# (caché y modo incremental); Score y Label se recalculan siempre con la edad actual
+COLUMNAS_REUTILIZABLES = ['PBN_Puntos_Sospecha', 'PBN_Nivel_Riesgo', 'PBN_Reglas', 'PBN_Patron', 'Es_Marca_Whitelist']
+COLUMNAS_ENTRADA_EVALUACION = [
+    'target', 'dr', 'organic_traffic', 'refdomains_all', 'backlinks_all', 'url_rating',
+    'organic_keywords', 'domain_age', 'ref_ips', 'ref_subnets', 'RefIP_Diversidad',
+    'Pct_RefDom_Followed', 'Pct_Backlinks_Followed', 'Pct_Backlinks_Nofollow',
+    'pct_authority_tlds', 'pct_brand_anchors'
+]
+# Entradas de la evaluación que se guardan en el resultado, para generar los textos (Reason
+# y PBN) bajo demanda y para reevaluar: las de COLUMNAS_ENTRADA_EVALUACION, con las métricas
+# de origen en lugar de COLUMNAS_RATIOS
+COLUMNAS_ENTRADA_RESULTADO = [
+    'target', 'dr', 'organic_traffic', 'refdomains_all', 'backlinks_all', 'url_rating',
+    'organic_keywords', 'domain_age', 'ref_ips', 'ref_subnets', 'refdomains_followed',
+    'backlinks_nofollow', 'pct_authority_tlds', 'pct_brand_anchors'
+]
+
+_HUELLA_CODIGO_REGLAS = None
+
+def version_reglas():
+    """Huella de las reglas vigentes (perfil de pesos y umbrales, mensajes y listas).
+
+    Incluye el código de las funciones de evaluación, así que editar un peso o un
+    umbral en ellas también cambia la versión e invalida los resultados cacheados.
+    """
+    global _HUELLA_CODIGO_REGLAS
+    if _HUELLA_CODIGO_REGLAS is None:
+        import inspect
+        funciones = [
+            componentes_score, simulate_score_batch, _construir_reason, reglas_tramos_pbn, reglas_pbn_batch, puntos_pbn, detectar_pbn_batch,
+            es_marca_whitelist_batch, _señal_marca, ajustar_por_whitelist, _evaluar
+        ]
+        codigo = ''.join(inspect.getsource(f) for f in funciones)
+        _HUELLA_CODIGO_REGLAS = hashlib.sha1(codigo.encode('utf-8')).hexdigest()
+
+    datos = json.dumps([
+        _HUELLA_CODIGO_REGLAS, perfil_reglas().hash,
+        [LABEL_DR_NO_ACEPTABLE, LABEL_EXCELENTE, LABEL_ACEPTABLE, LABEL_RIESGOSO, LABEL_WHITELIST],
+        REASON_DR_NO_ACEPTABLE, RIESGO_DR_NO_ACEPTABLE, RECOMENDACIONES_DR_NO_ACEPTABLE, RIESGO_WHITELIST,
+        NIVELES_RIESGO_PBN, MENSAJES_PBN,
+        _MATCHER_PBN.patrones, sorted(map(str, WHITELIST_DOMAINS)), sorted(map(str, EXCEPT_DOMAINS))
+    ], ensure_ascii=False)
+    return hashlib.sha1(datos.encode('utf-8')).hexdigest()[:16]
+
+# Entradas de la firma: las que se guardan en el resultado (así se puede firmar también un
+# resultado) salvo la edad, que cambia con el día en que se ejecuta. En su lugar se firman
+# la fecha de creación y la edad en años enteros: los cortes de edad de las reglas (1, 3, 5
+# y 7 años) sí invalidan la firma
+COLUMNAS_FIRMA = [c for c in COLUMNAS_ENTRADA_RESULTADO if c != 'domain_age'] + ['Fecha_Creacion']
+
+def firmar_filas(df_prepared, version=None):
+    """Hash (int64) por fila del target, las métricas de entrada y la versión de las reglas (de un DataFrame preparado o de un resultado).
+
+    Dos filas con la misma firma tienen las mismas COLUMNAS_REUTILIZABLES (el host se deriva
+    del target); la parte continua de la edad solo cambia Score y Label, que
+    completar_evaluacion recalcula. Una fila con la misma fecha de creación conserva la
+    firma durante el año, así que la caché y el modo incremental no reevalúan cada
+    semana las filas sin cambios.
+    """
+    entrada = df_prepared.reindex(columns=COLUMNAS_FIRMA)
+    # Métricas como float64 para que 45 y 45.0 den la misma firma
+    entrada = entrada.astype({c: 'float64' for c in COLUMNAS_FIRMA if c != 'target'})
+    entrada['target'] = entrada['target'].astype(str)
+    entrada['edad_años'] = np.floor(_num_col(df_prepared, 'domain_age'))
+    firmas = pd.util.hash_pandas_object(entrada, index=False).to_numpy()
+    # La versión se mezcla como constante en lugar de hashearla fila a fila
+    return (firmas ^ np.uint64(int(version or version_reglas(), 16))).view(np.int64)
+
+_TIPOS_EVALUACION = {
+    'Score': 'int64', 'PBN_Puntos_Sospecha': 'int64', 'PBN_Reglas': 'int64', 'Es_Marca_Whitelist': 'bool'
+}
+
+def completar_evaluacion(df_prepared, encontrados, evaluar):
+    """Combina resultados ya conocidos con la evaluación de las filas restantes.
+
+    'encontrados' tiene COLUMNAS_REUTILIZABLES indexadas por posición de fila; su Score y
+    Label se recalculan con la edad de df_prepared. Devuelve (evaluación de todas las
+    filas, posiciones que se han evaluado).
+    """
+    reutilizadas = encontrados.index.to_numpy(dtype=np.int64)
+    faltan = np.ones(len(df_prepared), dtype=bool)
+    faltan[reutilizadas] = False
+    evaluadas = np.flatnonzero(faltan)
+
+    partes = []
+    if len(reutilizadas):
+        with etapa('score', len(reutilizadas)):
+            res = simulate_score_batch(df_prepared.iloc[reutilizadas]).set_axis(reutilizadas)
+        for col in COLUMNAS_REUTILIZABLES:
+            res[col] = encontrados[col].to_numpy()
+        partes.append(ajustar_por_whitelist(res)[COLUMNAS_EVALUACION])
+    if len(evaluadas):
+        partes.append(evaluar(df_prepared.iloc[evaluadas]).set_axis(evaluadas))
+    resultado = pd.concat([p for p in partes if len(p)]).sort_index()
+    return resultado.set_axis(df_prepared.index).astype(_TIPOS_EVALUACION), evaluadas
+
+def _evaluar(df_prepared):
+    """Score -> PBN -> whitelist sobre filas ya preparadas; devuelve COLUMNAS_EVALUACION."""
+    filas = len(df_prepared)
+    with etapa('score', filas):
+        res = simulate_score_batch(df_prepared)
+    with etapa('hosts', filas):
+        hosts = normalizar_hosts(df_prepared['target'])
+
+    # Detección de PBN (vectorizada; los textos se generan al mostrar/exportar)
+    with etapa('pbn', filas):
+        df_pbn_results = detectar_pbn_batch(df_prepared, hosts=hosts)
+    res['PBN_Puntos_Sospecha'] = df_pbn_results['puntos_sospecha']
+    res['PBN_Nivel_Riesgo'] = df_pbn_results['nivel_riesgo']
+    res['PBN_Reglas'] = df_pbn_results['reglas']
+    res['PBN_Patron'] = df_pbn_results['patron']
+
+    # Verificación y ajuste por Whitelist
+    with etapa('whitelist', filas):
+        res['Es_Marca_Whitelist'] = es_marca_whitelist_batch(df_prepared, hosts=hosts)
+    with etapa('ajuste_whitelist', filas):
+        return ajustar_por_whitelist(res)[COLUMNAS_EVALUACION]
+
+@contextmanager
+def _evaluador(workers=None):
+    """Devuelve _evaluar o, con más de un worker, un EvaluadorParalelo (ver paralelo.py)."""
+    workers = workers or WORKERS
+    if workers <= 1:
+        yield _evaluar
+        return
+    from .paralelo import EvaluadorParalelo
+    with EvaluadorParalelo(workers) as evaluador:
+        yield evaluador
+
+# --- Filas duplicadas (mismo host y métricas) ---
+def clave_duplicados(df_prepared, hosts=None):
+    """Hash (uint64) por fila de lo que determina su evaluación: host normalizado, si el target es una página interna y métricas.
+
+    Dos filas con la misma clave (p. ej. 'https://www.x.com' y 'x.com' con las mismas
+    métricas) tienen el mismo Score, riesgo PBN, alertas y whitelist. 'http://x.com/'
+    no coincide con 'x.com': la barra final la convierte en página interna para la
+    regla de URL Rating.
+    """
+    if hosts is None:
+        hosts = normalizar_hosts(df_prepared['target'])
+    metricas = [c for c in COLUMNAS_ENTRADA_RESULTADO if c != 'target']
+    entrada = df_prepared.reindex(columns=metricas).astype('float64')
+    # Hash de cada host distinto (estable entre bloques) repartido por códigos: hashear
+    # el texto fila a fila es varias veces más lento
+    codigos, unicos = pd.factorize(hosts.to_numpy())
+    entrada['host'] = pd.util.hash_array(np.asarray(unicos, dtype=object), categorize=False)[codigos]
+    # La regla de URL Rating distingue las páginas internas por la profundidad del path
+    entrada['pagina_interna'] = (df_prepared['target'].astype(str).str.count('/') > 2).to_numpy()
+    return pd.util.hash_pandas_object(entrada, index=False).to_numpy()
+
+def quitar_duplicados(df_resultados, vistas=None):
+    """Deja solo la primera fila de cada grupo con la misma clave_duplicados (p. ej. para reducir una descarga).
+
+    Con 'vistas' (set de claves, se actualiza) también se quitan las filas de bloques
+    anteriores al procesar un resultado por bloques.
+    """
+    if df_resultados.empty:
+        return df_resultados
+    claves = pd.Series(clave_duplicados(df_resultados))
+    primeras = ~claves.duplicated().to_numpy()
+    if vistas is not None:
+        primeras &= ~claves.isin(list(vistas)).to_numpy()
+        vistas.update(claves[primeras].tolist())
+    return df_resultados[primeras]
+
+class EvaluadorSinDuplicados:
+    """Envuelve una función de evaluación para evaluar una sola vez cada grupo de filas con la misma clave_duplicados.
+
+    El resultado de la primera fila de cada grupo se copia al resto; 'duplicados'
+    acumula cuántas filas se han resuelto así.
+    """
+
+    def __init__(self, evaluar):
+        self.evaluar = evaluar
+        self.duplicados = 0
+
+    def __call__(self, df_prepared):
+        filas = len(df_prepared)
+        with etapa('deduplicar', filas):
+            codigos, unicos = pd.factorize(clave_duplicados(df_prepared))
+        if len(unicos) == filas:
+            return self.evaluar(df_prepared)
+        # Posición de la primera fila de cada grupo (en orden de aparición)
+        primeras = np.empty(len(unicos), dtype=np.int64)
+        primeras[codigos[::-1]] = np.arange(filas - 1, -1, -1)
+        self.duplicados += filas - len(unicos)
+        evaluacion = self.evaluar(df_prepared.iloc[primeras])
+        return evaluacion.iloc[codigos].set_axis(df_prepared.index)
+
+# --- Representación compacta del resultado ---
+# Enteros que caben siempre en 16 bits (Score 0-100, puntos de sospecha) y el bitmask de
+# reglas PBN, de 32 bits (el bit 31 es uno de los niveles de riesgo)
+_TIPOS_COMPACTOS = {'Score': 'int16', 'PBN_Puntos_Sospecha': 'int16', 'PBN_Reglas': 'uint32'}
+_INT32 = np.iinfo(np.int32)
+
+def _categorias_resultado():
+    """Categorías fijas de los textos repetidos (iguales en todos los bloques, que se concatenan sin perder el tipo)."""
+    perfil = perfil_reglas()
+    return {
+        'Label': [LABEL_EXCELENTE, LABEL_ACEPTABLE, LABEL_RIESGOSO, _con_dr_minimo(LABEL_DR_NO_ACEPTABLE, perfil), LABEL_WHITELIST],
+        'PBN_Nivel_Riesgo': [r for r, _ in NIVELES_RIESGO_PBN] + [_con_dr_minimo(RIESGO_DR_NO_ACEPTABLE, perfil), RIESGO_WHITELIST],
+        'PBN_Patron': [''] + _MATCHER_PBN.patrones,
+    }
+
+def compactar_resultados(df):
+    """Reduce la memoria del resultado: niveles y patrón como Categorical, enteros de 16/32 bits y bitmask uint32.
+
+    Las métricas enteras pasan a int32 solo si todos sus valores caben; las decimales
+    se quedan en float64 para que las descargas muestren los mismos valores.
+    """
+    for col, categorias in _categorias_resultado().items():
+        if col in df.columns:
+            valores = pd.Categorical(df[col], categories=categorias)
+            # Un valor fuera de las categorías se quedaría como nulo: se deja el texto
+            if valores.isna().sum() == df[col].isna().sum():
+                df[col] = valores
+    df = df.astype({c: t for c, t in _TIPOS_COMPACTOS.items() if c in df.columns})
+    for col in [c for c in COLUMNAS_FIRMA if c != 'target']:
+        serie = df.get(col)
+        if serie is not None and pd.api.types.is_integer_dtype(serie) and (
+            len(serie) == 0 or (serie.min() >= _INT32.min and serie.max() <= _INT32.max)
+        ):
+            df[col] = serie.astype('int32')
+    return df
+
+def _analizar_chunk(df_input, ahora=None, cache=None, evaluar=_evaluar):
+    """Ejecuta prepare -> score -> PBN -> whitelist sobre un bloque de filas.
+
+    Con 'cache' (CacheResultados o ResultadosPrevios) solo se evalúan las filas cuya
+    firma no esté ya en la caché. 'evaluar' permite sustituir _evaluar (p. ej. por
+    un EvaluadorParalelo).
+    """
+
+    filas = len(df_input)
+
+    # 1. Preparar y limpiar el DataFrame
+    with etapa('preparar', filas):
+        df_prepared = prepare_df_tolerant(df_input.copy(), ahora=ahora)
+
+    # 2. Scoring, detección PBN y whitelist (o resultados cacheados); las filas
+    # duplicadas del bloque se evalúan una sola vez
+    with etapa('firmar', filas):
+        df_prepared['Firma'] = firmar_filas(df_prepared)
+    evaluar = EvaluadorSinDuplicados(evaluar)
+    with etapa('evaluar', filas):
+        if cache is None:
+            evaluacion = evaluar(df_prepared)
+        else:
+            evaluacion = cache.evaluar(df_prepared, evaluar)
+    for col in COLUMNAS_EVALUACION:
+        df_prepared[col] = evaluacion[col].to_numpy()
+
+    # 3. Selección y orden de columnas (las de texto se añaden con expandir_resultados)
+    cols_to_keep = [c for c in COLUMNAS_RESULTADO if c not in COLUMNAS_TEXTO_DIFERIDO] + ['PBN_Reglas']
+    # Entradas de la evaluación (textos bajo demanda, reevaluar con otro perfil y firma);
+    # la firma y los ratios no se guardan, se recalculan cuando hacen falta
+    cols_to_keep += [c for c in COLUMNAS_FIRMA if c not in cols_to_keep]
+
+    with etapa('compactar', filas):
+        resultado = compactar_resultados(df_prepared.reindex(columns=cols_to_keep))
+    resultado.attrs['duplicados'] = evaluar.duplicados
+    return resultado
+
+def run_analysis(df_input, batch_limit=None, cache=None, workers=None, ahora=None):
+    """Ejecuta el pipeline completo de análisis del script original.
+
+    Las entradas con más de 'batch_limit' filas (por defecto BATCH_LIMIT) se procesan
+    por bloques y se concatenan, sin truncar. El resultado guarda las alertas PBN como
+    bitmask ('PBN_Reglas') y no incluye textos: usar expandir_resultados sobre las
+    filas a mostrar o exportar para obtener Reason y los textos PBN. Con 'cache'
+    (CacheResultados) no se reevalúan los dominios cuyo resultado ya está cacheado.
+    Con 'workers' > 1 (por defecto WORKERS) la evaluación de cada bloque se reparte
+    entre varios procesos. Las filas con el mismo host y métricas se evalúan una vez
+    por bloque; su número queda en resultado.attrs['duplicados']. 'ahora' es la fecha
+    de referencia para la edad del dominio (por defecto, el momento actual).
+    """
+    batch_limit = batch_limit or BATCH_LIMIT
+    if len(df_input) <= batch_limit:
+        with _evaluador(workers) as evaluar:
+            return _analizar_chunk(df_input, ahora=ahora, cache=cache, evaluar=evaluar)
+    bloques = run_analysis_stream(df_input, chunksize=batch_limit, cache=cache, workers=workers, ahora=ahora)
+    return _concatenar_bloques(list(bloques))
+
+def _concatenar_bloques(bloques):
+    """Concatena resultados por bloque sumando sus filas duplicadas."""
+    resultado = pd.concat(bloques)
+    resultado.attrs['duplicados'] = sum(bloque.attrs.get('duplicados', 0) for bloque in bloques)
+    return resultado
+
+def reevaluar(df_resultados, batch_limit=None, workers=None):
+    """Vuelve a puntuar un resultado de run_analysis con el perfil vigente (p. ej. otro perfil de reglas).
+
+    El resultado ya contiene las entradas preparadas de la evaluación, así que no se
+    vuelve a leer ni a preparar el archivo; solo se recalculan los ratios y la evaluación.
+    """
+    batch_limit = batch_limit or BATCH_LIMIT
+    partes = []
+    with _evaluador(workers) as evaluar:
+        for inicio in range(0, max(len(df_resultados), 1), batch_limit):
+            bloque = df_resultados.iloc[inicio:inicio + batch_limit].copy()
+            filas = len(bloque)
+            evaluar_bloque = EvaluadorSinDuplicados(evaluar)
+            with etapa('evaluar', filas):
+                evaluacion = evaluar_bloque(completar_ratios(bloque))
+            for col in COLUMNAS_EVALUACION:
+                bloque[col] = evaluacion[col].to_numpy()
+            with etapa('compactar', filas):
+                bloque = compactar_resultados(bloque)
+            bloque.attrs['duplicados'] = evaluar_bloque.duplicados
+            partes.append(bloque)
+    return _concatenar_bloques(partes)
+
+# --- Lectura de archivos (solo las columnas del mapeo) ---
+# Campos que se leen siempre como texto (el resto de columnas las tipa el lector)
+CAMPOS_TEXTO = ('target', 'domain_age')
+
+def _es_xlsx(fuente, nombre=None):
+    return str(nombre or getattr(fuente, 'name', fuente)).lower().endswith('.xlsx')
+
+def _rebobinar(fuente):
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+
+def _nombres_xlsx(cabecera):
+    return [str(c).strip() if c is not None else f'Unnamed: {i}' for i, c in enumerate(cabecera)]
+
+# Bytes iniciales que se examinan para detectar el formato de un CSV
+MUESTRA_DETECCION_CSV = 256 * 1024
+_SEPARADORES_CSV = (',', ';', '\t', '|')
+# Números que solo encajan con coma decimal (1,5 / 1.234,5 / 1.234.567) o con punto decimal
+_RE_COMA_DECIMAL = re.compile(r'^-?(\d+,(\d{1,2}|\d{4,})|\d{1,3}(\.\d{3})+,\d+|\d{1,3}(\.\d{3}){2,})$')
+_RE_PUNTO_DECIMAL = re.compile(r'^-?(\d+\.(\d{1,2}|\d{4,})|\d{1,3}(,\d{3})+\.\d+|\d{1,3}(,\d{3}){2,})$')
+
+def _leer_muestra(fuente, n):
+    if not hasattr(fuente, 'read'):
+        with open(fuente, 'rb') as f:
+            return f.read(n)
+    _rebobinar(fuente)
+    muestra = fuente.read(n)
+    _rebobinar(fuente)
+    return muestra.encode('utf-8') if isinstance(muestra, str) else muestra
+
+def _detectar_encoding(muestra):
+    """Encoding de un CSV a partir de su BOM o, si no tiene, de sus primeros bytes."""
+    if muestra.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if muestra.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+    # UTF-16 sin BOM: texto ASCII con un byte nulo por carácter
+    pares, impares = muestra[:4096:2], muestra[1:4096:2]
+    if impares and impares.count(0) > len(impares) // 2:
+        return 'utf-16-le'
+    if pares and pares.count(0) > len(pares) // 2:
+        return 'utf-16-be'
+    try:
+        muestra.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Un carácter cortado al final de la muestra no cuenta como error
+        if e.start < len(muestra) - 3:
+            return 'latin1'
+    return 'utf-8'
+
+def _detectar_separadores(texto, completa):
+    """(separador, separador decimal) más probables según las primeras filas."""
+    mejor, clave_mejor, filas_mejor = ',', None, []
+    for sep in _SEPARADORES_CSV:
+        filas = [f for f in csv.reader(io.StringIO(texto), delimiter=sep) if f][:50]
+        if not completa:
+            filas = filas[:-1]  # la última fila puede estar cortada
+        if not filas:
+            continue
+        campos = len(filas[0])
+        # Preferencia: más de un campo, mismo número de campos en todas las filas, más campos
+        clave = (campos > 1, sum(len(f) == campos for f in filas) / len(filas), campos)
+        if clave_mejor is None or clave > clave_mejor:
+            mejor, clave_mejor, filas_mejor = sep, clave, filas
+
+    decimal = '.'
+    if mejor != ',':
+        valores = [v.strip() for f in filas_mejor[1:] for v in f]
+        comas = sum(bool(_RE_COMA_DECIMAL.match(v)) for v in valores)
+        puntos = sum(bool(_RE_PUNTO_DECIMAL.match(v)) for v in valores)
+        if comas > puntos:
+            decimal = ','
+    return mejor, decimal
+
+def detectar_formato_csv(fuente, muestra=None):
+    """Detecta encoding (BOM, UTF-16, UTF-8 o latin1), separador y separador decimal de un CSV.
+
+    Solo se examinan los primeros 'muestra' bytes (MUESTRA_DETECCION_CSV), sea cual sea
+    el tamaño del archivo. Devuelve los argumentos de formato para pd.read_csv.
+    """
+    n = muestra or MUESTRA_DETECCION_CSV
+    datos = _leer_muestra(fuente, n)
+    encoding = _detectar_encoding(datos)
+    sep, decimal = _detectar_separadores(datos.decode(encoding, errors='ignore'), completa=len(datos) < n)
+    opciones = {'encoding': encoding, 'sep': sep, 'decimal': decimal}
+    if decimal == ',':
+        opciones['thousands'] = '.'
+    return opciones
+
+def _alternativas_csv(opciones):
+    # Si hay bytes no UTF-8 más allá de la muestra, último recurso: latin1
+    if opciones['encoding'] == 'utf-8':
+        return [opciones, {**opciones, 'encoding': 'latin1'}]
+    return [opciones]
+
+def _cabecera_csv(fuente, opciones):
+    """Nombres de columna tal como aparecen en el CSV (sin leer los datos)."""
+    _rebobinar(fuente)
+    columnas = list(pd.read_csv(fuente, nrows=0, **opciones).columns)
+    _rebobinar(fuente)
+    return columnas
+
+def leer_cabecera(fuente, nombre=None):
+    """Devuelve los nombres de columna de un CSV o XLSX (sin espacios sobrantes) sin leer los datos."""
+    if _es_xlsx(fuente, nombre):
+        from openpyxl import load_workbook
+
+        _rebobinar(fuente)
+        wb = load_workbook(fuente, read_only=True, data_only=True)
+        try:
+            cabecera = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        _rebobinar(fuente)
+        return _nombres_xlsx(cabecera)
+
+    return [str(c).strip() for c in _cabecera_csv(fuente, detectar_formato_csv(fuente))]
+
+def columnas_mapeadas(cabecera):
+    """Columnas de la cabecera que usa el mapeo, en el orden del archivo."""
+    usadas = {c for c in resolver_mapeo(cabecera)['columnas'].values() if c is not None}
+    return [c for c in cabecera if c in usadas]
+
+def _proyeccion_csv(crudas, solo_mapeadas):
+    """(usecols, dtype) para read_csv: columnas del mapeo y campos de texto como str."""
+    nombres = {c: str(c).strip() for c in crudas}
+    mapeo = resolver_mapeo(list(nombres.values()))['columnas']
+    texto = {mapeo[campo] for campo in CAMPOS_TEXTO if mapeo[campo] is not None}
+    usadas = set(columnas_mapeadas(list(nombres.values()))) if solo_mapeadas else set(nombres.values())
+    # Sin columnas reconocidas se conserva la primera para no perder el número de filas
+    usecols = [c for c in crudas if nombres[c] in usadas] or crudas[:1]
+    return usecols, {c: str for c in usecols if nombres[c] in texto}
+
+def _leer_csv(fuente, solo_mapeadas=True):
+    """Lee un CSV completo en una pasada con el formato detectado (motor pyarrow si está disponible)."""
+    alternativas = _alternativas_csv(detectar_formato_csv(fuente))
+    for i, opciones in enumerate(alternativas):
+        try:
+            usecols, dtype = _proyeccion_csv(_cabecera_csv(fuente, opciones), solo_mapeadas)
+            df = None
+            if 'thousands' not in opciones:  # el motor pyarrow no admite separador de miles
+                try:
+                    df = pd.read_csv(fuente, usecols=usecols, dtype=dtype, engine='pyarrow', **opciones)
+                except Exception:
+                    # Sin pyarrow o con un archivo que su lector no admite: motor de C
+                    _rebobinar(fuente)
+            if df is None:
+                df = pd.read_csv(fuente, usecols=usecols, dtype=dtype, **opciones)
+            df.columns = df.columns.astype(str).str.strip()
+            return df
+        except UnicodeDecodeError:
+            if i == len(alternativas) - 1:
+                raise
+
+def _leer_csv_en_chunks(fuente, chunksize, solo_mapeadas=True):
+    """Lee un CSV por bloques con el formato detectado (latin1 solo si falla antes del primer bloque)."""
+    alternativas = _alternativas_csv(detectar_formato_csv(fuente))
+    for i, opciones in enumerate(alternativas):
+        emitido = False
+        try:
+            usecols, dtype = _proyeccion_csv(_cabecera_csv(fuente, opciones), solo_mapeadas)
+            with pd.read_csv(fuente, usecols=usecols, dtype=dtype, chunksize=chunksize, **opciones) as lector:
+                for chunk in lector:
+                    chunk.columns = chunk.columns.astype(str).str.strip()
+                    emitido = True
+                    yield chunk
+            return
+        except UnicodeDecodeError:
+            if emitido or i == len(alternativas) - 1:
+                raise
+
+def _leer_xlsx_en_chunks(fuente, chunksize, solo_mapeadas=True):
+    """Lee la primera hoja de un XLSX en modo read-only de openpyxl, por bloques de filas."""
+    from openpyxl import load_workbook
+
+    _rebobinar(fuente)
+    wb = load_workbook(fuente, read_only=True, data_only=True)
+    try:
+        hoja = wb.worksheets[0]
+        cabecera = next(hoja.iter_rows(max_row=1, values_only=True), None)
+        if cabecera is None:
+            return
+        columnas = _nombres_xlsx(cabecera)
+        usadas = set(columnas_mapeadas(columnas)) if solo_mapeadas else set(columnas)
+        # Sin columnas reconocidas se conserva la primera para no perder el número de filas
+        indices = [i for i, c in enumerate(columnas) if c in usadas] or [0]
+        columnas = [columnas[i] for i in indices]
+        # openpyxl solo construye las celdas del rango de columnas usadas
+        primera, ultima = indices[0], indices[-1]
+        filas = hoja.iter_rows(min_row=2, min_col=primera + 1, max_col=ultima + 1, values_only=True)
+        proyectar = lambda fila: tuple(fila[i - primera] for i in indices)
+
+        inicio, bloque = 0, []
+        for fila in filas:
+            bloque.append(proyectar(fila))
+            if len(bloque) >= chunksize:
+                yield pd.DataFrame(bloque, columns=columnas, index=pd.RangeIndex(inicio, inicio + len(bloque)))
+                inicio, bloque = inicio + len(bloque), []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=columnas, index=pd.RangeIndex(inicio, inicio + len(bloque)))
+    finally:
+        wb.close()
+
+def leer_archivo(fuente, nombre=None, solo_mapeadas=True):
+    """Lee un CSV o XLSX completo (ruta o archivo abierto).
+
+    Primero se lee la cabecera y se resuelve el mapeo; con 'solo_mapeadas' solo se
+    cargan las columnas que usa el análisis (el resto de una exportación de Ahrefs
+    no se llega a convertir).
+    """
+    with etapa('leer') as medida:
+        if _es_xlsx(fuente, nombre):
+            bloques = list(_leer_xlsx_en_chunks(fuente, math.inf, solo_mapeadas))
+            df = bloques[0] if bloques else pd.DataFrame()
+        else:
+            df = _leer_csv(fuente, solo_mapeadas)
+        medida.filas = len(df)
+    return df
+
+def leer_archivo_en_chunks(fuente, chunksize=None, nombre=None, solo_mapeadas=True):
+    """Lee un archivo CSV o XLSX (ruta o archivo abierto) como generador de DataFrames."""
+    chunksize = chunksize or BATCH_LIMIT
+    if _es_xlsx(fuente, nombre):
+        return _leer_xlsx_en_chunks(fuente, chunksize, solo_mapeadas)
+    return _leer_csv_en_chunks(fuente, chunksize, solo_mapeadas)
+
+# --- Procesamiento por bloques (streaming) ---
+def run_analysis_stream(fuente, chunksize=None, cache=None, workers=None, ahora=None):
+    """Generador: ejecuta el pipeline bloque a bloque y devuelve los resultados de cada bloque.
+
+    'fuente' puede ser un DataFrame, una ruta o archivo CSV/XLSX, o un iterable de
+    DataFrames. La memoria depende del tamaño del bloque, no del archivo.
+    """
+    chunksize = chunksize or BATCH_LIMIT
+    ahora = ahora or datetime.now()  # misma referencia de edad para todos los bloques
+    if isinstance(fuente, pd.DataFrame):
+        chunks = (fuente.iloc[i:i + chunksize] for i in range(0, len(fuente), chunksize))
+    elif isinstance(fuente, (str, os.PathLike)) or hasattr(fuente, 'read'):
+        chunks = _medir_lectura(leer_archivo_en_chunks(fuente, chunksize))
+    else:
+        chunks = fuente
+
+    with _evaluador(workers) as evaluar:
+        for chunk in chunks:
+            yield _analizar_chunk(chunk, ahora=ahora, cache=cache, evaluar=evaluar)
+
+def _medir_lectura(chunks):
+    """Mide como etapa 'leer' la lectura de cada bloque del archivo."""
+    chunks = iter(chunks)
+    while True:
+        with etapa('leer') as medida:
+            chunk = next(chunks, None)
+            medida.filas = None if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+def escribir_bloques_arrow(bloques, destino, formato='parquet'):
+    """Escribe bloques de DataFrame en un único archivo Parquet o Arrow IPC ('arrow').
+
+    El esquema se fija con el primer bloque (las columnas sin ningún valor se toman
+    como texto) y los bloques siguientes se convierten a él. Devuelve el número de filas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, esquema, filas = None, None, 0
+    try:
+        for bloque in bloques:
+            with etapa('escribir_' + formato, len(bloque)):
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                if writer is None:
+                    esquema = pa.schema(
+                        [f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in tabla.schema],
+                        metadata=tabla.schema.metadata
+                    )
+                    if formato == 'parquet':
+                        writer = pq.ParquetWriter(destino, esquema)
+                    else:
+                        # Arrow IPC comprimido con zstd (los lectores de pyarrow lo descomprimen solos)
+                        opciones = pa.ipc.IpcWriteOptions(compression='zstd')
+                        writer = pa.ipc.new_file(destino, esquema, options=opciones)
+                writer.write_table(tabla.cast(esquema))
+            filas += len(bloque)
+    finally:
+        if writer is not None:
+            writer.close()
+    return filas
+
+def escribir_resultados(resultados, destino):
+    """Añade a 'destino' los bloques de resultados (con textos), uno tras otro.
+
+    El formato se deduce de la extensión: '.parquet', '.arrow' (Arrow IPC; ambos
+    requieren pyarrow) o CSV. Devuelve el número de filas escritas.
+    """
+    destino = str(destino)
+    extension = destino.lower().rsplit('.', 1)[-1]
+    if extension in ('parquet', 'arrow'):
+        # Tipos fijos para que todos los bloques compartan el mismo esquema
+        bloques = (
+            expandir_resultados(chunk).astype({c: 'float64' for c in COLUMNAS_METRICAS})
+            for chunk in resultados
+        )
+        return escribir_bloques_arrow(bloques, destino, extension)
+
+    filas = 0
+    for chunk in resultados:
+        df_chunk = expandir_resultados(chunk)
+        with etapa('escribir_csv', len(df_chunk)):
+            df_chunk.to_csv(destino, mode='w' if filas == 0 else 'a', header=(filas == 0), index=False)
+        filas += len(df_chunk)
+    if filas == 0:
+        pd.DataFrame(columns=COLUMNAS_RESULTADO).to_csv(destino, index=False)
+    return filas
+
+def run_analysis_to_file(fuente, destino, chunksize=None, cache=None, workers=None):
+    """Ejecuta el pipeline por bloques y escribe los resultados en 'destino' (CSV, Parquet o Arrow)."""
+    return escribir_resultados(run_analysis_stream(fuente, chunksize, cache=cache, workers=workers), destino)
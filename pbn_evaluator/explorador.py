@@ -0,0 +1,75 @@
+"""Vista paginada y filtrable de los resultados (sin dependencia de Streamlit).
+
+El orden de la tabla (Score y puntos de sospecha, de mayor a menor) se calcula una
+sola vez por resultado; cada página solo filtra posiciones con numpy y genera los
+textos de las filas que se van a mostrar.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .core import expandir_resultados
+
+class ExploradorResultados:
+    """Páginas de un resultado de run_analysis con filtros de nivel de riesgo, Score y whitelist.
+
+    Filtros ('niveles', 'score', 'whitelist') de pagina(), total() y paginas():
+    niveles de PBN_Nivel_Riesgo a incluir (None = todos), rango (mín, máx) de Score
+    incluido en ambos extremos y True/False para solo/sin whitelist (None = todos).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        score = df['Score'].to_numpy(dtype=np.int32)
+        puntos = df['PBN_Puntos_Sospecha'].to_numpy(dtype=np.int32)
+        # Posiciones en orden de la tabla; estable, así que los empates siguen el orden del archivo
+        self._orden = np.lexsort((-puntos, -score))
+        self.max_puntos = int(puntos.max()) if len(puntos) else 0
+        self._ultimo_filtro = (None, None)
+
+    def __len__(self):
+        return len(self.df)
+
+    def niveles_riesgo(self):
+        """Niveles de riesgo PBN presentes en el resultado (en el orden de gravedad)."""
+        niveles = self.df['PBN_Nivel_Riesgo']
+        if isinstance(niveles.dtype, pd.CategoricalDtype):
+            conteo = niveles.value_counts(sort=False)
+            return [nivel for nivel, n in conteo.items() if n]
+        return sorted(niveles.dropna().unique().tolist())
+
+    def filtrar(self, niveles=None, score=None, whitelist=None):
+        """Posiciones (en orden de la tabla) de las filas que cumplen los filtros; se reutiliza el último filtro."""
+        clave = (tuple(niveles) if niveles is not None else None, tuple(score) if score is not None else None, whitelist)
+        if clave == (None, None, None):
+            return self._orden
+        if clave == self._ultimo_filtro[0]:
+            return self._ultimo_filtro[1]
+
+        incluir = np.ones(len(self.df), dtype=bool)
+        if niveles is not None:
+            incluir &= self.df['PBN_Nivel_Riesgo'].isin(list(niveles)).to_numpy(dtype=bool)
+        if score is not None:
+            valores = self.df['Score'].to_numpy()
+            incluir &= (valores >= score[0]) & (valores <= score[1])
+        if whitelist is not None:
+            incluir &= self.df['Es_Marca_Whitelist'].to_numpy(dtype=bool) == bool(whitelist)
+
+        posiciones = self._orden[incluir[self._orden]]
+        self._ultimo_filtro = (clave, posiciones)
+        return posiciones
+
+    def total(self, **filtros):
+        """Número de filas que cumplen los filtros."""
+        return len(self.filtrar(**filtros))
+
+    def paginas(self, filas_por_pagina, **filtros):
+        """Número de páginas (al menos una, aunque no haya filas)."""
+        return max(1, math.ceil(self.total(**filtros) / filas_por_pagina))
+
+    def pagina(self, numero, filas_por_pagina, **filtros):
+        """Filas de la página 'numero' (desde 0) con los textos generados y las columnas finales."""
+        inicio = numero * filas_por_pagina
+        posiciones = self.filtrar(**filtros)[inicio:inicio + filas_por_pagina]
+        return expandir_resultados(self.df.iloc[posiciones])
@@ -0,0 +1,162 @@
+"""Exportación de resultados a Excel, CSV, Parquet y Arrow IPC (sin dependencia de Streamlit).
+
+Los textos se generan y escriben por bloques de FILAS_BLOQUE_EXPORTACION filas, en un
+archivo (Excel en modo write-only de openpyxl), así que la memoria usada no crece con
+el número de filas exportadas.
+"""
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+
+from .core import COLUMNAS_METRICAS, escribir_bloques_arrow, expandir_resultados
+from .perfilado import etapa
+
+NOMBRE_HOJA_EXCEL = 'Resultados_PBN_Eval'
+FILAS_BLOQUE_EXPORTACION = 10000
+
+# Nombres de columna de las descargas
+COLUMNAS_EXPORTACION = {
+    'target': 'Dominio',
+    'dr': 'Domain Rating',
+    'organic_traffic': 'Organic / Traffic',
+    'domain_age': 'Domain Age (años)',
+    'refdomains_all': 'Ref. domains / All',
+    'backlinks_all': 'Backlinks / All',
+    'url_rating': 'URL Rating',
+    'organic_keywords': 'Organic / Total Keywords',
+    'Score': 'Trust Score (0-100)',
+    'Label': 'Trust Score - Nivel',
+    'Reason': 'Trust Score - Factores', # Contiene '\n' para formato de descarga
+    'PBN_Puntos_Sospecha': 'PBN - Puntos Sospecha',
+    'PBN_Nivel_Riesgo': 'PBN - Nivel de Riesgo',
+    'PBN_Alertas': 'PBN - Alertas', # Contiene '\n' para formato de descarga
+    'PBN_Recomendaciones': 'PBN - Recomendaciones', # Contiene '\n' para formato de descarga
+    'PBN_Patron': 'PBN - Patrón Detectado',
+    'Es_Marca_Whitelist': 'Es Marca (Whitelist/Metricas)'
+}
+
+def bloques_exportacion(df, filas=None):
+    """Genera los bloques de la descarga (textos expandidos y columnas renombradas)."""
+    filas = filas or FILAS_BLOQUE_EXPORTACION
+    for inicio in range(0, max(len(df), 1), filas):
+        yield expandir_resultados(df.iloc[inicio:inicio + filas]).rename(columns=COLUMNAS_EXPORTACION)
+
+def exportar_excel(df, destino):
+    """Escribe la descarga Excel en 'destino' (ruta o archivo) fila a fila."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(NOMBRE_HOJA_EXCEL)
+    cabecera = False
+    for bloque in bloques_exportacion(df):
+        if not cabecera:
+            ws.append(list(bloque.columns))
+            cabecera = True
+        # Celdas vacías para los nulos, como pandas.to_excel
+        for fila in bloque.astype(object).where(bloque.notna(), None).itertuples(index=False, name=None):
+            ws.append(fila)
+    wb.save(destino)
+
+def exportar_csv(df, destino):
+    """Escribe la descarga CSV (UTF-8) en 'destino' (ruta o archivo binario) bloque a bloque."""
+    for i, bloque in enumerate(bloques_exportacion(df)):
+        bloque.to_csv(destino, index=False, header=(i == 0), mode='w' if i == 0 else 'a', encoding='utf-8')
+
+def _bloques_tipados(df):
+    # Métricas siempre float64 para que todos los bloques compartan el esquema
+    tipos = {COLUMNAS_EXPORTACION[c]: 'float64' for c in COLUMNAS_METRICAS}
+    return (bloque.astype(tipos) for bloque in bloques_exportacion(df))
+
+def exportar_parquet(df, destino):
+    """Escribe la descarga en Parquet (requiere pyarrow) bloque a bloque."""
+    escribir_bloques_arrow(_bloques_tipados(df), destino, 'parquet')
+
+def exportar_arrow(df, destino):
+    """Escribe la descarga en formato Arrow IPC (archivo .arrow) bloque a bloque."""
+    escribir_bloques_arrow(_bloques_tipados(df), destino, 'arrow')
+
+_EXPORTADORES = {
+    'xlsx': exportar_excel, 'csv': exportar_csv,
+    'parquet': exportar_parquet, 'arrow': exportar_arrow
+}
+
+# Tipo MIME de cada formato de descarga
+FORMATOS_EXPORTACION = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+def exportar_a_temporal(df, formato):
+    """Escribe la descarga en un archivo temporal y devuelve su ruta (el llamador lo borra)."""
+    fd, ruta = tempfile.mkstemp(prefix='pbn_evaluacion_', suffix='.' + formato)
+    os.close(fd)
+    try:
+        with etapa('exportar_' + formato, len(df)):
+            _EXPORTADORES[formato](df, ruta)
+    except BaseException:
+        os.remove(ruta)
+        raise
+    return ruta
+
+def _leer_y_borrar(ruta):
+    try:
+        with open(ruta, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(ruta)
+
+def convert_df_to_excel(df):
+    """Devuelve la descarga Excel como bytes (escrita por bloques en un archivo temporal)."""
+    return _leer_y_borrar(exportar_a_temporal(df, 'xlsx'))
+
+def convert_df_to_csv(df):
+    """Devuelve la descarga CSV como bytes (escrita por bloques en un archivo temporal)."""
+    return _leer_y_borrar(exportar_a_temporal(df, 'csv'))
+
+class ExportacionesPorEjecucion:
+    """Descargas generadas bajo demanda y cacheadas por (id de ejecución, formato).
+
+    Evita hashear el DataFrame de resultados: basta un id por análisis. Se conservan
+    como máximo 'max_archivos' archivos temporales (se borran los más antiguos). Cada
+    (ejecución, formato) se genera con su propio lock: una exportación grande no
+    bloquea las descargas de otras sesiones.
+    """
+
+    def __init__(self, max_archivos=8):
+        self.max_archivos = max_archivos
+        self._rutas = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()  # solo para _rutas y _locks, nunca durante una exportación
+
+    def ruta(self, run_id, formato, df):
+        """Ruta del archivo de descarga; solo se genera la primera vez que se pide."""
+        clave = (run_id, formato)
+        with self._lock:
+            lock_clave = self._locks.setdefault(clave, threading.Lock())
+        with lock_clave:
+            with self._lock:
+                ruta = self._rutas.get(clave)
+            if ruta is None or not os.path.exists(ruta):
+                ruta = exportar_a_temporal(df, formato)
+            with self._lock:
+                self._rutas[clave] = ruta
+                self._rutas.move_to_end(clave)
+                antiguas = []
+                while len(self._rutas) > self.max_archivos:
+                    clave_antigua, antigua = self._rutas.popitem(last=False)
+                    self._locks.pop(clave_antigua, None)
+                    antiguas.append(antigua)
+        for antigua in antiguas:
+            try:
+                os.remove(antigua)
+            except OSError:
+                pass
+        return ruta
+
+    def leer(self, run_id, formato, df):
+        """Contenido del archivo de descarga (bytes)."""
+        with open(self.ruta(run_id, formato, df), 'rb') as f:
+            return f.read()
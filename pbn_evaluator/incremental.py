@@ -0,0 +1,133 @@
+"""Reevaluación incremental: compara una nueva exportación con los resultados anteriores.
+
+Las filas cuya firma (target + métricas + fecha de creación + versión de reglas) coincide con la de la
+ejecución anterior reutilizan su resultado PBN y de whitelist; solo se evalúan las nuevas o
+modificadas. El Score y el Label se recalculan siempre con la edad actual.
+"""
+import numpy as np
+import pandas as pd
+
+from .core import COLUMNAS_FIRMA, COLUMNAS_REUTILIZABLES, completar_evaluacion, firmar_filas, run_analysis
+
+ESTADO_NUEVO = 'nuevo'
+ESTADO_MODIFICADO = 'modificado'
+ESTADO_ELIMINADO = 'eliminado'
+# Mismas métricas y firma, pero otro Score por la edad del dominio (recalculada cada día)
+ESTADO_EDAD = 'edad'
+
+def _firmas(df_resultados):
+    """Firma de cada fila de un resultado: la guardada en el snapshot o la de las reglas vigentes."""
+    if 'Firma' in df_resultados.columns:
+        return df_resultados['Firma'].to_numpy()
+    faltan = [c for c in COLUMNAS_FIRMA if c not in df_resultados.columns]
+    if faltan:
+        raise ValueError(f"El resultado anterior no tiene las columnas {faltan} (usa un snapshot de run_analysis).")
+    return firmar_filas(df_resultados)
+
+def guardar_snapshot(df_resultados, ruta):
+    """Guarda el resultado de run_analysis en Parquet para la próxima ejecución.
+
+    Se añade la columna 'Firma' con las reglas vigentes (las del análisis): si las reglas
+    cambian antes de la próxima ejecución, todas las filas se reevalúan.
+    """
+    df_resultados.assign(Firma=_firmas(df_resultados)).to_parquet(ruta, index=False)
+
+def cargar_snapshot(ruta):
+    """Lee un snapshot guardado con guardar_snapshot."""
+    return pd.read_parquet(ruta)
+
+class ResultadosPrevios:
+    """Resultados de una ejecución anterior usados como caché de solo lectura (por firma).
+
+    Se pasa como 'cache' a run_analysis / run_analysis_stream.
+    """
+
+    def __init__(self, df_previo):
+        previo = df_previo.assign(Firma=_firmas(df_previo)).drop_duplicates('Firma')
+        # Las firmas son hashes: pandas desborda (sin consecuencias) al comprobar si forman un rango
+        with np.errstate(over='ignore'):
+            self._por_firma = previo.set_index('Firma')[COLUMNAS_REUTILIZABLES]
+        self.aciertos = 0
+        self.evaluados = 0
+
+    def evaluar(self, df_prepared, evaluar):
+        """Devuelve COLUMNAS_EVALUACION reutilizando las filas con firma conocida."""
+        pos_previas = self._por_firma.index.get_indexer(df_prepared['Firma'])
+        reutilizadas = pos_previas >= 0
+        encontrados = self._por_firma.iloc[pos_previas[reutilizadas]].set_axis(np.flatnonzero(reutilizadas))
+        resultado, evaluadas = completar_evaluacion(df_prepared, encontrados, evaluar)
+
+        self.aciertos += len(encontrados)
+        self.evaluados += len(evaluadas)
+        return resultado
+
+def informe_cambios(df_previo, df_resultados):
+    """Filas añadidas, modificadas y eliminadas (por target) con el delta de Score y el cambio de riesgo PBN.
+
+    Las filas sin cambios en sus métricas cuyo Score ha cambiado solo por la edad del
+    dominio aparecen con Estado ESTADO_EDAD.
+    """
+    anterior = df_previo.drop_duplicates('target', keep='last')
+    nuevo = df_resultados.drop_duplicates('target', keep='last')
+    # Posición de cada target nuevo en el resultado anterior (-1 si no estaba)
+    pos = pd.Index(anterior['target']).get_indexer(nuevo['target'])
+    estaba = pos >= 0
+    eliminados = anterior[pd.Index(nuevo['target']).get_indexer(anterior['target']) < 0]
+
+    firma_anterior = _firmas(anterior)[pos]
+    score_anterior = np.where(estaba, anterior['Score'].to_numpy()[pos], np.nan)
+    score = nuevo['Score'].to_numpy(dtype='float64')
+    riesgo_anterior = np.where(estaba, anterior['PBN_Nivel_Riesgo'].to_numpy(dtype=object)[pos], None)
+    estado = np.select(
+        [~estaba, firma_anterior != _firmas(nuevo), score != score_anterior],
+        [ESTADO_NUEVO, ESTADO_MODIFICADO, ESTADO_EDAD],
+        default=''
+    )
+
+    cambios = pd.concat([
+        pd.DataFrame({
+            'target': nuevo['target'].to_numpy(),
+            'Estado': estado,
+            'Score_Anterior': score_anterior,
+            'Score': score,
+            'Riesgo_Anterior': riesgo_anterior,
+            'Riesgo': nuevo['PBN_Nivel_Riesgo'].to_numpy(dtype=object),
+        })[estado != ''],
+        pd.DataFrame({
+            'target': eliminados['target'].to_numpy(),
+            'Estado': ESTADO_ELIMINADO,
+            'Score_Anterior': eliminados['Score'].to_numpy(dtype='float64'),
+            'Score': np.nan,
+            'Riesgo_Anterior': eliminados['PBN_Nivel_Riesgo'].to_numpy(dtype=object),
+            'Riesgo': None,
+        }),
+    ], ignore_index=True)
+    cambios.insert(4, 'Delta_Score', cambios['Score'] - cambios['Score_Anterior'])
+    cambios['Cambio_Riesgo'] = (cambios['Estado'] == ESTADO_MODIFICADO) & (cambios['Riesgo_Anterior'] != cambios['Riesgo'])
+    return cambios.sort_values('Delta_Score', key=np.abs, ascending=False, na_position='last', ignore_index=True)
+
+def run_analysis_incremental(df_input, previo, batch_limit=None, workers=None, ahora=None):
+    """Evalúa df_input reutilizando los resultados de 'previo' (DataFrame o ruta de snapshot).
+
+    Devuelve un diccionario con 'resultado' (igual que run_analysis), 'cambios'
+    (informe_cambios) y 'resumen' (recuento de filas por estado). 'ahora' es la fecha
+    de referencia para la edad del dominio (por defecto, el momento actual).
+    """
+    if not isinstance(previo, pd.DataFrame):
+        previo = cargar_snapshot(previo)
+
+    reutilizados = ResultadosPrevios(previo)
+    resultado = run_analysis(df_input, batch_limit=batch_limit, cache=reutilizados, workers=workers, ahora=ahora)
+    cambios = informe_cambios(previo, resultado)
+
+    conteo = cambios['Estado'].value_counts()
+    resumen = {
+        'reutilizados': reutilizados.aciertos,
+        'evaluados': reutilizados.evaluados,
+        ESTADO_NUEVO: int(conteo.get(ESTADO_NUEVO, 0)),
+        ESTADO_MODIFICADO: int(conteo.get(ESTADO_MODIFICADO, 0)),
+        ESTADO_ELIMINADO: int(conteo.get(ESTADO_ELIMINADO, 0)),
+        ESTADO_EDAD: int(conteo.get(ESTADO_EDAD, 0)),
+        'cambios_riesgo': int(cambios['Cambio_Riesgo'].sum()),
+    }
+    return {'resultado': resultado, 'cambios': cambios, 'resumen': resumen}
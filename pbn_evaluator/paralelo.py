@@ -0,0 +1,107 @@
+"""Evaluación en paralelo (varios procesos) de score -> PBN -> whitelist.
+
+El bloque ya preparado se divide en shards que se envían a los procesos como tablas
+Arrow (formato IPC) en memoria compartida, sin serializar DataFrames con pickle; los
+resultados vuelven también en formato Arrow y se unen en el orden original.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import core
+from .perfiles import configurar_perfil, perfil_reglas
+
+# Filas mínimas por shard: por debajo, el coste de repartir supera al de evaluar
+MIN_FILAS_SHARD = 5000
+
+def _a_ipc(df):
+    """DataFrame -> buffer Arrow IPC."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, tabla.schema) as writer:
+        writer.write_table(tabla)
+    return sink.getvalue()
+
+def _de_ipc(buffer):
+    """Buffer Arrow IPC -> DataFrame (copiando los datos)."""
+    return pa.ipc.open_stream(buffer).read_all().to_pandas(zero_copy_only=False, self_destruct=True)
+
+def _inicializar_worker(whitelist, except_domains, patrones_pbn, perfil):
+    """Replica en el proceso las listas y el perfil de reglas vigentes en el proceso principal."""
+    core.configurar_listas(whitelist=whitelist, except_domains=except_domains, patrones_pbn=patrones_pbn)
+    configurar_perfil(perfil)
+
+def _evaluar_shard(nombre, tamaño):
+    """Lee un shard de la memoria compartida, lo evalúa y devuelve el resultado en Arrow IPC."""
+    shm = shared_memory.SharedMemory(name=nombre)
+    try:
+        df_shard = _de_ipc(pa.py_buffer(bytes(shm.buf[:tamaño])))
+    finally:
+        shm.close()
+    return _a_ipc(core._evaluar(df_shard)).to_pybytes()
+
+class EvaluadorParalelo:
+    """Sustituto de core._evaluar que reparte cada bloque entre 'workers' procesos.
+
+    Se usa como contexto (el pool se crea al primer bloque grande y se cierra al salir):
+
+        with EvaluadorParalelo(8) as evaluar:
+            df = core._analizar_chunk(df_input, evaluar=evaluar)
+
+    Normalmente basta con run_analysis(df_input, workers=8).
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(int(workers or core.WORKERS), 1)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_inicializar_worker,
+                initargs=(
+                    list(core.WHITELIST_DOMAINS), list(core.EXCEPT_DOMAINS), list(core.PATRONES_PBN),
+                    perfil_reglas().datos
+                )
+            )
+        return self._pool
+
+    def __call__(self, df_prepared):
+        n_shards = min(self.workers, len(df_prepared) // MIN_FILAS_SHARD)
+        if n_shards <= 1:
+            return core._evaluar(df_prepared)
+
+        pool = self._obtener_pool()
+        entrada = df_prepared.reindex(columns=core.COLUMNAS_ENTRADA_EVALUACION)
+        limites = np.linspace(0, len(entrada), n_shards + 1, dtype=int)
+        bloques, futuros = [], []
+        try:
+            for inicio, fin in zip(limites[:-1], limites[1:]):
+                buffer = _a_ipc(entrada.iloc[inicio:fin])
+                shm = shared_memory.SharedMemory(create=True, size=buffer.size)
+                bloques.append(shm)
+                shm.buf[:buffer.size] = memoryview(buffer).cast('B')
+                futuros.append(pool.submit(_evaluar_shard, shm.name, buffer.size))
+            partes = [_de_ipc(pa.py_buffer(f.result())) for f in futuros]
+        finally:
+            for shm in bloques:
+                shm.close()
+                shm.unlink()
+
+        # Arrow devuelve los textos con el tipo de texto por defecto de pandas, igual que core._evaluar
+        return pd.concat(partes, ignore_index=True).set_axis(df_prepared.index)
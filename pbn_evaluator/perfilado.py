@@ -0,0 +1,201 @@
+"""Medición por etapas del pipeline (lectura, preparación, score, PBN, whitelist, exportación).
+
+Las funciones del paquete marcan sus etapas con perfilado.etapa(); solo se mide algo
+mientras hay un Perfil activo, así que sin él el coste es una consulta a un ContextVar:
+
+    with Perfil() as perfil:
+        core.run_analysis(df)
+    print(perfil.tabla())
+    perfil.escribir_jsonl('tiempos.jsonl')
+
+Medir la memoria (tracemalloc) multiplica el tiempo de ejecución, así que solo se
+hace con memoria=True (modo 'memoria').
+"""
+import contextvars
+import cProfile
+from datetime import datetime
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+# Modo de medición por defecto de la interfaz: '' (desactivada), 'tiempos', 'memoria'
+# (también pico de memoria) o 'cprofile' (tiempos y cProfile)
+MODOS_PERFILADO = ('tiempos', 'memoria', 'cprofile')
+PERFILADO = os.environ.get('PBN_PERFILADO', '')
+# Archivo JSON lines al que la interfaz y la línea de comandos añaden cada medición
+RUTA_LOG_PERFILADO = os.environ.get('PBN_PERFILADO_LOG', '')
+
+_ACTIVO = contextvars.ContextVar('pbn_perfil', default=None)
+
+class _EtapaNula:
+    """Etapa sin medición (no hay Perfil activo)."""
+    filas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_ETAPA_NULA = _EtapaNula()
+
+def etapa(nombre, filas=None):
+    """Contexto que mide una etapa en el Perfil activo (no hace nada si no hay ninguno).
+
+    Las filas se pueden indicar al final asignando 'filas' al objeto del contexto.
+    """
+    perfil = _ACTIVO.get()
+    if perfil is None:
+        return _ETAPA_NULA
+    return _Etapa(perfil, nombre, filas)
+
+def activo():
+    """Perfil activo en este contexto (o None)."""
+    return _ACTIVO.get()
+
+class _Etapa:
+    __slots__ = ('perfil', 'nombre', 'filas', 'registro', 'inicio', 'base', 'pico', 'padre')
+
+    def __init__(self, perfil, nombre, filas):
+        self.perfil = perfil
+        self.nombre = nombre
+        self.filas = filas
+
+    def __enter__(self):
+        pila = self.perfil._pila
+        self.padre = pila[-1] if pila else None
+        # El registro se añade al empezar para que las etapas queden en orden de inicio
+        self.registro = {'etapa': self.nombre, 'nivel': len(pila)}
+        self.perfil.registros.append(self.registro)
+        self.base = self.pico = None
+        if self.perfil.memoria and tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            # El pico hasta ahora pertenece a la etapa padre; se reinicia para esta
+            if self.padre is not None and self.padre.pico is not None:
+                self.padre.pico = max(self.padre.pico, pico)
+            tracemalloc.reset_peak()
+            self.base = self.pico = actual
+        pila.append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        self.perfil._pila.pop()
+        pico_mb = None
+        if self.base is not None and tracemalloc.is_tracing():
+            self.pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+            pico_mb = (self.pico - self.base) / 2**20
+            if self.padre is not None and self.padre.pico is not None:
+                self.padre.pico = max(self.padre.pico, self.pico)
+        self.registro.update({
+            'filas': self.filas,
+            'segundos': segundos,
+            'filas_s': self.filas / segundos if self.filas and segundos > 0 else None,
+            'pico_mb': pico_mb,
+        })
+        return False
+
+class Perfil:
+    """Tiempo, filas/s y pico de memoria (tracemalloc) de cada etapa, con cProfile opcional.
+
+    Se puede activar varias veces (p. ej. al leer el archivo y al analizarlo); los
+    registros se acumulan. 'memoria' usa tracemalloc, que ralentiza mucho la ejecución.
+    """
+
+    def __init__(self, memoria=False, cprofile=False):
+        self.memoria = memoria
+        self.cprofile = cprofile
+        self.id = uuid.uuid4().hex
+        self.registros = []
+        self._pila = []
+        self._tokens = []
+        self._tracemalloc_propio = False
+        self._profiler = cProfile.Profile() if cprofile else None
+
+    def __enter__(self):
+        self._tokens.append(_ACTIVO.set(self))
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_propio = True
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._tracemalloc_propio:
+            tracemalloc.stop()
+            self._tracemalloc_propio = False
+        _ACTIVO.reset(self._tokens.pop())
+        return False
+
+    def etapa(self, nombre, filas=None):
+        return _Etapa(self, nombre, filas)
+
+    def resumen(self):
+        """Totales por etapa (en orden de aparición): llamadas, filas, segundos, filas/s y pico de memoria."""
+        columnas = ['etapa', 'nivel', 'llamadas', 'filas', 'segundos', 'filas_s', 'pico_mb']
+        # Solo las etapas terminadas
+        registros = [r for r in self.registros if 'segundos' in r]
+        if not registros:
+            return pd.DataFrame(columns=columnas)
+        df = pd.DataFrame(registros)
+        resumen = df.groupby(['etapa', 'nivel'], sort=False).agg(
+            llamadas=('segundos', 'size'),
+            filas=('filas', lambda s: s.sum(min_count=1)),
+            segundos=('segundos', 'sum'),
+            pico_mb=('pico_mb', 'max'),
+        ).reset_index()
+        resumen['filas_s'] = resumen['filas'] / resumen['segundos']
+        return resumen[columnas]
+
+    def tabla(self):
+        """Resumen como texto (etapas anidadas con sangría), para la consola."""
+        resumen = self.resumen()
+        lineas = [f"{'etapa':<24} {'filas':>10} {'segundos':>9} {'filas/s':>11} {'pico MB':>8}"]
+        for fila in resumen.itertuples(index=False):
+            filas = '' if pd.isna(fila.filas) else f'{int(fila.filas):,}'
+            filas_s = '' if pd.isna(fila.filas_s) else f'{fila.filas_s:,.0f}'
+            pico = '' if pd.isna(fila.pico_mb) else f'{fila.pico_mb:.1f}'
+            nombre = '  ' * fila.nivel + fila.etapa
+            lineas.append(f'{nombre:<24} {filas:>10} {fila.segundos:>9.3f} {filas_s:>11} {pico:>8}')
+        return '\n'.join(lineas)
+
+    def estadisticas_cprofile(self, n=25):
+        """Las 'n' funciones con más tiempo acumulado según cProfile ('' si no se activó)."""
+        if self._profiler is None:
+            return ''
+        salida = io.StringIO()
+        pstats.Stats(self._profiler, stream=salida).sort_stats('cumulative').print_stats(n)
+        return salida.getvalue()
+
+    def lineas_json(self, **extra):
+        """Un objeto JSON por etapa medida, con el id del perfil, la hora y los campos de 'extra'."""
+        ahora = datetime.now().isoformat(timespec='seconds')
+        for registro in self.registros:
+            if 'segundos' not in registro:
+                continue
+            yield json.dumps({'perfil': self.id, 'ts': ahora, **extra, **registro}, ensure_ascii=False)
+
+    def escribir_jsonl(self, destino, **extra):
+        """Añade las mediciones a 'destino' (ruta o archivo de texto) en formato JSON lines."""
+        if hasattr(destino, 'write'):
+            for linea in self.lineas_json(**extra):
+                destino.write(linea + '\n')
+            return
+        with open(destino, 'a', encoding='utf-8') as f:
+            self.escribir_jsonl(f, **extra)
+
+def crear_perfil(modo):
+    """Perfil para un modo de MODOS_PERFILADO (None si 'modo' está vacío)."""
+    if not modo:
+        return None
+    return Perfil(memoria=(modo == 'memoria'), cprofile=(modo == 'cprofile'))
@@ -0,0 +1,251 @@
+"""Perfiles de reglas: pesos, umbrales y puntos del Trust Score y de la detección PBN.
+
+Un perfil es un archivo JSON con solo los valores que cambian respecto a
+PERFIL_POR_DEFECTO (el resto se hereda). Se valida y se compila una vez (PerfilReglas,
+cacheado por su hash); core usa el perfil vigente:
+
+    with usar_perfil(cargar_perfil('perfiles/estricto.json')):
+        core.run_analysis(df)
+
+Sin usar_perfil rige el perfil configurado con configurar_perfil (por defecto,
+PERFIL_POR_DEFECTO). El hash del perfil forma parte de core.version_reglas, así que
+las cachés no mezclan resultados de perfiles distintos.
+"""
+from contextlib import contextmanager
+import contextvars
+import copy
+import glob
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+# Directorio de perfiles que ofrece la interfaz; configurable con PBN_DIR_PERFILES
+DIR_PERFILES = os.environ.get(
+    'PBN_DIR_PERFILES',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'perfiles')
+)
+
+# Perfil por defecto (los valores del script original) y esquema de los perfiles:
+# un perfil solo puede contener claves que existan aquí
+PERFIL_POR_DEFECTO = {
+    'nombre': 'Por defecto',
+    'score': {
+        # Dominios con DR menor o igual quedan descartados (Score 0)
+        'dr_minimo': 30,
+        # Peso de cada componente del Score (deben sumar 1)
+        'pesos': {'dr_quality': 0.35, 'traffic_authority': 0.25, 'link_profile': 0.20, 'trust_signals': 0.20},
+        # Score mínimo de 'Excelente' y de 'Aceptable'
+        'umbral_excelente': 75,
+        'umbral_aceptable': 50,
+    },
+    'pbn': {
+        # Diversidad de IPs (subredes / IPs) por debajo de la cual se suma sospecha;
+        # tramos: [tráfico mayor que, umbral] de mayor a menor tráfico
+        'diversidad_ips': {'umbral': 0.3, 'tramos': [[100000, 0.2], [50000, 0.25]]},
+        # Backlinks por referring domain a partir de los que se suma sospecha;
+        # tramos: [referring domains mayor que, umbral] de mayor a menor
+        'densidad_backlinks': {'umbral': 10, 'tramos': [[5000, 20], [2000, 15], [1000, 12]]},
+        # Puntos de sospecha mínimos de cada nivel de riesgo
+        'niveles_riesgo': {'alto': 8, 'moderado': 5, 'bajo': 3},
+        # Puntos que suma (o resta) cada regla PBN al dispararse
+        'puntos': {
+            'ips_baja_diversidad': 1, 'backlinks_densidad_alta': 3, 'refdom_followed_alto': 1,
+            'dr_vs_trafico': 1, 'dr_vs_refdomains': 1, 'dominio_nuevo': 2, 'dominio_antiguo': -1,
+            'tlds_autoridad_ok': -2, 'tlds_autoridad_ninguno': 1, 'anchors_marca_bajo': 1,
+            'anchors_marca_ok': -2, 'dofollow_alto': 1, 'dofollow_bajo': 1,
+            'ur_bajo_pagina_interna': 1, 'ur_bajo': 2, 'patron_pbn': 1,
+        },
+        # Reducciones por señales de autoridad legítima (sin bajar de 0)
+        'reducciones': {'senales_multiples': 2, 'senales_algunas': 1, 'dominio_consolidado': 3},
+        # Puntos asignados a los dominios descartados por DR
+        'puntos_dr_no_aceptable': 10,
+    },
+}
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+def _es_entero(valor):
+    return _es_numero(valor) and float(valor).is_integer()
+
+def _combinar(base, cambios, ruta=''):
+    """Aplica 'cambios' sobre una copia de 'base', rechazando claves que no existan en ella."""
+    if not isinstance(cambios, dict):
+        raise ValueError(f"'{ruta or 'perfil'}' debe ser un objeto JSON.")
+    resultado = copy.deepcopy(base)
+    for clave, valor in cambios.items():
+        nombre = f'{ruta}.{clave}' if ruta else clave
+        if clave not in base:
+            raise ValueError(f"Clave desconocida en el perfil: '{nombre}'.")
+        if isinstance(base[clave], dict):
+            resultado[clave] = _combinar(base[clave], valor, nombre)
+        else:
+            resultado[clave] = copy.deepcopy(valor)
+    return resultado
+
+def _validar_tramos(tramos, nombre):
+    if not isinstance(tramos, list) or not all(
+        isinstance(t, list) and len(t) == 2 and all(_es_numero(v) for v in t) for t in tramos
+    ):
+        raise ValueError(f"'{nombre}' debe ser una lista de pares [límite, umbral] numéricos.")
+    limites = [t[0] for t in tramos]
+    if any(a <= b for a, b in zip(limites, limites[1:])):
+        raise ValueError(f"Los límites de '{nombre}' deben ir de mayor a menor.")
+
+def validar_perfil(datos):
+    """Completa un perfil con los valores por defecto y comprueba tipos y rangos (ValueError si no es válido)."""
+    perfil = _combinar(PERFIL_POR_DEFECTO, datos)
+    score, pbn = perfil['score'], perfil['pbn']
+
+    if not isinstance(perfil['nombre'], str) or not perfil['nombre'].strip():
+        raise ValueError("'nombre' debe ser un texto no vacío.")
+    if not _es_numero(score['dr_minimo']) or not 0 <= score['dr_minimo'] <= 100:
+        raise ValueError("'score.dr_minimo' debe ser un número entre 0 y 100.")
+    pesos = score['pesos']
+    if not all(_es_numero(p) and p >= 0 for p in pesos.values()):
+        raise ValueError("Los pesos de 'score.pesos' deben ser números no negativos.")
+    if abs(sum(pesos.values()) - 1) > 1e-6:
+        raise ValueError(f"Los pesos de 'score.pesos' deben sumar 1 (suman {sum(pesos.values()):g}).")
+    if not all(_es_numero(score[c]) for c in ('umbral_excelente', 'umbral_aceptable')) or not (
+        0 <= score['umbral_aceptable'] <= score['umbral_excelente'] <= 100
+    ):
+        raise ValueError("Debe cumplirse 0 <= 'score.umbral_aceptable' <= 'score.umbral_excelente' <= 100.")
+
+    for regla in ('diversidad_ips', 'densidad_backlinks'):
+        if not _es_numero(pbn[regla]['umbral']):
+            raise ValueError(f"'pbn.{regla}.umbral' debe ser un número.")
+        _validar_tramos(pbn[regla]['tramos'], f'pbn.{regla}.tramos')
+    niveles = pbn['niveles_riesgo']
+    if not all(_es_entero(v) for v in niveles.values()) or not niveles['alto'] > niveles['moderado'] > niveles['bajo']:
+        raise ValueError("'pbn.niveles_riesgo' deben ser enteros con alto > moderado > bajo.")
+    for grupo in ('puntos', 'reducciones'):
+        if not all(_es_entero(v) for v in pbn[grupo].values()):
+            raise ValueError(f"Los valores de 'pbn.{grupo}' deben ser enteros.")
+    if any(v < 0 for v in pbn['reducciones'].values()):
+        raise ValueError("Los valores de 'pbn.reducciones' no pueden ser negativos.")
+    if not _es_entero(pbn['puntos_dr_no_aceptable']):
+        raise ValueError("'pbn.puntos_dr_no_aceptable' debe ser un entero.")
+    return perfil
+
+def hash_perfil(perfil):
+    """Huella de los valores de un perfil completo (el nombre no cuenta)."""
+    valores = {clave: valor for clave, valor in perfil.items() if clave != 'nombre'}
+    return hashlib.sha1(json.dumps(valores, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+class PerfilReglas:
+    """Perfil validado y compilado: valores ya convertidos a los tipos y arrays que usa core.
+
+    No se crea directamente: compilar_perfil reutiliza la compilación por hash.
+    """
+
+    def __init__(self, perfil):
+        self.datos = perfil
+        self.nombre = perfil['nombre']
+        self.hash = hash_perfil(perfil)
+        score, pbn = perfil['score'], perfil['pbn']
+
+        self.dr_minimo = score['dr_minimo']
+        self.pesos = {clave: float(peso) for clave, peso in score['pesos'].items()}
+        self.umbral_excelente = score['umbral_excelente']
+        self.umbral_aceptable = score['umbral_aceptable']
+
+        # Tramos como listas de límites y umbrales para np.select
+        self._diversidad_ips = self._tramos(pbn['diversidad_ips'])
+        self._densidad_backlinks = self._tramos(pbn['densidad_backlinks'])
+
+        niveles = pbn['niveles_riesgo']
+        # Umbral de cada nivel de riesgo, en el orden de core.NIVELES_RIESGO_PBN
+        self.umbrales_riesgo = [int(niveles['alto']), int(niveles['moderado']), int(niveles['bajo']), float('-inf')]
+        self.puntos = {clave: int(v) for clave, v in pbn['puntos'].items()}
+        self.reducciones = {clave: int(v) for clave, v in pbn['reducciones'].items()}
+        self.puntos_dr_no_aceptable = int(pbn['puntos_dr_no_aceptable'])
+
+    @staticmethod
+    def _tramos(regla):
+        limites = [float(limite) for limite, _ in regla['tramos']]
+        umbrales = [float(umbral) for _, umbral in regla['tramos']]
+        return limites, umbrales, float(regla['umbral'])
+
+    @staticmethod
+    def _umbral(valores, tramos):
+        limites, umbrales, base = tramos
+        if not limites:
+            return np.full(np.shape(valores), base)
+        return np.select([valores > limite for limite in limites], umbrales, base)
+
+    def umbral_diversidad_ips(self, traffic):
+        """Umbral de diversidad de IPs según el tráfico (escalar o array)."""
+        return self._umbral(traffic, self._diversidad_ips)
+
+    def umbral_densidad_backlinks(self, refdomains):
+        """Umbral de backlinks por referring domain según los referring domains (escalar o array)."""
+        return self._umbral(refdomains, self._densidad_backlinks)
+
+_COMPILADOS = {}
+
+def compilar_perfil(datos):
+    """Valida y compila un perfil (dict); la compilación se reutiliza para perfiles con el mismo hash."""
+    if isinstance(datos, PerfilReglas):
+        return datos
+    perfil = validar_perfil(datos)
+    clave = (hash_perfil(perfil), perfil['nombre'])
+    compilado = _COMPILADOS.get(clave)
+    if compilado is None:
+        compilado = _COMPILADOS[clave] = PerfilReglas(perfil)
+    return compilado
+
+def derivar_perfil(base, cambios):
+    """Compila 'base' (PerfilReglas o dict) con los valores de 'cambios' (dict anidado) aplicados encima."""
+    base = compilar_perfil(base)
+    return compilar_perfil(_combinar(base.datos, cambios))
+
+def cargar_perfil(ruta):
+    """Lee, valida y compila un perfil JSON (ValueError si no es válido)."""
+    with open(ruta, encoding='utf-8') as f:
+        try:
+            datos = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"El perfil {os.path.basename(ruta)} no es JSON válido: {e}") from e
+    if isinstance(datos, dict) and 'nombre' not in datos:
+        datos = {**datos, 'nombre': os.path.splitext(os.path.basename(ruta))[0]}
+    return compilar_perfil(datos)
+
+def listar_perfiles(directorio=None):
+    """{nombre de archivo sin extensión: ruta} de los perfiles JSON de 'directorio' (por defecto DIR_PERFILES)."""
+    directorio = DIR_PERFILES if directorio is None else directorio
+    if not directorio or not os.path.isdir(directorio):
+        return {}
+    rutas = sorted(glob.glob(os.path.join(directorio, '*.json')))
+    return {os.path.splitext(os.path.basename(ruta))[0]: ruta for ruta in rutas}
+
+# --- Perfil vigente ---
+_POR_DEFECTO = compilar_perfil(PERFIL_POR_DEFECTO)
+_PERFIL_CONFIGURADO = _POR_DEFECTO
+_ACTIVO = contextvars.ContextVar('pbn_perfil_reglas', default=None)
+
+def perfil_reglas():
+    """Perfil vigente: el de usar_perfil en este contexto o, si no hay, el configurado."""
+    return _ACTIVO.get() or _PERFIL_CONFIGURADO
+
+def configurar_perfil(perfil=None):
+    """Fija el perfil de todo el proceso (dict, PerfilReglas o ruta JSON; None vuelve al por defecto)."""
+    global _PERFIL_CONFIGURADO
+    if perfil is None:
+        _PERFIL_CONFIGURADO = _POR_DEFECTO
+    elif isinstance(perfil, (str, os.PathLike)):
+        _PERFIL_CONFIGURADO = cargar_perfil(perfil)
+    else:
+        _PERFIL_CONFIGURADO = compilar_perfil(perfil)
+    return _PERFIL_CONFIGURADO
+
+@contextmanager
+def usar_perfil(perfil):
+    """Contexto en el que rige 'perfil' (dict o PerfilReglas) solo para este hilo o sesión."""
+    token = _ACTIVO.set(compilar_perfil(perfil) if perfil is not None else None)
+    try:
+        yield perfil_reglas()
+    finally:
+        _ACTIVO.reset(token)
@@ -0,0 +1,270 @@
+"""Servicio HTTP/JSON local para puntuar dominios sueltos (solo biblioteca estándar).
+
+    python -m pbn_evaluator serve --port 8765
+    curl -s localhost:8765/evaluar -d '{"target": "ejemplo.com", "Domain Rating": 45}'
+
+POST /evaluar recibe un dominio (objeto JSON) o una lista y devuelve el resultado con
+la misma forma; las claves pueden ser los nombres de columna de la exportación o los
+campos del mapeo ('dr', 'organic_traffic', ...). Con ?textos=0 no se generan Reason,
+alertas ni recomendaciones. GET /salud y GET /metricas (latencias y tamaño de lote).
+
+Las peticiones concurrentes se agrupan durante unos milisegundos (EvaluadorMicroLotes)
+y se evalúan como un solo bloque vectorizado; el perfil de reglas, los índices de
+whitelist/EXCEPT y el matcher de patrones se quedan cargados en memoria.
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from . import core
+from .perfiles import perfil_reglas
+
+# Espera máxima (ms) para reunir un lote desde su primera petición, y dominios por lote
+VENTANA_MS = float(os.environ.get('PBN_SERVICIO_VENTANA_MS', 5))
+MAX_LOTE = int(os.environ.get('PBN_SERVICIO_MAX_LOTE', 256))
+# Latencias recientes que se conservan para los percentiles de /metricas
+MAX_LATENCIAS = 10000
+# Tamaño máximo del cuerpo de una petición
+MAX_BYTES_PETICION = 8 * 2**20
+# Mapeos de claves JSON que se conservan en memoria (no se persisten en RUTA_PERFILES_COLUMNAS)
+MAX_MAPEOS = 64
+
+# Columna preferida de cada campo del mapeo: las filas del lote se construyen con ellas
+_COLUMNAS_ENTRADA = {campo: candidatos[0] for campo, candidatos in core.CANDIDATOS_COLUMNAS.items()}
+_COLUMNAS_SIN_TEXTO = [c for c in core.COLUMNAS_RESULTADO if c not in core.COLUMNAS_TEXTO_DIFERIDO]
+
+_mapeos = OrderedDict()  # {claves de la petición: columnas}, LRU de MAX_MAPEOS entradas
+_lock_mapeos = threading.Lock()
+
+def _mapeo_claves(claves):
+    """Mapeo campo -> clave de una petición, cacheado solo en memoria.
+
+    No usa core.resolver_mapeo: las claves las decide el cliente y no deben desplazar
+    ni reescribir los perfiles de cabecera guardados, y el servicio resuelve desde
+    varios hilos a la vez.
+    """
+    claves = tuple(claves)
+    with _lock_mapeos:
+        columnas = _mapeos.get(claves)
+        if columnas is not None:
+            _mapeos.move_to_end(claves)
+            return columnas
+    columnas = core._resolver_mapeo_sin_cache(claves)['columnas']
+    with _lock_mapeos:
+        _mapeos[claves] = columnas
+        while len(_mapeos) > MAX_MAPEOS:
+            _mapeos.popitem(last=False)
+    return columnas
+
+def _fila_entrada(dominio):
+    """Fila del lote para un dominio: {columna preferida: valor} (ValueError si no es válido)."""
+    if not isinstance(dominio, dict):
+        raise ValueError("Cada dominio debe ser un objeto JSON.")
+    campos = {clave: valor for clave, valor in dominio.items() if clave in _COLUMNAS_ENTRADA}
+    resto = [clave for clave in dominio if clave not in campos]
+    if resto:
+        # Nombres de columna de la exportación
+        for campo, columna in _mapeo_claves(resto).items():
+            if columna is not None and campo not in campos:
+                campos[campo] = dominio[columna]
+    if campos.get('target') in (None, ''):
+        raise ValueError("Falta el dominio ('target').")
+    return {_COLUMNAS_ENTRADA[campo]: valor for campo, valor in campos.items()}
+
+def _evaluar_filas(filas, textos):
+    """Evalúa un lote de filas de entrada; 'textos' indica por fila si se generan los textos."""
+    df = pd.DataFrame(filas, columns=list(_COLUMNAS_ENTRADA.values()))
+    df_prepared = core.prepare_df_tolerant(df)
+    evaluacion = core._evaluar(df_prepared)
+    for col in core.COLUMNAS_EVALUACION:
+        df_prepared[col] = evaluacion[col].to_numpy()
+
+    resultados = df_prepared.reindex(columns=_COLUMNAS_SIN_TEXTO).to_dict('records')
+    posiciones = np.flatnonzero(textos)
+    if len(posiciones):
+        expandidos = core.expandir_resultados(df_prepared.iloc[posiciones]).to_dict('records')
+        for posicion, resultado in zip(posiciones, expandidos):
+            resultados[posicion] = resultado
+    return resultados
+
+def evaluar_dominios(dominios, textos=True):
+    """Evalúa una lista de dominios (dicts) sin agrupar peticiones; devuelve un dict por dominio."""
+    filas = [_fila_entrada(dominio) for dominio in dominios]
+    return _evaluar_filas(filas, [textos] * len(filas))
+
+def calentar():
+    """Deja cargado todo lo que la primera petición tendría que preparar (versión de reglas, regex, rutas de pandas)."""
+    core.version_reglas()
+    evaluar_dominios([{'target': 'calentamiento.example', 'dr': 50, 'organic_traffic': 1000}])
+
+class EvaluadorMicroLotes:
+    """Agrupa peticiones concurrentes y las evalúa juntas en un hilo.
+
+    Un lote se cierra 'ventana_ms' después de su primera petición o al reunir
+    'max_lote' dominios; cada petición recibe solo sus resultados. Si un lote falla,
+    sus peticiones se reintentan por separado para que el error sea solo de la suya.
+    """
+
+    def __init__(self, ventana_ms=None, max_lote=None):
+        self.ventana = (VENTANA_MS if ventana_ms is None else ventana_ms) / 1000
+        self.max_lote = max_lote or MAX_LOTE
+        self.peticiones = self.lotes = self.dominios = 0
+        self._latencias = deque(maxlen=MAX_LATENCIAS)
+        self._lock = threading.Lock()
+        self._cola = queue.SimpleQueue()
+        self._hilo = threading.Thread(target=self._bucle, name='pbn-micro-lotes', daemon=True)
+        self._hilo.start()
+
+    def evaluar(self, dominios, textos=True, timeout=None):
+        """Resultados de 'dominios' (lista de dicts); espera a que se evalúe su lote."""
+        inicio = time.perf_counter()
+        filas = [_fila_entrada(dominio) for dominio in dominios]
+        futuro = Future()
+        self._cola.put((filas, textos, futuro))
+        resultados = futuro.result(timeout)
+        with self._lock:
+            self._latencias.append(time.perf_counter() - inicio)
+        return resultados
+
+    def _bucle(self):
+        while True:
+            peticion = self._cola.get()
+            if peticion is None:
+                return
+            lote, dominios = [peticion], len(peticion[0])
+            limite = time.perf_counter() + self.ventana
+            while dominios < self.max_lote:
+                try:
+                    peticion = self._cola.get(timeout=max(0.0, limite - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if peticion is None:
+                    self._cola.put(None)  # Se termina después de este lote
+                    break
+                lote.append(peticion)
+                dominios += len(peticion[0])
+            self._procesar(lote)
+
+    def _procesar(self, lote):
+        filas = [fila for peticion in lote for fila in peticion[0]]
+        textos = [peticion[1] for peticion in lote for _ in peticion[0]]
+        try:
+            resultados = _evaluar_filas(filas, textos) if filas else []
+        except Exception as e:
+            if len(lote) > 1:
+                for peticion in lote:
+                    self._procesar([peticion])
+            else:
+                lote[0][2].set_exception(e)
+            return
+        with self._lock:
+            self.lotes += 1
+            self.peticiones += len(lote)
+            self.dominios += len(filas)
+        inicio = 0
+        for peticion in lote:
+            peticion[2].set_result(resultados[inicio:inicio + len(peticion[0])])
+            inicio += len(peticion[0])
+
+    def estadisticas(self):
+        """Peticiones, lotes, dominios por lote y percentiles de latencia (ms) de las peticiones recientes."""
+        with self._lock:
+            latencias = np.array(self._latencias) * 1000
+            datos = {
+                'peticiones': self.peticiones, 'lotes': self.lotes, 'dominios': self.dominios,
+                'dominios_por_lote': round(self.dominios / self.lotes, 2) if self.lotes else None,
+            }
+        if len(latencias):
+            p50, p90, p99 = np.percentile(latencias, [50, 90, 99])
+            datos['latencia_ms'] = {
+                'p50': round(p50, 2), 'p90': round(p90, 2), 'p99': round(p99, 2), 'max': round(latencias.max(), 2)
+            }
+        return datos
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Conexiones persistentes
+
+    def _responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        ruta = urlsplit(self.path).path
+        if ruta == '/salud':
+            perfil = perfil_reglas()
+            self._responder(200, {'estado': 'ok', 'perfil_reglas': perfil.nombre, 'version_reglas': core.version_reglas()})
+        elif ruta == '/metricas':
+            self._responder(200, self.server.evaluador.estadisticas())
+        else:
+            self._responder(404, {'error': f"Ruta desconocida: {ruta}"})
+
+    def do_POST(self):
+        partes = urlsplit(self.path)
+        if partes.path != '/evaluar':
+            self._responder(404, {'error': f"Ruta desconocida: {partes.path}"})
+            return
+        longitud = int(self.headers.get('Content-Length') or 0)
+        if longitud > MAX_BYTES_PETICION:
+            self._responder(413, {'error': 'Petición demasiado grande.'})
+            self.close_connection = True
+            return
+        try:
+            datos = json.loads(self.rfile.read(longitud) or b'null')
+        except ValueError as e:
+            self._responder(400, {'error': f"JSON no válido: {e}"})
+            return
+        textos = parse_qs(partes.query).get('textos', ['1'])[-1] not in ('0', 'false', 'no')
+        individual = not isinstance(datos, list)
+        try:
+            resultados = self.server.evaluador.evaluar([datos] if individual else datos, textos=textos)
+        except ValueError as e:
+            self._responder(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._responder(500, {'error': f"Error al evaluar: {e}"})
+            return
+        self._responder(200, resultados[0] if individual else resultados)
+
+    def log_message(self, formato, *args):
+        pass  # Sin una línea por petición (la latencia se ve en /metricas)
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    # Conexiones en espera de accept(): con el valor por defecto (5) una ráfaga de
+    # clientes concurrentes recibe 'connection reset' antes de llegar al micro-lote
+    request_queue_size = 128
+
+def crear_servidor(host='127.0.0.1', puerto=8765, ventana_ms=None, max_lote=None):
+    """Servidor HTTP (sin arrancar) con su EvaluadorMicroLotes en 'servidor.evaluador'; puerto 0 = uno libre."""
+    calentar()
+    servidor = _Servidor((host, puerto), _Manejador)
+    servidor.evaluador = EvaluadorMicroLotes(ventana_ms, max_lote)
+    return servidor
+
+def servir(host='127.0.0.1', puerto=8765, ventana_ms=None, max_lote=None):
+    """Arranca el servicio y atiende peticiones hasta Ctrl+C."""
+    servidor = crear_servidor(host, puerto, ventana_ms, max_lote)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.evaluador.cerrar()
@@ -0,0 +1,22 @@
+"""Configuración común de las pruebas (python -m pytest -q desde la raíz del repositorio)."""
+import os
+
+# Nada de lo que persiste el paquete en ~/.pbn_evaluator debe tocarse desde las pruebas;
+# se fija antes de importar pbn_evaluator, que lee estas variables al cargarse
+os.environ['PBN_PERFILES_COLUMNAS'] = ''
+os.environ['PBN_CACHE_RESULTADOS'] = ''
+os.environ['PBN_CACHE_ANALISIS'] = ''
+os.environ['PBN_PERFILADO'] = ''
+os.environ['PBN_PERFILADO_LOG'] = ''
+
+import pytest
+
+from benchmarks.datos_sinteticos import generar_export
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_PERFIL_ESTRICTO = os.path.join(RAIZ, 'perfiles', 'estricto.json')
+
+@pytest.fixture
+def export_sintetico():
+    """Exportación sintética de 2.000 filas (mismos datos en cada prueba)."""
+    return generar_export(2000, seed=7)
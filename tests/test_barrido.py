@@ -0,0 +1,106 @@
+"""Barrido what-if: cada fila del resumen coincide con run_analysis bajo la configuración correspondiente."""
+import json
+
+import numpy as np
+import pytest
+
+from pbn_evaluator import barrido as modulo_barrido
+from pbn_evaluator import core
+from pbn_evaluator.barrido import (
+    CATEGORIAS_LABEL, CATEGORIAS_RIESGO, barrido, cargar_barrido, muestra_aleatoria, rejilla
+)
+from pbn_evaluator.perfiles import derivar_perfil, perfil_reglas, usar_perfil
+
+CONFIGURACIONES = [
+    {'score.umbral_excelente': 80, 'score.umbral_aceptable': 55},
+    {'score.pesos.dr_quality': 0.5},
+    {'score.dr_minimo': 20},
+    {'pbn.niveles_riesgo.alto': 6, 'pbn.puntos.patron_pbn': 3},
+    {'pbn.densidad_backlinks.tramos': [[3000, 18], [500, 9]], 'pbn.diversidad_ips.umbral': 0.5},
+    {'pbn.reducciones.dominio_consolidado': 1},
+]
+
+def _categorias(resultado):
+    """Label y nivel de riesgo de un resultado como columnas de CATEGORIAS_LABEL / CATEGORIAS_RIESGO."""
+    label = resultado['Label'].astype(str).map({
+        core.LABEL_EXCELENTE: 'excelente', core.LABEL_WHITELIST: 'excelente',
+        core.LABEL_ACEPTABLE: 'aceptable', core.LABEL_RIESGOSO: 'riesgoso',
+    }).fillna('dr_no_aceptable')
+    riesgos = {nivel: CATEGORIAS_RIESGO[i] for i, (nivel, _) in enumerate(core.NIVELES_RIESGO_PBN)}
+    riesgos[core.RIESGO_WHITELIST] = 'pbn_whitelist'
+    riesgo = resultado['PBN_Nivel_Riesgo'].astype(str).map(riesgos).fillna('pbn_dr_no_aceptable')
+    return label.to_numpy(), riesgo.to_numpy()
+
+def _fila_esperada(resultado, base):
+    label, riesgo = _categorias(resultado)
+    fila = {c: int((label == c).sum()) for c in CATEGORIAS_LABEL}
+    fila.update({c: int((riesgo == c).sum()) for c in CATEGORIAS_RIESGO})
+    fila['score_medio'] = round(float(resultado['Score'].mean()), 2)
+    label_base, riesgo_base = _categorias(base)
+    fila['cambios_label'] = int((label != label_base).sum())
+    fila['cambios_riesgo'] = int((riesgo != riesgo_base).sum())
+    return fila
+
+def test_cada_configuracion_igual_que_run_analysis(export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    resumen = barrido(resultado, CONFIGURACIONES)
+    assert len(resumen) == len(CONFIGURACIONES) + 1
+
+    base = perfil_reglas()
+    for k, cambios in enumerate([{}] + CONFIGURACIONES):
+        perfil = derivar_perfil(base, modulo_barrido._anidar(modulo_barrido._completar_pesos(base, cambios)))
+        with usar_perfil(perfil):
+            esperado = core.run_analysis(export_sintetico)
+        obtenido = resumen.loc[k, list(_fila_esperada(esperado, resultado))].to_dict()
+        assert obtenido == _fila_esperada(esperado, resultado), cambios
+    # La fila 0 es el perfil base: sin cambios respecto a sí misma
+    assert resumen.loc[0, ['cambios_label', 'cambios_riesgo']].tolist() == [0, 0]
+
+def test_resultado_o_filas_preparadas(export_sintetico):
+    preparado = core.prepare_df_tolerant(export_sintetico.copy())
+    assert barrido(core.run_analysis(export_sintetico), CONFIGURACIONES).equals(barrido(preparado, CONFIGURACIONES))
+
+def test_bloques_pequeños(monkeypatch, export_sintetico):
+    preparado = core.prepare_df_tolerant(export_sintetico.copy())
+    configuraciones = rejilla({'score.pesos.dr_quality': [0.25, 0.35, 0.45], 'pbn.niveles_riesgo.alto': [7, 8, 9]})
+    completo = barrido(preparado, configuraciones)
+    monkeypatch.setattr(modulo_barrido, 'MAX_CELDAS_BLOQUE', len(preparado) * 2)
+    assert barrido(preparado, configuraciones).equals(completo)
+
+def test_pesos_completados():
+    base = perfil_reglas()
+    pesos = modulo_barrido._completar_pesos(base, {'score.pesos.dr_quality': 0.5})['score.pesos']
+    assert pesos['dr_quality'] == 0.5
+    assert sum(pesos.values()) == pytest.approx(1)
+    # El resto mantiene sus proporciones
+    assert pesos['traffic_authority'] / pesos['link_profile'] == pytest.approx(
+        base.pesos['traffic_authority'] / base.pesos['link_profile']
+    )
+
+def test_configuraciones_no_validas(export_sintetico):
+    preparado = core.prepare_df_tolerant(export_sintetico.iloc[:100].copy())
+    malas = [{'score.umbral_excelente': 30}, {'pbn.niveles_riesgo.bajo': 20}, {'score.umbral_excelente': 90}]
+    resumen = barrido(preparado, malas)
+    assert len(resumen) == 2 and resumen.attrs['omitidas'] == 2
+    with pytest.raises(ValueError):
+        barrido(preparado, malas, omitir_invalidas=False)
+    with pytest.raises(ValueError, match="Clave desconocida en el barrido: 'score.umbral'"):
+        barrido(preparado, [{'score.umbral': 80}])
+
+def test_generacion_de_configuraciones(tmp_path):
+    assert len(rejilla({'a.b': [1, 2, 3], 'c.d': [4, 5]})) == 6
+    aleatorias = muestra_aleatoria({'score.dr_minimo': (20, 40), 'score.pesos.dr_quality': (0.2, 0.5)}, 50, semilla=3)
+    assert aleatorias == muestra_aleatoria({'score.dr_minimo': (20, 40), 'score.pesos.dr_quality': (0.2, 0.5)}, 50, semilla=3)
+    assert all(isinstance(c['score.dr_minimo'], int) and 20 <= c['score.dr_minimo'] <= 40 for c in aleatorias)
+    assert np.all([0.2 <= c['score.pesos.dr_quality'] <= 0.5 for c in aleatorias])
+
+    ruta = tmp_path / 'barrido.json'
+    ruta.write_text(json.dumps({
+        'configuraciones': [{'score.dr_minimo': 25}],
+        'rejilla': {'score.umbral_excelente': [70, 80]},
+        'aleatorio': {'rangos': {'score.dr_minimo': [10, 20]}, 'muestras': 3},
+    }), encoding='utf-8')
+    assert len(cargar_barrido(ruta)) == 6
+    ruta.write_text(json.dumps({'rejila': {}}), encoding='utf-8')
+    with pytest.raises(ValueError, match='rejila'):
+        cargar_barrido(ruta)
@@ -0,0 +1,69 @@
+"""CacheResultados: aciertos por firma entre ejecuciones y estabilidad con el paso de los días."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_export
+from pbn_evaluator import core
+from pbn_evaluator.cache import CacheResultados
+
+T = datetime(2026, 2, 20)
+# Las fechas sintéticas caen el 15 de marzo y la edad se redondea a 0,1 años: una semana
+# después parte de las edades cruza un año entero, y esas filas (solo esas) se reevalúan
+SEMANA_DESPUES = T + timedelta(days=7)
+
+def _edad_entera(df, ahora):
+    return np.floor(core.prepare_df_tolerant(df.copy(), ahora)['domain_age'].to_numpy(dtype=float))
+
+def test_segunda_ejecucion_sale_entera_de_la_cache(tmp_path, export_sintetico):
+    cache = CacheResultados(tmp_path / 'cache.sqlite')
+    primera = core.run_analysis(export_sintetico, cache=cache, ahora=T)
+    evaluadas = cache.evaluados
+    assert cache.aciertos == 0 and evaluadas > 0
+
+    segunda = core.run_analysis(export_sintetico, cache=cache, ahora=T)
+    assert cache.evaluados == evaluadas
+    assert cache.aciertos == evaluadas
+    assert segunda[core.COLUMNAS_EVALUACION].equals(primera[core.COLUMNAS_EVALUACION])
+
+def test_una_semana_despues_solo_se_reevaluan_los_cambios_de_año(tmp_path, export_sintetico):
+    cache = CacheResultados(tmp_path / 'cache.sqlite')
+    core.run_analysis(export_sintetico, cache=cache, ahora=T)
+    core.run_analysis(export_sintetico, cache=cache, ahora=T)
+
+    firmas_t = core.firmar_filas(core.run_analysis(export_sintetico, ahora=T))
+    nuevo = core.run_analysis(export_sintetico, ahora=SEMANA_DESPUES)
+    cambia_año = _edad_entera(export_sintetico, T) != _edad_entera(export_sintetico, SEMANA_DESPUES)
+    assert cambia_año.any() and not cambia_año.all()
+    # La firma solo cambia en las filas cuya edad en años enteros ha cambiado
+    np.testing.assert_array_equal(core.firmar_filas(nuevo) != firmas_t, cambia_año)
+
+    aciertos, evaluados = cache.aciertos, cache.evaluados
+    semana = core.run_analysis(export_sintetico, cache=cache, ahora=SEMANA_DESPUES)
+    assert cache.evaluados - evaluados == len(np.unique(core.firmar_filas(nuevo)[cambia_año]))
+    assert cache.aciertos > aciertos
+
+    # Score y Label se recalculan con la edad de hoy también en las filas de la caché
+    pd.testing.assert_frame_equal(semana, nuevo)
+
+def test_meses_despues_igual_que_sin_cache(tmp_path):
+    df = generar_export(20000, seed=3)
+    cache = CacheResultados(tmp_path / 'cache.sqlite', ttl=365 * 86400)
+    core.run_analysis(df, cache=cache, ahora=datetime(2026, 1, 5))
+    ahora = datetime(2026, 11, 20)
+    con_cache = core.run_analysis(df, cache=cache, ahora=ahora)
+    assert cache.aciertos > 0
+    sin_cache = core.run_analysis(df, ahora=ahora)
+    pd.testing.assert_frame_equal(con_cache, sin_cache)
+    pd.testing.assert_frame_equal(core.expandir_resultados(con_cache), core.expandir_resultados(sin_cache))
+
+def test_cambio_de_metricas_invalida_la_fila(tmp_path, export_sintetico):
+    cache = CacheResultados(tmp_path / 'cache.sqlite')
+    core.run_analysis(export_sintetico, cache=cache, ahora=T)
+    modificado = export_sintetico.copy()
+    modificado.loc[0, 'Domain Rating'] = (modificado.loc[0, 'Domain Rating'] + 1) % 101
+    evaluadas = cache.evaluados
+    core.run_analysis(modificado, cache=cache, ahora=T)
+    assert cache.evaluados == evaluadas + 1
+    assert cache.aciertos == evaluadas - 1
@@ -0,0 +1,64 @@
+"""CacheAnalisis: resultados completos por contenido del archivo, versión de reglas y día."""
+import io
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from pbn_evaluator import core
+from pbn_evaluator.cache import CacheAnalisis, hash_contenido
+from pbn_evaluator.perfiles import cargar_perfil, usar_perfil
+
+from .conftest import RUTA_PERFIL_ESTRICTO
+
+HOY = date(2026, 3, 1)
+
+@pytest.fixture
+def csv_export(export_sintetico):
+    return export_sintetico.to_csv(index=False).encode('utf-8')
+
+def test_clave(tmp_path, csv_export):
+    cache = CacheAnalisis(tmp_path)
+    ruta = tmp_path / 'export.csv'
+    ruta.write_bytes(csv_export)
+    subido = io.BytesIO(csv_export)
+    clave = cache.clave(subido, HOY)
+    assert subido.tell() == 0  # el archivo queda listo para leerlo
+    assert cache.clave(ruta, HOY) == clave
+    assert cache.clave_de_hash(hash_contenido(ruta), HOY) == clave
+    # Otro contenido, otro día u otras reglas dan otra clave
+    assert cache.clave(io.BytesIO(csv_export + b'\n'), HOY) != clave
+    assert cache.clave(subido, HOY + timedelta(days=1)) != clave
+    with usar_perfil(cargar_perfil(RUTA_PERFIL_ESTRICTO)):
+        assert cache.clave(subido, HOY) != clave
+
+def test_acierto_conserva_el_resultado(tmp_path, export_sintetico):
+    cache = CacheAnalisis(tmp_path)
+    resultado = core.run_analysis(export_sintetico)
+    assert cache.obtener('x' * 32) is None
+    cache.guardar('x' * 32, resultado)
+    assert 'x' * 32 in cache
+    leido = cache.obtener('x' * 32)
+    assert leido.dtypes.equals(resultado.dtypes)
+    assert leido['PBN_Nivel_Riesgo'].cat.categories.equals(resultado['PBN_Nivel_Riesgo'].cat.categories)
+    assert core.expandir_resultados(leido).equals(core.expandir_resultados(resultado.reset_index(drop=True)))
+
+def test_se_borran_las_menos_usadas(tmp_path, export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    cache = CacheAnalisis(tmp_path, max_mb=1)
+    cache.guardar('a', resultado)
+    tamaño = os.path.getsize(tmp_path / 'a.parquet')
+    cache.max_bytes = int(tamaño * 2.5)
+    cache.guardar('b', resultado)
+    # 'a' es más antigua pero se usa después: la menos usada pasa a ser 'b'
+    os.utime(tmp_path / 'a.parquet', (1, 1))
+    os.utime(tmp_path / 'b.parquet', (2, 2))
+    assert cache.obtener('a') is not None
+    cache.guardar('c', resultado)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+
+def test_entrada_dañada(tmp_path):
+    cache = CacheAnalisis(tmp_path)
+    (tmp_path / 'rota.parquet').write_bytes(b'no es parquet')
+    assert cache.obtener('rota') is None
+    assert 'rota' not in cache
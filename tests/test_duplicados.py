@@ -0,0 +1,78 @@
+"""Filas duplicadas: evaluarlas una sola vez da el mismo resultado que evaluarlas todas."""
+import pandas as pd
+import pytest
+
+from pbn_evaluator import cli, core
+
+def _variante(target):
+    """Mismo host escrito de otra forma, sin cambiar la profundidad del path."""
+    for esquema, otro in (('http://', 'https://'), ('https://', 'http://'), ('www.', '')):
+        if target.startswith(esquema):
+            return otro + target.removeprefix(esquema)
+    return 'www.' + target
+
+@pytest.fixture
+def con_duplicados(export_sintetico):
+    """Exportación sintética + las 500 primeras filas con el target reescrito + 200 filas repetidas tal cual."""
+    base = export_sintetico.iloc[:500]
+    return pd.concat(
+        [export_sintetico, base.assign(Target=base['Target'].map(_variante)), export_sintetico.iloc[1000:1200]],
+        ignore_index=True
+    )
+
+class _SinDeduplicar:
+    def __init__(self, evaluar):
+        self.evaluar, self.duplicados = evaluar, 0
+
+    def __call__(self, df_prepared):
+        return self.evaluar(df_prepared)
+
+def _preparar(targets, **metricas):
+    return core.prepare_df_tolerant(pd.DataFrame({'Target': targets, 'Domain Rating': 40, **metricas}))
+
+def test_clave_de_duplicados():
+    claves = core.clave_duplicados(_preparar(['https://www.x.com', 'x.com', 'WWW.X.COM', 'https://x.com/blog/post', 'y.com']))
+    assert claves[0] == claves[1] == claves[2]
+    assert claves[3] != claves[1] and claves[4] != claves[1]
+    # Distintas métricas
+    otra = core.clave_duplicados(_preparar(['x.com'], **{'URL Rating': 12}))
+    assert otra[0] != claves[1]
+    # Estable entre bloques con otros hosts
+    assert core.clave_duplicados(_preparar(['z.com', 'x.com']))[1] == claves[1]
+
+def test_evaluar_una_vez_por_grupo(con_duplicados):
+    df_prepared = core.prepare_df_tolerant(con_duplicados.copy())
+    evaluar = core.EvaluadorSinDuplicados(core._evaluar)
+    obtenido = evaluar(df_prepared)
+    esperado = core._evaluar(df_prepared)
+    pd.testing.assert_frame_equal(obtenido[core.COLUMNAS_EVALUACION], esperado[core.COLUMNAS_EVALUACION])
+    assert evaluar.duplicados == len(df_prepared) - len(set(core.clave_duplicados(df_prepared)))
+    assert evaluar.duplicados >= 700
+
+def test_run_analysis_igual_sin_deduplicar(con_duplicados, monkeypatch):
+    resultado = core.run_analysis(con_duplicados)
+    assert resultado.attrs['duplicados'] >= 700
+    monkeypatch.setattr(core, 'EvaluadorSinDuplicados', _SinDeduplicar)
+    completo = core.run_analysis(con_duplicados)
+    pd.testing.assert_frame_equal(core.expandir_resultados(resultado), core.expandir_resultados(completo))
+
+def test_quitar_duplicados_entre_bloques(con_duplicados):
+    resultado = core.run_analysis(con_duplicados)
+    unicos = core.quitar_duplicados(resultado)
+    assert len(unicos) == len(set(core.clave_duplicados(resultado)))
+    # Por bloques, con las claves ya vistas, queda lo mismo
+    vistas = set()
+    por_bloques = pd.concat([core.quitar_duplicados(resultado.iloc[i:i + 700], vistas) for i in range(0, len(resultado), 700)])
+    pd.testing.assert_frame_equal(por_bloques, unicos)
+    assert core.quitar_duplicados(resultado.iloc[:0]).empty
+
+def test_linea_de_comandos_sin_duplicados(con_duplicados, tmp_path, capsys):
+    entrada = tmp_path / 'entrada.csv'
+    con_duplicados.to_csv(entrada, index=False)
+    for opciones, nombre in [([], 'todas.csv'), (['--sin-duplicados'], 'unicas.csv')]:
+        assert cli.main(['evaluate', str(entrada), '-o', str(tmp_path / nombre), '--chunksize', '1000'] + opciones) == 0
+    todas = pd.read_csv(tmp_path / 'todas.csv')
+    unicas = pd.read_csv(tmp_path / 'unicas.csv')
+    assert len(todas) == len(con_duplicados)
+    assert len(unicas) == len(core.quitar_duplicados(core.run_analysis(con_duplicados)))
+    assert 'filas duplicadas quitadas de la salida' in capsys.readouterr().err
@@ -0,0 +1,62 @@
+"""ExploradorResultados: orden, filtros y paginación frente a pandas sobre el resultado completo."""
+import pandas as pd
+import pytest
+
+from pbn_evaluator import core
+from pbn_evaluator.explorador import ExploradorResultados
+
+@pytest.fixture
+def resultado(export_sintetico):
+    return core.run_analysis(export_sintetico)
+
+def _esperado(resultado, niveles=None, score=None, whitelist=None):
+    df = resultado
+    if niveles is not None:
+        df = df[df['PBN_Nivel_Riesgo'].isin(niveles)]
+    if score is not None:
+        df = df[df['Score'].between(*score)]
+    if whitelist is not None:
+        df = df[df['Es_Marca_Whitelist'] == whitelist]
+    return df.sort_values(['Score', 'PBN_Puntos_Sospecha'], ascending=False, kind='stable')
+
+@pytest.mark.parametrize('filtros', [
+    {},
+    {'score': (40, 70)},
+    {'whitelist': False},
+    {'niveles': [core.NIVELES_RIESGO_PBN[0][0], core.NIVELES_RIESGO_PBN[-1][0]], 'score': (0, 60)},
+])
+def test_paginas_frente_a_pandas(resultado, filtros):
+    explorador = ExploradorResultados(resultado)
+    esperado = _esperado(resultado, **filtros)
+    assert explorador.total(**filtros) == len(esperado)
+    assert explorador.paginas(100, **filtros) == max(1, -(-len(esperado) // 100))
+
+    paginas = [explorador.pagina(n, 100, **filtros) for n in range(explorador.paginas(100, **filtros))]
+    unidas = pd.concat(paginas)
+    assert unidas.index.tolist() == esperado.index.tolist()
+    assert all(len(p) <= 100 for p in paginas)
+    # Cada página trae sus textos, igual que expandir el resultado completo
+    completo = core.expandir_resultados(resultado).loc[unidas.index]
+    assert unidas['Reason'].tolist() == completo['Reason'].tolist()
+    assert unidas['PBN_Alertas'].tolist() == completo['PBN_Alertas'].tolist()
+
+def test_sin_filas(resultado):
+    explorador = ExploradorResultados(resultado)
+    assert explorador.total(score=(101, 200)) == 0
+    assert explorador.paginas(50, score=(101, 200)) == 1
+    assert explorador.pagina(0, 50, score=(101, 200)).empty
+    assert ExploradorResultados(resultado.iloc[:0]).max_puntos == 0
+
+def test_niveles_presentes(resultado):
+    explorador = ExploradorResultados(resultado)
+    presentes = set(resultado['PBN_Nivel_Riesgo'].astype(str))
+    assert set(explorador.niveles_riesgo()) == presentes
+    # En el orden de las categorías (gravedad), no alfabético
+    categorias = list(resultado['PBN_Nivel_Riesgo'].cat.categories)
+    assert explorador.niveles_riesgo() == [c for c in categorias if c in presentes]
+
+def test_el_ultimo_filtro_se_reutiliza(resultado):
+    explorador = ExploradorResultados(resultado)
+    primera = explorador.filtrar(score=(50, 100))
+    assert explorador.filtrar(score=[50, 100]) is primera
+    assert explorador.filtrar() is explorador.filtrar()
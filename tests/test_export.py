@@ -0,0 +1,109 @@
+"""Descargas: el contenido exportado por bloques coincide con el resultado expandido."""
+import io
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from pbn_evaluator import core, export
+
+@pytest.fixture
+def resultado(export_sintetico):
+    return core.run_analysis(export_sintetico)
+
+@pytest.fixture
+def esperado(resultado):
+    return core.expandir_resultados(resultado).rename(columns=export.COLUMNAS_EXPORTACION)
+
+@pytest.fixture(autouse=True)
+def bloques_pequeños(monkeypatch):
+    # Varios bloques por descarga: la cabecera se escribe una sola vez
+    monkeypatch.setattr(export, 'FILAS_BLOQUE_EXPORTACION', 700)
+
+def test_csv(resultado, esperado):
+    leido = pd.read_csv(io.BytesIO(export.convert_df_to_csv(resultado)), keep_default_na=False)
+    assert list(leido.columns) == list(esperado.columns)
+    assert len(leido) == len(esperado)
+    for col in ['Dominio', 'Trust Score - Factores', 'PBN - Alertas', 'PBN - Nivel de Riesgo']:
+        assert leido[col].astype(str).tolist() == esperado[col].astype(str).tolist()
+    assert leido['Trust Score (0-100)'].tolist() == esperado['Trust Score (0-100)'].tolist()
+
+def test_excel(resultado, esperado):
+    leido = pd.read_excel(io.BytesIO(export.convert_df_to_excel(resultado)), sheet_name=export.NOMBRE_HOJA_EXCEL)
+    assert list(leido.columns) == list(esperado.columns)
+    assert len(leido) == len(esperado)
+    assert leido['Dominio'].tolist() == esperado['Dominio'].tolist()
+    assert leido['Trust Score (0-100)'].tolist() == esperado['Trust Score (0-100)'].tolist()
+    assert leido['Trust Score - Factores'].tolist() == esperado['Trust Score - Factores'].tolist()
+    # Los nulos se escriben como celdas vacías
+    alertas = esperado['PBN - Alertas'].where(esperado['PBN - Alertas'] != '')
+    assert leido['PBN - Alertas'].isna().tolist() == alertas.isna().tolist()
+
+def test_resultado_vacio(resultado):
+    leido = pd.read_csv(io.BytesIO(export.convert_df_to_csv(resultado.iloc[:0])))
+    assert len(leido) == 0
+    assert list(leido.columns) == [export.COLUMNAS_EXPORTACION[c] for c in core.COLUMNAS_RESULTADO]
+
+def test_el_temporal_se_borra_si_falla(monkeypatch, tmp_path):
+    monkeypatch.setattr(export.tempfile, 'tempdir', str(tmp_path))
+    def fallar(df, destino):
+        raise RuntimeError('fallo al exportar')
+    monkeypatch.setitem(export._EXPORTADORES, 'csv', fallar)
+    with pytest.raises(RuntimeError):
+        export.exportar_a_temporal(pd.DataFrame(), 'csv')
+    assert not list(tmp_path.iterdir())
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow'])
+def test_parquet_y_arrow(resultado, esperado, formato):
+    ruta = export.exportar_a_temporal(resultado, formato)
+    try:
+        if formato == 'parquet':
+            leido = pd.read_parquet(ruta)
+        else:
+            with pa.memory_map(ruta) as fuente:
+                leido = pa.ipc.open_file(fuente).read_all().to_pandas()
+    finally:
+        os.remove(ruta)
+    assert list(leido.columns) == list(esperado.columns)
+    assert leido['Dominio'].tolist() == esperado['Dominio'].tolist()
+    assert leido['Trust Score - Factores'].tolist() == esperado['Trust Score - Factores'].tolist()
+    assert leido['Domain Rating'].dtype == 'float64'
+
+def test_descargas_por_ejecucion(resultado):
+    descargas = export.ExportacionesPorEjecucion(max_archivos=2)
+    ruta = descargas.ruta('a', 'csv', resultado)
+    assert descargas.ruta('a', 'csv', None) == ruta  # no se vuelve a exportar
+    descargas.ruta('b', 'csv', resultado)
+    descargas.ruta('c', 'csv', resultado)
+    assert not os.path.exists(ruta)  # la más antigua se borra
+    assert descargas.leer('a', 'csv', resultado) == export.convert_df_to_csv(resultado)
+
+def test_una_exportacion_lenta_no_bloquea_otras(monkeypatch, resultado):
+    empezada, terminar = threading.Event(), threading.Event()
+    exportar = export.exportar_a_temporal
+
+    def exportar_a_temporal(df, formato):
+        if formato == 'xlsx':
+            empezada.set()
+            assert terminar.wait(10)
+        return exportar(df, formato)
+    monkeypatch.setattr(export, 'exportar_a_temporal', exportar_a_temporal)
+
+    descargas = export.ExportacionesPorEjecucion()
+    df = resultado.iloc[:10]
+    lenta = threading.Thread(target=descargas.ruta, args=('sesion-1', 'xlsx', df))
+    # Otra ejecución (y otro formato de la misma) se sirven mientras tanto
+    rapidas = threading.Thread(target=lambda: [descargas.ruta(r, 'csv', df) for r in ('sesion-2', 'sesion-1')])
+    lenta.start()
+    try:
+        assert empezada.wait(10)
+        rapidas.start()
+        rapidas.join(10)
+        assert not rapidas.is_alive()
+    finally:
+        terminar.set()
+        lenta.join()
+    assert os.path.exists(descargas.ruta('sesion-2', 'csv', None))
+    assert os.path.exists(descargas.ruta('sesion-1', 'xlsx', None))
@@ -0,0 +1,61 @@
+"""Detección de encoding, separador y separador decimal de un CSV antes de leerlo."""
+import pytest
+
+from pbn_evaluator import core
+
+COLUMNAS_TEXTO_NUMERICO = ['Organic / Traffic', 'Ref. domains / All', 'Backlinks / All', 'Organic / Total Keywords']
+
+@pytest.fixture
+def export_europeo(export_sintetico):
+    """Exportación con separador de miles '.', decimales con ',' y un target no ASCII."""
+    df = export_sintetico.iloc[:500].copy()
+    for col in COLUMNAS_TEXTO_NUMERICO:
+        df[col] = df[col].str.replace(',', '.')
+    df['Domain Rating'] = df['Domain Rating'] + 0.25
+    df.loc[df.index[0], 'Target'] = 'peñasco-diseño.es'
+    return df
+
+def _escribir(df, ruta, sep, decimal, encoding):
+    ruta.write_bytes(df.to_csv(index=False, sep=sep, decimal=decimal).encode(encoding))
+
+@pytest.mark.parametrize('encoding, detectado', [
+    ('utf-8', 'utf-8'), ('utf-8-sig', 'utf-8-sig'), ('utf-16', 'utf-16'),
+    ('utf-16-le', 'utf-16-le'), ('latin1', 'latin1'), ('cp1252', 'latin1'),
+])
+@pytest.mark.parametrize('sep', [';', '\t', '|'])
+def test_formato_europeo(tmp_path, export_europeo, encoding, detectado, sep):
+    ruta = tmp_path / 'export.csv'
+    _escribir(export_europeo, ruta, sep, ',', encoding)
+    assert core.detectar_formato_csv(ruta) == {'encoding': detectado, 'sep': sep, 'decimal': ',', 'thousands': '.'}
+
+    df = core.leer_archivo(ruta)
+    assert df['Target'].iloc[0] == 'peñasco-diseño.es'
+    assert df['Domain Rating'].tolist() == export_europeo['Domain Rating'].tolist()
+    assert df['Organic / Traffic'].notna().sum() == export_europeo['Organic / Traffic'].str.fullmatch(r'[\d.]+').sum()
+
+@pytest.mark.parametrize('sep', [',', ';', '\t', '|'])
+def test_punto_decimal(tmp_path, export_sintetico, sep):
+    ruta = tmp_path / 'export.csv'
+    _escribir(export_sintetico.assign(**{'Domain Rating': export_sintetico['Domain Rating'] + 0.5}), ruta, sep, '.', 'utf-8')
+    assert core.detectar_formato_csv(ruta) == {'encoding': 'utf-8', 'sep': sep, 'decimal': '.'}
+    resultado = core.run_analysis(core.leer_archivo(ruta))
+    assert (resultado['dr'] % 1 == 0.5).all()
+
+def test_latin1_mas_alla_de_la_muestra(tmp_path, export_sintetico, monkeypatch):
+    # La muestra es UTF-8 válido; el byte latin1 aparece después: se relee como latin1
+    monkeypatch.setattr(core, 'MUESTRA_DETECCION_CSV', 1024)
+    df = export_sintetico.copy()
+    df.loc[df.index[-1], 'Target'] = 'año.es'
+    ruta = tmp_path / 'export.csv'
+    _escribir(df, ruta, ',', '.', 'latin1')
+    assert core.detectar_formato_csv(ruta)['encoding'] == 'utf-8'
+    assert core.leer_archivo(ruta)['Target'].iloc[-1] == 'año.es'
+    bloques = list(core.leer_archivo_en_chunks(ruta, chunksize=10 ** 6))
+    assert bloques[0]['Target'].iloc[-1] == 'año.es'
+
+def test_archivo_abierto_en_modo_texto(tmp_path, export_europeo):
+    ruta = tmp_path / 'export.csv'
+    _escribir(export_europeo, ruta, ';', ',', 'utf-8')
+    with open(ruta, encoding='utf-8') as f:
+        assert core.detectar_formato_csv(f)['sep'] == ';'
+        assert f.tell() == 0  # la detección deja el archivo al principio
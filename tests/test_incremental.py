@@ -0,0 +1,58 @@
+"""Modo incremental: una exportación sin cambios no produce filas modificadas días después."""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from pbn_evaluator import core
+from pbn_evaluator.incremental import (
+    ESTADO_EDAD, ESTADO_ELIMINADO, ESTADO_MODIFICADO, ESTADO_NUEVO, guardar_snapshot, run_analysis_incremental
+)
+
+T = datetime(2026, 3, 1)
+
+def test_reejecucion_semanal_sin_cambios(tmp_path, export_sintetico):
+    ruta = tmp_path / 'snapshot.parquet'
+    guardar_snapshot(core.run_analysis(export_sintetico, ahora=T), ruta)
+
+    salida = run_analysis_incremental(export_sintetico, ruta, ahora=T + timedelta(days=7))
+    resumen = salida['resumen']
+    assert resumen['evaluados'] == 0
+    assert resumen[ESTADO_MODIFICADO] == resumen[ESTADO_NUEVO] == resumen[ESTADO_ELIMINADO] == 0
+    assert resumen['cambios_riesgo'] == 0
+
+def test_meses_despues_igual_que_desde_cero(tmp_path, export_sintetico):
+    df = export_sintetico.drop_duplicates('Target')
+    ruta = tmp_path / 'snapshot.parquet'
+    previo = core.run_analysis(df, ahora=T)
+    guardar_snapshot(previo, ruta)
+    ahora = T + timedelta(days=250)
+
+    salida = run_analysis_incremental(df, ruta, ahora=ahora)
+    assert salida['resumen']['reutilizados'] > 0
+    completo = core.run_analysis(df, ahora=ahora)
+    pd.testing.assert_frame_equal(salida['resultado'], completo)
+
+    # Todos los cambios de Score aparecen en el informe, también los debidos solo a la edad
+    cambios = salida['cambios'].set_index('target')
+    distinto = previo['Score'].to_numpy() != completo['Score'].to_numpy()
+    assert set(completo['target'][distinto]) <= set(cambios.index)
+    por_edad = cambios[cambios['Estado'] == ESTADO_EDAD]
+    assert len(por_edad) == salida['resumen'][ESTADO_EDAD] > 0
+    assert (por_edad['Delta_Score'] != 0).all() and not por_edad['Cambio_Riesgo'].any()
+
+def test_detecta_filas_nuevas_modificadas_y_eliminadas(export_sintetico):
+    previo = core.run_analysis(export_sintetico, ahora=T)
+    nuevo = export_sintetico.drop(index=[1]).copy()
+    nuevo.loc[0, 'Domain Rating'] = (nuevo.loc[0, 'Domain Rating'] + 50) % 101
+    nuevo.loc[len(export_sintetico)] = export_sintetico.iloc[2].copy()
+    nuevo.loc[len(export_sintetico), 'Target'] = 'dominio-nuevo-de-prueba.com'
+
+    salida = run_analysis_incremental(nuevo, previo, ahora=T + timedelta(days=7))
+    cambios = salida['cambios'].set_index('target')
+    assert cambios.loc[previo['target'].iloc[0], 'Estado'] == ESTADO_MODIFICADO
+    assert cambios.loc[previo['target'].iloc[1], 'Estado'] == ESTADO_ELIMINADO
+    assert cambios.loc['dominio-nuevo-de-prueba.com', 'Estado'] == ESTADO_NUEVO
+    # El resultado coincide con evaluar la exportación completa desde cero
+    completo = core.run_analysis(nuevo, ahora=T + timedelta(days=7))
+    columnas = ['Score', 'Label'] + core.COLUMNAS_REUTILIZABLES
+    pd.testing.assert_frame_equal(salida['resultado'][columnas], completo[columnas])
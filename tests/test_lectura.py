@@ -0,0 +1,68 @@
+"""Lectura de CSV y XLSX: solo las columnas del mapeo, completa o por bloques."""
+import io
+
+import pandas as pd
+import pytest
+
+from pbn_evaluator import core
+
+@pytest.fixture
+def export_con_extras(export_sintetico):
+    # Columnas que el análisis no usa, al principio y al final
+    return export_sintetico.assign(**{'Notas': 'x', 'Keywords / Top 3': 1}).iloc[:, [13] + list(range(13)) + [14]]
+
+@pytest.fixture
+def ruta_csv(tmp_path, export_con_extras):
+    ruta = tmp_path / 'export.csv'
+    export_con_extras.to_csv(ruta, index=False)
+    return ruta
+
+@pytest.fixture
+def ruta_xlsx(tmp_path, export_con_extras):
+    ruta = tmp_path / 'export.xlsx'
+    export_con_extras.to_excel(ruta, index=False)
+    return ruta
+
+def _comparar_evaluacion(df_leido, df_original):
+    leido, original = core.run_analysis(df_leido), core.run_analysis(df_original)
+    for col in ['target', 'domain_age'] + core.COLUMNAS_EVALUACION:
+        assert leido[col].tolist() == original[col].tolist(), col
+
+@pytest.mark.parametrize('ruta', ['ruta_csv', 'ruta_xlsx'])
+def test_cabecera(ruta, request, export_con_extras):
+    assert core.leer_cabecera(request.getfixturevalue(ruta)) == list(export_con_extras.columns)
+
+@pytest.mark.parametrize('ruta', ['ruta_csv', 'ruta_xlsx'])
+def test_solo_columnas_mapeadas(ruta, request, export_sintetico):
+    df = core.leer_archivo(request.getfixturevalue(ruta))
+    assert list(df.columns) == list(export_sintetico.columns)
+    completo = core.leer_archivo(request.getfixturevalue(ruta), solo_mapeadas=False)
+    assert {'Notas', 'Keywords / Top 3'} <= set(completo.columns)
+    _comparar_evaluacion(df, export_sintetico)
+
+@pytest.mark.parametrize('ruta', ['ruta_csv', 'ruta_xlsx'])
+def test_por_bloques(ruta, request):
+    ruta = request.getfixturevalue(ruta)
+    bloques = list(core.leer_archivo_en_chunks(ruta, chunksize=300))
+    assert [len(b) for b in bloques[:-1]] == [300] * (len(bloques) - 1)
+    unido = pd.concat(bloques)
+    assert unido.index.equals(pd.RangeIndex(len(unido)))
+    pd.testing.assert_frame_equal(unido.astype(str), core.leer_archivo(ruta).astype(str))
+
+def test_xlsx_subido(ruta_xlsx, export_sintetico):
+    # Como el archivo subido en la interfaz: objeto en memoria con nombre
+    subido = io.BytesIO(ruta_xlsx.read_bytes())
+    subido.name = 'Export Ahrefs.XLSX'
+    _comparar_evaluacion(core.leer_archivo(subido), export_sintetico)
+
+def test_target_y_fecha_se_leen_como_texto(tmp_path):
+    ruta = tmp_path / 'numeros.csv'
+    pd.DataFrame({'Target': ['123', '007.com'], 'Creation Date': ['2001', '2010-01-01'], 'DR': [1, 2]}).to_csv(ruta, index=False)
+    df = core.leer_archivo(ruta)
+    assert df['Target'].tolist() == ['123', '007.com']
+    assert df['Creation Date'].tolist() == ['2001', '2010-01-01']
+
+def test_analisis_desde_ruta_por_bloques(ruta_csv, export_sintetico):
+    por_bloques = pd.concat(list(core.run_analysis_stream(ruta_csv, chunksize=700)), ignore_index=True)
+    original = core.run_analysis(export_sintetico)
+    assert por_bloques[core.COLUMNAS_EVALUACION].equals(original[core.COLUMNAS_EVALUACION])
@@ -0,0 +1,53 @@
+"""Perfiles de mapeo de columnas: LRU acotado, persistencia y acceso desde varios hilos."""
+import json
+import threading
+
+import pytest
+
+from pbn_evaluator import core
+
+@pytest.fixture
+def perfiles(tmp_path, monkeypatch):
+    ruta = tmp_path / 'perfiles_columnas.json'
+    monkeypatch.setattr(core, 'RUTA_PERFILES_COLUMNAS', str(ruta))
+    monkeypatch.setattr(core, 'MAX_PERFILES_COLUMNAS', 3)
+    monkeypatch.setattr(core, '_PERFILES_COLUMNAS', None)
+    return ruta
+
+def _cabecera(i):
+    return ['Target', 'Domain Rating', f'Extra {i}']
+
+def test_se_conservan_los_usados_recientemente(perfiles):
+    for i in range(3):
+        core.resolver_mapeo(_cabecera(i))
+    core.resolver_mapeo(_cabecera(0))  # Acierto: pasa a ser el más reciente
+    core.resolver_mapeo(_cabecera(3))
+    firmas = [core.firma_cabecera(_cabecera(i)) for i in range(4)]
+    assert list(core._PERFILES_COLUMNAS) == [firmas[2], firmas[0], firmas[3]]
+    assert list(json.loads(perfiles.read_text(encoding='utf-8'))) == [firmas[2], firmas[0], firmas[3]]
+
+def test_se_cargan_del_archivo(perfiles):
+    perfil = core.resolver_mapeo(_cabecera(0))
+    core._PERFILES_COLUMNAS = None
+    assert core.resolver_mapeo(_cabecera(0)) == perfil
+    assert perfil['columnas']['dr'] == 'Domain Rating'
+
+def test_varios_hilos(perfiles, monkeypatch):
+    monkeypatch.setattr(core, 'MAX_PERFILES_COLUMNAS', 20)
+    errores = []
+
+    def resolver(inicio):
+        try:
+            for i in range(inicio, inicio + 50):
+                assert core.resolver_mapeo(_cabecera(i % 40))['columnas']['target'] == 'Target'
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=resolver, args=(k * 7,)) for k in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert not errores
+    assert len(core._PERFILES_COLUMNAS) == 20
+    assert list(json.loads(perfiles.read_text(encoding='utf-8'))) == list(core._PERFILES_COLUMNAS)
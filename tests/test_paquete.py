@@ -0,0 +1,32 @@
+"""Importación diferida del paquete y de la línea de comandos."""
+import subprocess
+import sys
+
+import pbn_evaluator
+
+from .conftest import RAIZ
+
+_PESADOS = ['pandas', 'numpy', 'pyarrow', 'sqlite3', 'http.server', 'pbn_evaluator.core']
+
+def _modulos_cargados(codigo):
+    salida = subprocess.run(
+        [sys.executable, '-c', f"{codigo}\nimport sys; print(' '.join(sorted(sys.modules)))"],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    return set(salida.stdout.split())
+
+def test_importar_el_paquete_no_carga_dependencias():
+    assert not _modulos_cargados('import pbn_evaluator') & set(_PESADOS)
+
+def test_ayuda_de_la_linea_de_comandos_no_carga_dependencias():
+    codigo = (
+        "import sys; sys.argv = ['pbn_evaluator', 'evaluate', '--help']\n"
+        "import runpy\n"
+        "try:\n    runpy.run_module('pbn_evaluator', run_name='__main__')\n"
+        "except SystemExit:\n    pass"
+    )
+    assert not _modulos_cargados(codigo) & set(_PESADOS)
+
+def test_todos_los_nombres_publicos_se_resuelven():
+    for nombre in pbn_evaluator.__all__:
+        assert getattr(pbn_evaluator, nombre) is not None
@@ -0,0 +1,36 @@
+"""Evaluación en varios procesos frente a la evaluación en el proceso principal."""
+import pytest
+
+from benchmarks.datos_sinteticos import generar_export
+from pbn_evaluator import core, paralelo
+from pbn_evaluator.perfiles import cargar_perfil, usar_perfil
+
+from .conftest import RUTA_PERFIL_ESTRICTO
+
+@pytest.fixture(autouse=True)
+def shards_pequeños(monkeypatch):
+    # Shards de 500 filas para repartir también las exportaciones de prueba
+    monkeypatch.setattr(paralelo, 'MIN_FILAS_SHARD', 500)
+
+def test_evaluador_paralelo_igual_que_evaluar():
+    df = core.prepare_df_tolerant(generar_export(3000, 4))
+    with paralelo.EvaluadorParalelo(3) as evaluar:
+        resultado = evaluar(df)
+        assert evaluar._pool is not None  # se ha repartido de verdad
+    esperado = core._evaluar(df)
+    assert resultado.index.equals(esperado.index)
+    assert resultado.equals(esperado)
+
+def test_run_analysis_con_workers(export_sintetico):
+    serie = core.run_analysis(export_sintetico, workers=1)
+    paralela = core.run_analysis(export_sintetico, workers=2)
+    assert paralela.equals(serie)
+
+def test_los_workers_usan_el_perfil_vigente():
+    df = core.prepare_df_tolerant(generar_export(2000, 9))
+    with usar_perfil(cargar_perfil(RUTA_PERFIL_ESTRICTO)):
+        esperado = core._evaluar(df)
+        with paralelo.EvaluadorParalelo(2) as evaluar:
+            resultado = evaluar(df)
+    assert resultado.equals(esperado)
+    assert not resultado['Score'].equals(core._evaluar(df)['Score'])
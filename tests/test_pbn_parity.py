@@ -0,0 +1,40 @@
+"""detectar_pbn_batch + construir_textos_pbn frente a detectar_pbn fila a fila."""
+import pandas as pd
+import pytest
+
+from benchmarks.datos_sinteticos import generar_export
+from pbn_evaluator import core
+from pbn_evaluator.perfiles import cargar_perfil, usar_perfil
+
+from .conftest import RUTA_PERFIL_ESTRICTO
+
+def _comparar(df_prepared):
+    batch = core.detectar_pbn_batch(df_prepared)
+    textos = core.construir_textos_pbn(
+        df_prepared.assign(PBN_Reglas=batch['reglas'].to_numpy(), Es_Marca_Whitelist=False)
+    )
+    esperado = [core.detectar_pbn(fila) for fila in df_prepared.to_dict('records')]
+    assert batch['puntos_sospecha'].tolist() == [e['puntos_sospecha'] for e in esperado]
+    assert batch['nivel_riesgo'].tolist() == [e['nivel_riesgo'] for e in esperado]
+    assert textos['PBN_Alertas'].tolist() == ["\n".join(e['alertas']) for e in esperado]
+    assert textos['PBN_Recomendaciones'].tolist() == ["\n".join(e['recomendaciones']) for e in esperado]
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_exportacion_aleatoria(seed):
+    # Los targets sintéticos incluyen rutas, subdominios de EXCEPT_DOMAINS y tokens de PATRONES_PBN
+    _comparar(core.prepare_df_tolerant(generar_export(3000, seed)))
+
+def test_perfil_de_reglas_no_por_defecto():
+    with usar_perfil(cargar_perfil(RUTA_PERFIL_ESTRICTO)):
+        _comparar(core.prepare_df_tolerant(generar_export(2000, 5)))
+
+@pytest.mark.parametrize('target, con_patron', [
+    ('bestdeals.com', True),
+    ('https://www.mynewsdaily.net/', True),
+    ('ejemplo.com/blog/best-of', False),  # los tokens se buscan en el host, no en la ruta
+    ('https://ejemplo.com/top', False),
+])
+def test_patron_se_busca_en_el_host(target, con_patron):
+    df = core.prepare_df_tolerant(pd.DataFrame({'Target': [target], 'Domain Rating': [60], 'Brand Anchors': [0]}))
+    reglas = int(core.detectar_pbn_batch(df)['reglas'].iloc[0])
+    assert bool(reglas & core.PBN_BIT['patron_pbn']) is con_patron
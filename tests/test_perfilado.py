@@ -0,0 +1,59 @@
+"""Medición por etapas (perfilado.Perfil) y comparación con la línea base de benchmarks."""
+import io
+import json
+
+from benchmarks import suite
+from pbn_evaluator import cli, core, perfilado
+from pbn_evaluator.perfilado import Perfil
+
+def test_sin_perfil_activo_no_se_mide_nada():
+    assert perfilado.activo() is None
+    with perfilado.etapa('preparar', 10) as medida:
+        pass
+    assert medida is perfilado._ETAPA_NULA
+
+def test_etapas_de_run_analysis(export_sintetico):
+    with Perfil() as perfil:
+        core.run_analysis(export_sintetico, workers=1)
+    resumen = perfil.resumen().set_index('etapa')
+    for nombre in ['preparar', 'firmar', 'evaluar', 'compactar']:
+        assert resumen.loc[nombre, 'nivel'] == 0
+        assert resumen.loc[nombre, 'filas'] == len(export_sintetico)
+    # Deduplicación, score, PBN y whitelist se anidan dentro de 'evaluar'
+    for nombre in ['deduplicar', 'score', 'pbn', 'whitelist']:
+        assert resumen.loc[nombre, 'nivel'] == 1
+    assert resumen['segundos'].ge(0).all()
+    assert resumen['pico_mb'].isna().all()
+    assert 'evaluar' in perfil.tabla()
+
+def test_modo_memoria(export_sintetico):
+    with perfilado.crear_perfil('memoria') as perfil:
+        core.run_analysis(export_sintetico.iloc[:200], workers=1)
+    assert perfil.resumen()['pico_mb'].notna().all()
+    assert perfilado.crear_perfil('') is None
+
+def test_jsonl(export_sintetico):
+    with Perfil() as perfil:
+        core.expandir_resultados(core.run_analysis(export_sintetico.iloc[:50]))
+    salida = io.StringIO()
+    perfil.escribir_jsonl(salida, origen='prueba')
+    lineas = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+    assert {linea['perfil'] for linea in lineas} == {perfil.id}
+    assert {linea['origen'] for linea in lineas} == {'prueba'}
+    assert 'textos' in {linea['etapa'] for linea in lineas}
+
+def test_linea_de_comandos(tmp_path, export_sintetico):
+    entrada, log = tmp_path / 'export.csv', tmp_path / 'tiempos.jsonl'
+    export_sintetico.to_csv(entrada, index=False)
+    assert cli.main(['evaluate', str(entrada), '-o', str(tmp_path / 'salida.csv'), '--perfil-jsonl', str(log)]) == 0
+    etapas = {json.loads(linea)['etapa'] for linea in log.read_text(encoding='utf-8').splitlines()}
+    assert {'leer', 'preparar', 'evaluar', 'escribir_csv'} <= etapas
+
+def test_comparar_con_la_linea_base():
+    base = {'evaluar': {'segundos': 1.0, 'pico_mb': 100.0}, 'leer': {'segundos': 0.01, 'pico_mb': 1.0}}
+    actual = {
+        'evaluar': {'segundos': 1.5, 'pico_mb': 101.0},  # +50 % de tiempo; memoria dentro del umbral
+        'leer': {'segundos': 0.03, 'pico_mb': 3.0},      # x3, pero por debajo de los mínimos de ruido
+        'nueva': {'segundos': 9.0, 'pico_mb': None},     # sin referencia
+    }
+    assert suite.comparar(actual, base, 0.25) == [('evaluar', 'segundos', 1.5, 1.0)]
@@ -0,0 +1,87 @@
+"""Perfiles de reglas: validación, perfil vigente por contexto y reevaluación al cambiar de perfil."""
+import json
+import threading
+
+import pytest
+
+from pbn_evaluator import cli, core
+from pbn_evaluator.perfiles import (
+    PERFIL_POR_DEFECTO, cargar_perfil, compilar_perfil, derivar_perfil, perfil_reglas, usar_perfil
+)
+
+from .conftest import RUTA_PERFIL_ESTRICTO
+
+@pytest.mark.parametrize('cambios, mensaje', [
+    ({'score': {'desconocida': 1}}, "Clave desconocida en el perfil: 'score.desconocida'"),
+    ({'score': 5}, "'score' debe ser un objeto JSON"),
+    ({'nombre': ' '}, "'nombre' debe ser un texto no vacío"),
+    ({'score': {'dr_minimo': 150}}, "'score.dr_minimo'"),
+    ({'score': {'pesos': {'dr_quality': 0.5}}}, 'deben sumar 1'),
+    ({'score': {'pesos': {'dr_quality': -0.1, 'traffic_authority': 0.7}}}, 'no negativos'),
+    ({'score': {'umbral_excelente': 40}}, "'score.umbral_aceptable' <= 'score.umbral_excelente'"),
+    ({'pbn': {'diversidad_ips': {'umbral': 'bajo'}}}, "'pbn.diversidad_ips.umbral'"),
+    ({'pbn': {'densidad_backlinks': {'tramos': [[1000, 12], [2000, 15]]}}}, 'de mayor a menor'),
+    ({'pbn': {'densidad_backlinks': {'tramos': [[1000]]}}}, 'pares [límite, umbral]'),
+    ({'pbn': {'niveles_riesgo': {'bajo': 6}}}, 'alto > moderado > bajo'),
+    ({'pbn': {'puntos': {'patron_pbn': 1.5}}}, "'pbn.puntos' deben ser enteros"),
+    ({'pbn': {'reducciones': {'senales_multiples': -1}}}, 'no pueden ser negativos'),
+    ({'pbn': {'puntos_dr_no_aceptable': True}}, "'pbn.puntos_dr_no_aceptable'"),
+])
+def test_perfil_no_valido(cambios, mensaje):
+    with pytest.raises(ValueError, match=mensaje.replace('[', r'\[').replace(']', r'\]')):
+        compilar_perfil({**cambios, 'nombre': cambios.get('nombre', 'prueba')})
+
+def test_cargar_perfil(tmp_path):
+    perfil = cargar_perfil(RUTA_PERFIL_ESTRICTO)
+    assert perfil.nombre == 'Estricto'
+    assert perfil.datos['score']['pesos'] == PERFIL_POR_DEFECTO['score']['pesos']  # completado con el por defecto
+
+    sin_nombre = tmp_path / 'mi_perfil.json'
+    sin_nombre.write_text(json.dumps({'score': {'dr_minimo': 20}}), encoding='utf-8')
+    assert cargar_perfil(sin_nombre).nombre == 'mi_perfil'
+
+    roto = tmp_path / 'roto.json'
+    roto.write_text('{"score": ', encoding='utf-8')
+    with pytest.raises(ValueError, match='roto.json no es JSON válido'):
+        cargar_perfil(roto)
+
+def test_compilacion_reutilizada():
+    assert compilar_perfil(PERFIL_POR_DEFECTO) is compilar_perfil(json.loads(json.dumps(PERFIL_POR_DEFECTO)))
+    derivado = derivar_perfil(PERFIL_POR_DEFECTO, {'score': {'dr_minimo': 35}})
+    assert derivado.dr_minimo == 35
+    assert derivado is derivar_perfil(PERFIL_POR_DEFECTO, {'score': {'dr_minimo': 35}})
+
+def test_perfil_por_contexto():
+    version = core.version_reglas()
+    vistos = []
+    with usar_perfil(cargar_perfil(RUTA_PERFIL_ESTRICTO)):
+        assert core.version_reglas() != version
+        hilo = threading.Thread(target=lambda: vistos.append(perfil_reglas().nombre))
+        hilo.start()
+        hilo.join()
+    assert vistos == [PERFIL_POR_DEFECTO['nombre']]  # otro hilo (otra sesión) no lo ve
+    assert core.version_reglas() == version
+
+def test_reevaluar_al_cambiar_de_perfil(export_sintetico):
+    por_defecto = core.run_analysis(export_sintetico)
+    estricto = cargar_perfil(RUTA_PERFIL_ESTRICTO)
+    with usar_perfil(estricto):
+        esperado = core.run_analysis(export_sintetico)
+        reevaluado = core.reevaluar(por_defecto)
+        textos = core.expandir_resultados(reevaluado)
+        textos_esperados = core.expandir_resultados(esperado)
+    assert not esperado['Score'].equals(por_defecto['Score'])
+    assert reevaluado.equals(esperado)
+    assert textos.equals(textos_esperados)
+    # Volver al perfil por defecto recupera el resultado original
+    assert core.reevaluar(reevaluado).equals(por_defecto)
+
+def test_linea_de_comandos_rechaza_un_perfil_no_valido(tmp_path, export_sintetico, capsys):
+    perfil = tmp_path / 'malo.json'
+    perfil.write_text(json.dumps({'score': {'umbral_excelente': 10}}), encoding='utf-8')
+    entrada = tmp_path / 'export.csv'
+    export_sintetico.iloc[:10].to_csv(entrada, index=False)
+    codigo = cli.main(['evaluate', str(entrada), '-o', str(tmp_path / 'salida.csv'), '--reglas', str(perfil)])
+    assert codigo == 2
+    assert 'Perfil de reglas no válido' in capsys.readouterr().err
+    assert not (tmp_path / 'salida.csv').exists()
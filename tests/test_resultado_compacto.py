@@ -0,0 +1,39 @@
+"""Resultado compacto de run_analysis: tipos, memoria y textos generados bajo demanda."""
+import numpy as np
+import pandas as pd
+
+from pbn_evaluator import core
+
+def test_tipos_y_columnas(export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    assert resultado['PBN_Reglas'].dtype == 'uint32'
+    assert resultado['Score'].dtype == resultado['PBN_Puntos_Sospecha'].dtype == 'int16'
+    for col in ['Label', 'PBN_Nivel_Riesgo', 'PBN_Patron']:
+        assert isinstance(resultado[col].dtype, pd.CategoricalDtype)
+    # Ni textos, ni firma, ni ratios derivados
+    internas = core.COLUMNAS_TEXTO_DIFERIDO + core.COLUMNAS_RATIOS + ['Firma']
+    assert not set(internas) & set(resultado.columns)
+
+def test_memoria_frente_al_resultado_con_textos(export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    expandido = core.expandir_resultados(resultado)
+    assert expandido.memory_usage(deep=True).sum() > 5 * resultado.memory_usage(deep=True).sum()
+
+def test_textos_iguales_que_desde_el_dataframe_preparado(export_sintetico):
+    preparado = core.prepare_df_tolerant(export_sintetico.copy())
+    esperado = core.expandir_resultados(preparado.assign(**core._evaluar(preparado)))
+    obtenido = core.expandir_resultados(core.run_analysis(export_sintetico))
+    for col in core.COLUMNAS_RESULTADO:
+        assert obtenido[col].astype(object).tolist() == esperado[col].astype(object).tolist(), col
+
+def test_ratios_identicos_a_los_de_la_preparacion(export_sintetico):
+    preparado = core.prepare_df_tolerant(export_sintetico.copy())
+    completado = core.completar_ratios(core.run_analysis(export_sintetico))
+    for col in core.COLUMNAS_RATIOS:
+        np.testing.assert_array_equal(completado[col].to_numpy(), preparado[col].to_numpy())
+
+def test_firma_de_un_resultado(export_sintetico):
+    # El resultado conserva todas las entradas de la firma
+    preparado = core.prepare_df_tolerant(export_sintetico.copy())
+    resultado = core.run_analysis(export_sintetico)
+    np.testing.assert_array_equal(core.firmar_filas(resultado), core.firmar_filas(preparado))
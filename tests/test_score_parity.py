@@ -0,0 +1,47 @@
+"""simulate_score_batch + construir_reason frente a simulate_score fila a fila."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.datos_sinteticos import generar_export
+from pbn_evaluator import core
+from pbn_evaluator.perfiles import cargar_perfil, usar_perfil
+
+from .conftest import RUTA_PERFIL_ESTRICTO
+
+def _comparar(df_prepared):
+    batch = core.simulate_score_batch(df_prepared)
+    reason = core.construir_reason(df_prepared)
+    esperado = [core.simulate_score(fila) for fila in df_prepared.to_dict('records')]
+    assert batch['Score'].tolist() == [score for score, _, _ in esperado]
+    assert batch['Label'].tolist() == [label for _, label, _ in esperado]
+    assert reason.tolist() == [texto for _, _, texto in esperado]
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3, 4])
+def test_exportacion_aleatoria(seed):
+    _comparar(core.prepare_df_tolerant(generar_export(3000, seed)))
+
+def test_valores_limite():
+    # DR en el mínimo, porcentajes en los bordes de cada tramo, ceros y tráfico sin backlinks
+    rng = np.random.default_rng(0)
+    n = 4000
+    df = pd.DataFrame({
+        'target': [f'd{i}.com' for i in range(n)],
+        'dr': rng.choice([0, 29.5, 30, 30.5, 31, 50, 75, 100, 120], n),
+        'organic_traffic': rng.choice([0, 1, 9.99, 1000, 30000, 1e6, 1e9], n),
+        'refdomains_all': rng.choice([0, 1, 50, 200, 5000], n),
+        'backlinks_all': rng.choice([0, 1, 100, 1000, 4000, 1e5], n),
+        'Pct_Backlinks_Followed': rng.choice([0, 0.5, 0.7, 0.8, 0.9, 0.95, 1], n),
+        'Pct_Backlinks_Nofollow': rng.choice([0, 0.1, 0.3, 1], n),
+        'RefIP_Diversidad': rng.choice([0, 0.3, 0.99, 1, 1.5], n),
+        'domain_age': rng.choice([0, 0.1, 5, 19.9, 20, 40], n),
+        'pct_authority_tlds': rng.choice([0, 0.01, 0.2, 0.5], n),
+        'pct_brand_anchors': rng.choice([0, 0.3, 0.5, 0.6], n),
+        'url_rating': rng.choice([0, 10, 40, 60], n),
+    })
+    _comparar(df)
+
+def test_perfil_de_reglas_no_por_defecto():
+    df = core.prepare_df_tolerant(generar_export(2000, 11))
+    with usar_perfil(cargar_perfil(RUTA_PERFIL_ESTRICTO)):
+        _comparar(df)
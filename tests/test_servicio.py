@@ -0,0 +1,101 @@
+"""Servicio HTTP: peticiones reales contra crear_servidor(puerto=0)."""
+import copy
+import http.client
+import json
+import threading
+
+import pytest
+
+from pbn_evaluator import core, servicio
+
+@pytest.fixture
+def servidor():
+    # Ventana amplia para que las peticiones concurrentes caigan en el mismo lote
+    srv = servicio.crear_servidor(puerto=0, ventana_ms=100)
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    srv.evaluador.cerrar()
+
+def _peticion(srv, metodo, ruta, cuerpo=None):
+    conexion = http.client.HTTPConnection(*srv.server_address, timeout=30)
+    try:
+        if isinstance(cuerpo, (dict, list)):
+            cuerpo = json.dumps(cuerpo)
+        conexion.request(metodo, ruta, body=cuerpo)
+        respuesta = conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+    finally:
+        conexion.close()
+
+DOMINIOS = [
+    {'target': 'ejemplo.com', 'dr': 45, 'organic_traffic': 12000, 'refdomains_all': 300, 'backlinks_all': 2500},
+    {'Target': 'https://www.bestdeals.net/', 'Domain Rating': 38, 'Brand Anchors': 0},
+    {'target': 'bbc.co.uk', 'dr': 92},
+]
+
+def test_dominio_individual_y_lista(servidor):
+    esperado = servicio.evaluar_dominios(DOMINIOS)
+    estado, datos = _peticion(servidor, 'POST', '/evaluar', DOMINIOS[1])
+    assert estado == 200 and isinstance(datos, dict)
+    assert datos['Score'] == esperado[1]['Score'] and datos['PBN_Alertas'] == esperado[1]['PBN_Alertas']
+
+    estado, datos = _peticion(servidor, 'POST', '/evaluar', DOMINIOS)
+    assert estado == 200 and len(datos) == len(DOMINIOS)
+    assert [d['Label'] for d in datos] == [e['Label'] for e in esperado]
+    assert [d['PBN_Nivel_Riesgo'] for d in datos] == [e['PBN_Nivel_Riesgo'] for e in esperado]
+
+def test_sin_textos(servidor):
+    estado, datos = _peticion(servidor, 'POST', '/evaluar?textos=0', DOMINIOS)
+    assert estado == 200
+    for fila in datos:
+        assert not set(core.COLUMNAS_TEXTO_DIFERIDO) & set(fila)
+        assert 'Score' in fila
+
+def test_errores(servidor, monkeypatch):
+    estado, datos = _peticion(servidor, 'POST', '/evaluar', b'{"target": ')
+    assert estado == 400 and 'JSON no válido' in datos['error']
+    estado, datos = _peticion(servidor, 'POST', '/evaluar', {'dr': 40})
+    assert estado == 400 and 'target' in datos['error']
+    estado, _ = _peticion(servidor, 'POST', '/evaluar', [1, 2])
+    assert estado == 400
+    estado, _ = _peticion(servidor, 'GET', '/otra')
+    assert estado == 404
+
+    monkeypatch.setattr(servicio, 'MAX_BYTES_PETICION', 100)
+    estado, datos = _peticion(servidor, 'POST', '/evaluar', [DOMINIOS[0]] * 10)
+    assert estado == 413
+
+def test_peticiones_concurrentes_se_agrupan(servidor):
+    n = 16
+    barrera = threading.Barrier(n)
+    respuestas = [None] * n
+
+    def cliente(i):
+        barrera.wait()
+        respuestas[i] = _peticion(servidor, 'POST', '/evaluar', {'target': f'dominio{i}.com', 'dr': 40 + i})
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert all(estado == 200 for estado, _ in respuestas)
+    # Cada petición recibe su propio resultado
+    assert [datos['target'] for _, datos in respuestas] == [f'dominio{i}.com' for i in range(n)]
+    estado, metricas = _peticion(servidor, 'GET', '/metricas')
+    assert estado == 200 and metricas['peticiones'] == n
+    assert metricas['lotes'] < n and metricas['dominios_por_lote'] > 1
+
+def test_no_toca_los_perfiles_de_columnas(servidor, monkeypatch):
+    # Aunque hubiera un archivo de perfiles configurado, el servicio no lo escribe
+    escrituras = []
+    monkeypatch.setattr(core, '_guardar_perfiles', escrituras.append)
+    antes = copy.deepcopy(core._PERFILES_COLUMNAS)
+    for i in range(5):
+        estado, _ = _peticion(servidor, 'POST', '/evaluar', {'Target': 'x.com', f'Columna {i}': 1, 'DR': 30})
+        assert estado == 200
+    assert core._PERFILES_COLUMNAS == antes and not escrituras
@@ -0,0 +1,48 @@
+"""Reason y textos PBN: solo se generan para las filas que se muestran o exportan."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from pbn_evaluator import core
+from pbn_evaluator.cache import CacheResultados
+
+def test_el_resultado_no_lleva_textos(export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    assert not set(core.COLUMNAS_TEXTO_DIFERIDO) & set(resultado.columns)
+    assert 'Reason' not in core.COLUMNAS_EVALUACION
+
+def test_solo_se_generan_para_las_filas_pedidas(monkeypatch, export_sintetico):
+    resultado = core.run_analysis(export_sintetico)
+    llamadas = []
+    construir_reason = core.construir_reason
+    monkeypatch.setattr(core, 'construir_reason', lambda df: llamadas.append(len(df)) or construir_reason(df))
+    pagina = core.expandir_resultados(resultado.iloc[100:150])
+    assert llamadas == [50]
+    assert pagina.index.equals(resultado.index[100:150])
+    assert list(pagina.columns) == core.COLUMNAS_RESULTADO
+
+def test_snapshot_con_reason_conserva_su_texto(export_sintetico):
+    antiguo = core.run_analysis(export_sintetico.iloc[:20]).assign(Reason='texto guardado')
+    assert core.expandir_resultados(antiguo)['Reason'].eq('texto guardado').all()
+
+def test_cache_con_la_columna_reason_antigua(tmp_path, export_sintetico):
+    ruta = tmp_path / 'cache.sqlite'
+    # Esquema anterior a los textos diferidos: con 'reason' entre 'label' y 'puntos'
+    with sqlite3.connect(ruta) as con:
+        con.execute(
+            'CREATE TABLE resultados (clave INTEGER PRIMARY KEY, host TEXT, version TEXT, '
+            'score INTEGER, label TEXT, reason TEXT, puntos INTEGER, nivel TEXT, '
+            'reglas INTEGER, patron TEXT, whitelist INTEGER, creado REAL NOT NULL)'
+        )
+    cache = CacheResultados(ruta)
+    primera = core.run_analysis(export_sintetico, cache=cache)
+    segunda = core.run_analysis(export_sintetico, cache=cache)
+    assert cache.aciertos == cache.evaluados
+    assert segunda[core.COLUMNAS_EVALUACION].equals(primera[core.COLUMNAS_EVALUACION])
+
+def test_acortar_textos_de_la_tabla():
+    app2 = pytest.importorskip('app2')
+    acortados = app2.shorten_text_for_display(pd.Series(['a\nb', '\nsolo', 'x' * 100, '', None]))
+    assert acortados.iloc[:4].tolist() == ['a | b', 'solo', 'x' * 77 + '...', '']
+    assert pd.isna(acortados.iloc[4])